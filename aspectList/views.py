@@ -14,6 +14,7 @@ from core.permissions import (
     get_aspect_permission, # Para el detalle
     can_edit as permission_can_edit
 )
+from core.mixins import ConditionalDetailMixin
 from assignments.models import AssignmentRole, ProjectAssignment, FactorAssignment # User para filtros
 
 class AspectListView(LoginRequiredMixin, FilteredListPermissionMixin, ListView):
@@ -92,10 +93,12 @@ class AspectListView(LoginRequiredMixin, FilteredListPermissionMixin, ListView):
         context['editable_aspects_pks'] = editable_aspects_pks
         return context
 
-class AspectDetailView(LoginRequiredMixin, ObjectPermissionRequiredMixin, DetailView):
+class AspectDetailView(LoginRequiredMixin, ObjectPermissionRequiredMixin, ConditionalDetailMixin, DetailView):
     model = Aspect
+    queryset = Aspect.objects.select_related('trait__factor__project')
     template_name = "aspectList/aspect_detail.html"
     context_object_name = "aspect"
+    version_ancestors = ('trait', 'trait__factor', 'trait__factor__project')
     permission_required_roles = [
         AssignmentRole.LECTOR,
         AssignmentRole.COMENTADOR,
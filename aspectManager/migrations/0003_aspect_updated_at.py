@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 02:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aspectManager', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aspect',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Última modificación'),
+        ),
+    ]
@@ -26,6 +26,7 @@ class Aspect(models.Model):
         related_name="aspects",
         verbose_name="Característica"
     )
+    updated_at          = models.DateTimeField("Última modificación", auto_now=True)
 
     class Meta:
         ordering = ["name"]
@@ -0,0 +1,226 @@
+# assignments/bulk.py
+"""
+Importación y exportación masiva de asignaciones.
+
+Cada fila es (cedula, tipo, id, rol): tipo es 'proyecto' o 'factor', id
+el id_project o id_factor y rol uno de AssignmentRole (vacío = quitar la
+asignación). Se aceptan CSV con encabezado o JSON (lista de objetos con
+esas claves).
+
+Todo el archivo se valida con unas pocas consultas (in_bulk de usuarios,
+proyectos y factores) antes de escribir; si alguna fila tiene errores no
+se aplica nada. Las asignaciones se escriben con bulk_create
+(update_conflicts=True) y los permisos de Drive se reconcilian tras el
+commit con una llamada a drive_sync.schedule por archivo.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from factorManager.models import Factor
+from login.models import Rol, User
+from projects.models import Project
+from . import drive_sync
+from .models import EXCLUDED_FACTOR_ROLES, AssignmentRole, FactorAssignment, ProjectAssignment
+
+FIELDS = ('cedula', 'tipo', 'id', 'rol')
+SCOPES = ('proyecto', 'factor')
+BATCH_SIZE = 500
+EXPORT_CHUNK = 2000
+
+
+class ImportFormatError(ValueError):
+    """El archivo no se pudo leer como CSV/JSON de asignaciones."""
+
+
+@dataclass
+class Row:
+    line: int
+    cedula: str
+    scope: str
+    target: str
+    role: str
+
+
+def parse(fh, fmt='csv'):
+    """Filas del archivo *fh* (texto). *fmt* es 'csv' o 'json'."""
+    if fmt == 'json':
+        try:
+            items = json.load(fh)
+        except ValueError as exc:
+            raise ImportFormatError(f"JSON inválido: {exc}") from exc
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise ImportFormatError("El JSON debe ser una lista de objetos.")
+        numbered = enumerate(items, start=1)
+    elif fmt == 'csv':
+        reader = csv.DictReader(fh)
+        missing = set(FIELDS) - set(reader.fieldnames or ())
+        if missing:
+            raise ImportFormatError(f"Faltan columnas en el CSV: {', '.join(sorted(missing))}")
+        numbered = enumerate(reader, start=2)  # la línea 1 es el encabezado
+    else:
+        raise ImportFormatError(f"Formato no soportado: {fmt}")
+    return [
+        Row(line, *(str(item.get(field) or '').strip() for field in ('cedula', 'tipo', 'id')),
+            str(item.get('rol') or '').strip().lower())
+        for line, item in numbered
+    ]
+
+
+def validate(rows):
+    """
+    Valida todas las filas a la vez. Retorna (errores, usuarios, proyectos,
+    factores); errores es una lista de (línea, mensaje).
+    """
+    errors = []
+    users = User.objects.in_bulk({r.cedula for r in rows}, field_name='cedula')
+    projects = Project.objects.in_bulk({r.target for r in rows if r.scope == 'proyecto'}, field_name='id_project')
+    factors = Factor.objects.in_bulk({r.target for r in rows if r.scope == 'factor'}, field_name='id_factor')
+    seen = {}
+    for row in rows:
+        user = users.get(row.cedula)
+        if row.scope not in SCOPES:
+            errors.append((row.line, f"Tipo '{row.scope}' inválido (use 'proyecto' o 'factor')."))
+            continue
+        if user is None:
+            errors.append((row.line, f"Usuario con cédula '{row.cedula}' no encontrado."))
+        if row.role and row.role not in AssignmentRole.values:
+            errors.append((row.line, f"Rol '{row.role}' inválido."))
+        if row.scope == 'proyecto':
+            if row.target not in projects:
+                errors.append((row.line, f"Proyecto '{row.target}' no encontrado."))
+            if user is not None and user.rol != Rol.MINIADMIN:
+                errors.append((row.line, "Solo los MiniAdmins reciben asignaciones de proyecto."))
+        else:
+            if row.target not in factors:
+                errors.append((row.line, f"Factor '{row.target}' no encontrado."))
+            if user is not None and user.rol in EXCLUDED_FACTOR_ROLES:
+                errors.append((row.line, "Los roles administrativos no reciben asignaciones de factor."))
+        key = (row.scope, row.target, row.cedula)
+        if key in seen:
+            errors.append((row.line, f"Duplicada con la línea {seen[key]}."))
+        seen[key] = row.line
+    return errors, users, projects, factors
+
+
+def _current(model, target_field, rows, scope):
+    """{(id objetivo, cédula): asignación} existentes para las filas de *scope*."""
+    targets = {}
+    for row in rows:
+        if row.scope == scope:
+            targets.setdefault(row.target, set()).add(row.cedula)
+    if not targets:
+        return {}
+    pairs = Q()
+    for target, cedulas in targets.items():
+        pairs |= Q(**{f'{target_field}_id': target, 'user_id__in': cedulas})
+    return {
+        (getattr(a, f'{target_field}_id'), a.user_id): a
+        for a in model.objects.filter(pairs)
+    }
+
+
+def _apply_scope(model, target_field, rows, scope, users, targets, drive_file, summary, drive_changes):
+    current = _current(model, target_field, rows, scope)
+    upserts, deletes = [], []
+    for row in rows:
+        if row.scope != scope:
+            continue
+        existing = current.get((row.target, row.cedula))
+        email = users[row.cedula].email
+        file_id = drive_file(targets[row.target])
+        if not row.role:
+            if existing is not None:
+                deletes.append(existing.pk)
+                if file_id:
+                    drive_changes.setdefault(file_id, {})[email] = None
+            continue
+        if existing is not None and existing.role == row.role:
+            summary['sin_cambios'] += 1
+            continue
+        summary['actualizadas' if existing is not None else 'creadas'] += 1
+        upserts.append(model(**{target_field: targets[row.target], 'user': users[row.cedula], 'role': row.role}))
+        if file_id:
+            drive_changes.setdefault(file_id, {})[email] = row.role
+    if deletes:
+        summary['eliminadas'] += model.objects.filter(pk__in=deletes).delete()[0]
+    if upserts:
+        model.objects.bulk_create(
+            upserts, batch_size=BATCH_SIZE,
+            update_conflicts=True, unique_fields=[target_field, 'user'], update_fields=['role'],
+        )
+    return {row.target for row in rows if row.scope == scope}
+
+
+def import_rows(rows, dry_run=False):
+    """
+    Valida y aplica *rows*. Retorna {'errores': [(línea, mensaje)], 'creadas',
+    'actualizadas', 'eliminadas', 'sin_cambios'}. Con errores o *dry_run* no
+    se modifica nada.
+    """
+    summary = {'errores': [], 'creadas': 0, 'actualizadas': 0, 'eliminadas': 0, 'sin_cambios': 0}
+    errors, users, projects, factors = validate(rows)
+    if errors:
+        summary['errores'] = errors
+        return summary
+
+    drive_changes = {}
+    with transaction.atomic():
+        _apply_scope(ProjectAssignment, 'project', rows, 'proyecto', users, projects,
+                     lambda project: project.folder_id, summary, drive_changes)
+        touched_factors = _apply_scope(FactorAssignment, 'factor', rows, 'factor', users, factors,
+                                       lambda factor: factor.document_id, summary, drive_changes)
+        if dry_run:
+            transaction.set_rollback(True)
+            return summary
+        if summary['creadas'] or summary['actualizadas']:
+            # bulk_create no emite post_save: se toca el proyecto a mano (ver core.signals)
+            touched_projects = {r.target for r in rows if r.scope == 'proyecto'}
+            Project.objects.filter(
+                Q(id_project__in=touched_projects) | Q(factors__in=touched_factors)
+            ).update(updated_at=timezone.now())
+        for file_id, changes in drive_changes.items():
+            drive_sync.schedule(file_id, changes)
+    return summary
+
+
+def export_rows():
+    """Genera las asignaciones actuales como dicts con las claves de FIELDS."""
+    for model, scope, target in ((ProjectAssignment, 'proyecto', 'project_id'),
+                                 (FactorAssignment, 'factor', 'factor_id')):
+        queryset = model.objects.order_by(target, 'user_id').values_list('user_id', target, 'role')
+        for cedula, target_id, role in queryset.iterator(chunk_size=EXPORT_CHUNK):
+            yield {'cedula': cedula, 'tipo': scope, 'id': target_id, 'rol': role}
+
+
+class _Echo:
+    """Destino de csv.writer que devuelve la línea en vez de guardarla."""
+
+    def write(self, value):
+        return value
+
+
+def export_csv():
+    """Líneas CSV (con encabezado) de todas las asignaciones."""
+    writer = csv.DictWriter(_Echo(), fieldnames=FIELDS)
+    yield writer.writeheader()
+    for row in export_rows():
+        yield writer.writerow(row)
+
+
+def export_json():
+    """Lista JSON de todas las asignaciones, generada por partes."""
+    yield '['
+    for index, row in enumerate(export_rows()):
+        yield (',' if index else '') + '\n' + json.dumps(row, ensure_ascii=False)
+    yield '\n]\n'
+
+
+def read_upload(uploaded, fmt):
+    """Filas de un archivo subido (bytes en UTF-8, con o sin BOM)."""
+    return parse(io.TextIOWrapper(uploaded, encoding='utf-8-sig', newline=''), fmt)
@@ -0,0 +1,236 @@
+# assignments/drive_sync.py
+"""
+Reconciliación de permisos de Drive para asignaciones de proyecto y factor.
+
+Las vistas de asignación solo declaran el estado deseado (email → rol de
+la aplicación, o None para quitar el acceso) con `schedule()`. Al
+confirmarse la transacción, un hilo en segundo plano lista los permisos
+actuales del archivo, calcula la diferencia y la aplica con peticiones
+por lotes de Drive (100 operaciones por petición). Las operaciones que
+fallan quedan en DrivePermissionFailure para reintentarlas.
+
+El listado de permisos de cada archivo (todas sus páginas) se guarda en
+caché por PERMISSIONS_CACHE_TTL segundos y se invalida al modificarlo.
+"""
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from projects.models import _drive_service as get_drive_service
+from .models import AssignmentRole, DrivePermissionFailure
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_ROLES = {
+    AssignmentRole.LECTOR: 'reader',
+    AssignmentRole.COMENTADOR: 'commenter',
+    AssignmentRole.EDITOR: 'writer',
+}
+BATCH_LIMIT = 100
+PERMISSIONS_PAGE_SIZE = 100
+PERMISSIONS_CACHE_KEY = 'assignments:drive_permissions:{}'
+PERMISSIONS_CACHE_TTL = getattr(settings, 'DRIVE_PERMISSIONS_CACHE_TTL', 300)
+
+
+def _cache_key(file_id):
+    return PERMISSIONS_CACHE_KEY.format(file_id)
+
+
+def list_permissions(drive, file_id):
+    """{email en minúsculas: permiso} de *file_id*, recorriendo todas las páginas."""
+    permissions, page_token = {}, None
+    while True:
+        result = drive.permissions().list(
+            fileId=file_id,
+            fields='nextPageToken, permissions(id,emailAddress,role)',
+            pageSize=PERMISSIONS_PAGE_SIZE,
+            pageToken=page_token,
+        ).execute()
+        for perm in result.get('permissions', []):
+            if perm.get('emailAddress'):
+                permissions[perm['emailAddress'].lower()] = perm
+        page_token = result.get('nextPageToken')
+        if not page_token:
+            return permissions
+
+
+def current_permissions(drive, file_id):
+    """
+    Permisos de *file_id* con caché de PERMISSIONS_CACHE_TTL segundos. Se
+    invalida cada vez que este módulo modifica permisos del archivo.
+    """
+    permissions = cache.get(_cache_key(file_id))
+    if permissions is None:
+        permissions = list_permissions(drive, file_id)
+        cache.set(_cache_key(file_id), permissions, PERMISSIONS_CACHE_TTL)
+    return permissions
+
+
+def invalidate_permissions(file_id):
+    cache.delete(_cache_key(file_id))
+
+
+def diff(current, desired):
+    """
+    Operaciones para llevar *current* a *desired* ({email: rol de Drive o
+    None}). Solo se tocan los emails presentes en *desired*: los demás
+    permisos del archivo (propietario, cuenta de servicio) no se alteran.
+    """
+    ops = []
+    for email, google_role in desired.items():
+        existing = current.get(email.lower())
+        if google_role is None:
+            if existing:
+                ops.append(('delete', email, None, existing['id']))
+        elif existing is None:
+            ops.append(('create', email, google_role, None))
+        elif existing.get('role') != google_role:
+            ops.append(('update', email, google_role, existing['id']))
+    return ops
+
+
+def _request_for(drive, file_id, op):
+    action, email, google_role, permission_id = op
+    if action == 'delete':
+        return drive.permissions().delete(fileId=file_id, permissionId=permission_id)
+    if action == 'update':
+        return drive.permissions().update(fileId=file_id, permissionId=permission_id, body={'role': google_role})
+    return drive.permissions().create(
+        fileId=file_id,
+        body={'type': 'user', 'role': google_role, 'emailAddress': email},
+        sendNotificationEmail=False,
+    )
+
+
+def apply(drive, file_id, ops):
+    """Ejecuta *ops* en lotes. Retorna {email: error} de las que fallaron."""
+    failures = {}
+
+    def _callback(request_id, response, exception):
+        if exception is None:
+            return
+        action = ops[int(request_id)][0]
+        # Borrar un permiso que ya no existe no es un error
+        if action == 'delete' and getattr(getattr(exception, 'resp', None), 'status', None) == 404:
+            return
+        failures[ops[int(request_id)][1]] = str(exception)
+
+    for start in range(0, len(ops), BATCH_LIMIT):
+        batch = drive.new_batch_http_request(callback=_callback)
+        for index in range(start, min(start + BATCH_LIMIT, len(ops))):
+            batch.add(_request_for(drive, file_id, ops[index]), request_id=str(index))
+        try:
+            batch.execute()
+        except Exception as exc:
+            for index in range(start, min(start + BATCH_LIMIT, len(ops))):
+                failures.setdefault(ops[index][1], str(exc))
+    return failures
+
+
+def _record(file_id, desired, failures):
+    """Guarda los fallos y limpia los pendientes que ya quedaron aplicados."""
+    DrivePermissionFailure.objects.filter(file_id=file_id, email__in=list(desired)) \
+        .exclude(email__in=list(failures)).delete()
+    for email, error in failures.items():
+        updated = DrivePermissionFailure.objects.filter(file_id=file_id, email=email).update(
+            google_role=desired[email] or '', error=error, attempts=F('attempts') + 1,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            DrivePermissionFailure.objects.create(
+                file_id=file_id, email=email, google_role=desired[email] or '', error=error,
+            )
+
+
+def reconcile(file_id, desired, drive=None):
+    """
+    Lleva los permisos de *file_id* al estado *desired* ({email: rol de
+    Drive o None}). Retorna {email: error} de lo que no se pudo aplicar.
+    """
+    try:
+        drive = drive or get_drive_service()
+        ops = diff(current_permissions(drive, file_id), desired)
+        failures = apply(drive, file_id, ops)
+        if ops:
+            # Tras modificar permisos el listado en caché ya no vale (y si estaba viejo,
+            # el reintento de lo que falló parte de uno fresco)
+            invalidate_permissions(file_id)
+    except Exception as exc:
+        invalidate_permissions(file_id)
+        logger.error(f"Drive: No se pudieron reconciliar permisos de '{file_id}': {exc}")
+        failures = {email: str(exc) for email in desired}
+    _record(file_id, desired, failures)
+    if failures:
+        logger.warning(f"Drive: {len(failures)} permiso(s) pendientes en '{file_id}'.")
+    else:
+        logger.info(f"Drive: Permisos de '{file_id}' reconciliados ({len(desired)} usuario(s)).")
+    return failures
+
+
+def retry_failures(drive=None):
+    """Reintenta los permisos pendientes agrupados por archivo. Retorna cuántos siguen fallando."""
+    by_file = {}
+    for failure in DrivePermissionFailure.objects.order_by('file_id'):
+        by_file.setdefault(failure.file_id, {})[failure.email] = failure.google_role or None
+    pending = 0
+    for file_id, desired in by_file.items():
+        pending += len(reconcile(file_id, desired, drive=drive))
+    return pending
+
+
+# --- Cola y trabajador en segundo plano ---
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _work():
+    while True:
+        file_id, desired = _queue.get()
+        try:
+            reconcile(file_id, desired)
+        except Exception:
+            logger.exception("Error reconciliando permisos de Drive de %s", file_id)
+        finally:
+            close_old_connections()
+            _queue.task_done()
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_work, name='drive-permissions', daemon=True)
+            _worker.start()
+
+
+def wait_until_idle():
+    """Bloquea hasta que la cola se vacíe (útil en pruebas y comandos)."""
+    _queue.join()
+
+
+def schedule(file_id, assignments):
+    """
+    Programa la reconciliación de *file_id* al confirmarse la transacción.
+    *assignments* es {email: rol de la aplicación o None}. Con
+    DRIVE_SYNC_ASYNC = False se reconcilia en línea tras el commit.
+    """
+    if not file_id or not assignments:
+        return
+    desired = {email: GOOGLE_ROLES.get(role) for email, role in assignments.items() if email}
+
+    def _dispatch():
+        if getattr(settings, 'DRIVE_SYNC_ASYNC', True):
+            _ensure_worker()
+            _queue.put((file_id, desired))
+        else:
+            reconcile(file_id, desired)
+
+    transaction.on_commit(_dispatch)
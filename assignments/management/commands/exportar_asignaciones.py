@@ -0,0 +1,30 @@
+# assignments/management/commands/exportar_asignaciones.py
+from django.core.management.base import BaseCommand
+
+from assignments import bulk
+
+
+class Command(BaseCommand):
+    help = "Exporta todas las asignaciones de proyecto/factor (cedula, tipo, id, rol) en CSV o JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--formato",
+            choices=["csv", "json"],
+            default="csv",
+            help="Formato de salida (por defecto csv).",
+        )
+        parser.add_argument(
+            "--salida",
+            help="Archivo de destino (por defecto la salida estándar).",
+        )
+
+    def handle(self, *args, **options):
+        parts = bulk.export_json() if options["formato"] == "json" else bulk.export_csv()
+        if not options["salida"]:
+            for part in parts:
+                self.stdout.write(part, ending="")
+            return
+        with open(options["salida"], "w", encoding="utf-8", newline="") as fh:
+            fh.writelines(parts)
+        self.stdout.write(self.style.SUCCESS(f"Asignaciones exportadas a {options['salida']}."))
@@ -0,0 +1,42 @@
+# assignments/management/commands/importar_asignaciones.py
+from django.core.management.base import BaseCommand, CommandError
+
+from assignments import bulk
+
+
+class Command(BaseCommand):
+    help = "Importa asignaciones de proyecto/factor desde un CSV o JSON con columnas cedula, tipo, id, rol."
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo", help="Ruta del archivo a importar.")
+        parser.add_argument(
+            "--formato",
+            choices=["csv", "json"],
+            help="Formato del archivo (por defecto se deduce de la extensión).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Solo valida y cuenta los cambios, sin guardar.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["archivo"]
+        fmt = options["formato"] or ("json" if path.lower().endswith(".json") else "csv")
+        try:
+            with open(path, encoding="utf-8-sig", newline="") as fh:
+                rows = bulk.parse(fh, fmt)
+        except (OSError, bulk.ImportFormatError) as exc:
+            raise CommandError(str(exc))
+
+        summary = bulk.import_rows(rows, dry_run=options["dry_run"])
+        if summary["errores"]:
+            for line, message in summary["errores"]:
+                self.stderr.write(f"Línea {line}: {message}")
+            raise CommandError(f"{len(summary['errores'])} error(es); no se aplicó ningún cambio.")
+
+        prefix = "[dry-run] " if options["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{len(rows)} fila(s): {summary['creadas']} creadas, {summary['actualizadas']} actualizadas, "
+            f"{summary['eliminadas']} eliminadas, {summary['sin_cambios']} sin cambios."
+        ))
@@ -0,0 +1,17 @@
+# assignments/management/commands/reintentar_permisos_drive.py
+from django.core.management.base import BaseCommand
+
+from assignments import drive_sync
+from assignments.models import DrivePermissionFailure
+
+
+class Command(BaseCommand):
+    help = "Reintenta aplicar en Google Drive los permisos de asignaciones que fallaron."
+
+    def handle(self, *args, **options):
+        total = DrivePermissionFailure.objects.count()
+        if not total:
+            self.stdout.write("No hay permisos pendientes.")
+            return
+        pendientes = drive_sync.retry_failures()
+        self.stdout.write(self.style.SUCCESS(f"{total - pendientes} de {total} permiso(s) aplicados; {pendientes} siguen pendientes."))
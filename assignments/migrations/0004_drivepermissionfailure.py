@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-19 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DrivePermissionFailure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_id', models.CharField(max_length=128)),
+                ('email', models.EmailField(max_length=254)),
+                ('google_role', models.CharField(blank=True, max_length=20)),
+                ('error', models.TextField(blank=True)),
+                ('attempts', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Permiso de Drive pendiente',
+                'verbose_name_plural': 'Permisos de Drive pendientes',
+                'unique_together': {('file_id', 'email')},
+            },
+        ),
+    ]
@@ -5,6 +5,7 @@ from django.conf import settings
 # Si están en apps diferentes, usa 'app_name.ModelName'
 from projects.models import Project
 from factorManager.models import Factor 
+from login.models import Rol
 # from login.models import User # Ya no es necesario si usas settings.AUTH_USER_MODEL
 
 class AssignmentRole(models.TextChoices):
@@ -14,6 +15,9 @@ class AssignmentRole(models.TextChoices):
     # VISITANTE podría ser LECTOR. Si son distintos, mantenlo.
     # VISITANTE   = 'visitante',  'Visitante' # Considera si es igual a LECTOR
 
+# Roles que nunca reciben asignaciones de factor
+EXCLUDED_FACTOR_ROLES = (Rol.SUPERADMIN, Rol.MINIADMIN, Rol.ACADI)
+
 class ProjectAssignment(models.Model):
     project     = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='project_assignments_to_users') # Cambiado related_name
     user        = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='project_assignments_as_user') # Cambiado related_name
@@ -41,3 +45,26 @@ class FactorAssignment(models.Model):
 
     def __str__(self):
         return f"{self.user.get_full_name} - {self.factor.name} ({self.get_role_display()})"
+
+
+class DrivePermissionFailure(models.Model):
+    """
+    Permiso de Drive que no se pudo aplicar al reconciliar una asignación.
+    Guarda el estado deseado (rol de Drive o vacío para quitarlo) para
+    reintentarlo con `reintentar_permisos_drive`.
+    """
+    file_id = models.CharField(max_length=128)
+    email = models.EmailField()
+    google_role = models.CharField(max_length=20, blank=True)  # '' = sin acceso
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('file_id', 'email')
+        verbose_name = "Permiso de Drive pendiente"
+        verbose_name_plural = "Permisos de Drive pendientes"
+
+    def __str__(self):
+        return f"{self.email} → {self.google_role or 'sin acceso'} en {self.file_id}"
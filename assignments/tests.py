@@ -1,11 +1,10 @@
 # assignments/tests.py
 import json
-from unittest.mock import patch, MagicMock, ANY
+from unittest.mock import patch, MagicMock
 from django.test import TestCase, Client, RequestFactory, override_settings
 from django.urls import reverse, NoReverseMatch
 from django.contrib.auth import get_user_model
 from django.contrib.sessions.middleware import SessionMiddleware
-from django.contrib.messages import get_messages
 from django.contrib import messages as django_messages
 from django.db.models import Model
 from django.http import JsonResponse, HttpResponseForbidden, HttpResponseBadRequest
@@ -91,7 +90,6 @@ from .views import (
     api_factors_for_assignment, api_project_assignments_for_project,
     api_factor_assignments_for_factor, assignments_page,
     assign_project_to_mini_admin, assign_factor_to_user,
-    _update_drive_permission
 )
 
 # Mock the drive service globally for views
@@ -219,7 +217,7 @@ class AssignmentsUrlsTests(TestCase):
 @patch('assignments.views.ProjectAssignment', ProjectAssignment) # Use real assignment models for DB ops
 @patch('assignments.views.FactorAssignment', FactorAssignment)
 @patch('assignments.views.AssignmentRole', AssignmentRole)
-@patch('assignments.views.get_drive_service', side_effect=mock_get_drive_service_for_views) # Central Drive mock
+@patch('assignments.drive_sync.get_drive_service', side_effect=mock_get_drive_service_for_views) # Central Drive mock
 @patch('assignments.views.messages', django_messages) # Use actual messages for testing
 @patch('googleapiclient.errors.HttpError', MockHttpError) # Mock HttpError
 class AssignmentsViewsTests(TestCase):
@@ -346,36 +344,6 @@ class AssignmentsViewsTests(TestCase):
         self.assertEqual(response_err.status_code, 500)
 
 
-    @patch('assignments.views.User.objects.filter')
-    def test_api_mini_admin_users(self, mock_user_filter):
-        """Test api_mini_admin_users view."""
-        mock_user_filter.return_value.order_by.return_value = [self.mini_admin_user]
-        self.client.force_login(self.super_user)
-        response = self.client.get(reverse('assignments:api_mini_admin_users'))
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.json()), 1)
-        mock_user_filter.assert_called_with(rol=LoginRol.MINIADMIN, is_active=True)
-        
-        mock_user_filter.side_effect = Exception("DB Error")
-        response_err = self.client.get(reverse('assignments:api_mini_admin_users'))
-        self.assertEqual(response_err.status_code, 500)
-
-
-    @patch('assignments.views.User.objects.filter')
-    def test_api_assignable_users_for_factor(self, mock_user_filter):
-        """Test api_assignable_users_for_factor view."""
-        mock_user_filter.return_value.exclude.return_value.order_by.return_value = [self.editor_user, self.lector_user]
-        self.client.force_login(self.mini_admin_user) # MiniAdmin can access
-        response = self.client.get(reverse('assignments:api_assignable_users_for_factor'))
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.json()), 2)
-        mock_user_filter.return_value.exclude.assert_called_with(rol__in=[LoginRol.SUPERADMIN, LoginRol.MINIADMIN, LoginRol.ACADI])
-
-        mock_user_filter.side_effect = Exception("DB Error")
-        response_err = self.client.get(reverse('assignments:api_assignable_users_for_factor'))
-        self.assertEqual(response_err.status_code, 500)
-
-
     @patch('assignments.views.Project.objects.get')
     @patch('assignments.views.Factor.objects.filter')
     @patch('assignments.views.ProjectAssignment.objects.filter')
@@ -441,15 +409,12 @@ class AssignmentsViewsTests(TestCase):
     # Test POST views
     @patch('assignments.views.Project.objects.get')
     @patch('assignments.views.User.objects.get')
-    @patch('assignments.views._update_drive_permission') # Mock the helper
-    def test_assign_project_to_mini_admin_success(self, mock_update_drive, mock_user_get, mock_project_get):
+    @patch('assignments.views.drive_sync.schedule') # Reconciliación de Drive tras el commit
+    def test_assign_project_to_mini_admin_success(self, mock_schedule, mock_user_get, mock_project_get):
         """Test assign_project_to_mini_admin successfully."""
         self.client.force_login(self.super_user)
         mock_project_get.return_value = self.project1
         mock_user_get.return_value = self.mini_admin_user
-        mock_drive_service_global_instance.permissions.return_value.list.return_value.execute.return_value = {'permissions': []}
-
-
         payload = {
             'project_id': self.project1.id_project,
             'assignments': [{'user_id': self.mini_admin_user.cedula, 'role': AssignmentRole.EDITOR}]
@@ -458,7 +423,7 @@ class AssignmentsViewsTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTrue(ProjectAssignment.objects.filter(project=self.project1, user=self.mini_admin_user, role=AssignmentRole.EDITOR).exists())
         if self.project1.folder_id: # Drive permission should be updated if folder_id exists
-            mock_update_drive.assert_called_with(ANY, self.project1.folder_id, self.mini_admin_user.email, AssignmentRole.EDITOR, ANY)
+            mock_schedule.assert_called_with(self.project1.folder_id, {self.mini_admin_user.email: AssignmentRole.EDITOR})
         
         # Test removing assignment by sending empty role
         payload_remove = {
@@ -469,7 +434,7 @@ class AssignmentsViewsTests(TestCase):
         self.assertEqual(response_remove.status_code, 200)
         self.assertFalse(ProjectAssignment.objects.filter(project=self.project1, user=self.mini_admin_user).exists())
         if self.project1.folder_id:
-            mock_update_drive.assert_called_with(ANY, self.project1.folder_id, self.mini_admin_user.email, None, ANY) # Role is None for removal
+            mock_schedule.assert_called_with(self.project1.folder_id, {self.mini_admin_user.email: None}) # Role is None for removal
 
     def test_assign_project_to_mini_admin_bad_requests(self):
         """Test assign_project_to_mini_admin with bad requests."""
@@ -489,32 +454,30 @@ class AssignmentsViewsTests(TestCase):
         
     @patch('assignments.views.Project.objects.get')
     @patch('assignments.views.User.objects.get')
-    def test_assign_project_to_mini_admin_drive_sync_failure(self, mock_user_get, mock_project_get):
-        """Test assign_project_to_mini_admin when Drive sync fails initially."""
+    def test_assign_project_to_mini_admin_does_not_call_drive_in_request(self, mock_user_get, mock_project_get):
+        """Drive no se consulta dentro de la petición: la reconciliación ocurre tras el commit."""
         self.client.force_login(self.super_user)
         mock_project_get.return_value = self.project1
         mock_user_get.return_value = self.mini_admin_user
-        
-        # Simulate HttpError when listing permissions
         mock_drive_service_global_instance.permissions.return_value.list.return_value.execute.side_effect = MockHttpError(401, "Auth error")
-        
+
         payload = {'project_id': self.project1.id_project, 'assignments': [{'user_id': self.mini_admin_user.cedula, 'role': AssignmentRole.EDITOR}]}
-        response = self.client.post(reverse('assignments:assign_project_to_mini_admin'), data=json.dumps(payload), content_type='application/json')
-        self.assertEqual(response.status_code, 200) # Should still succeed for DB
-        messages_sent = list(get_messages(response.wsgi_request))
-        self.assertTrue(any("CRÍTICO: No se pudo conectar con Google Drive" in str(m) for m in messages_sent))
+        with patch('assignments.views.drive_sync.schedule') as mock_schedule:
+            response = self.client.post(reverse('assignments:assign_project_to_mini_admin'), data=json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        mock_drive_service_global_instance.permissions.return_value.list.assert_not_called()
+        mock_schedule.assert_called_once()
 
     @patch('assignments.views.Factor.objects.get')
     @patch('assignments.views.User.objects.get')
-    @patch('assignments.views._update_drive_permission')
+    @patch('assignments.views.drive_sync.schedule')
     @patch('assignments.views.ProjectAssignment.objects.get') # For MiniAdmin permission check
-    def test_assign_factor_to_user_success_mini_admin(self, mock_pa_get, mock_update_drive, mock_user_get, mock_factor_get):
+    def test_assign_factor_to_user_success_mini_admin(self, mock_pa_get, mock_schedule, mock_user_get, mock_factor_get):
         """Test assign_factor_to_user by a MiniAdmin with project editor role."""
         self.client.force_login(self.mini_admin_user)
         mock_factor_get.return_value = self.factor1_p1
         mock_user_get.return_value = self.editor_user # User to assign
         mock_pa_get.return_value = MagicMock(role=AssignmentRole.EDITOR) # MiniAdmin is editor of project
-        mock_drive_service_global_instance.permissions.return_value.list.return_value.execute.return_value = {'permissions': []}
 
         payload = {
             'factor_id': self.factor1_p1.id_factor,
@@ -524,7 +487,7 @@ class AssignmentsViewsTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTrue(FactorAssignment.objects.filter(factor=self.factor1_p1, user=self.editor_user, role=AssignmentRole.LECTOR).exists())
         if self.factor1_p1.document_id:
-             mock_update_drive.assert_called_with(ANY, self.factor1_p1.document_id, self.editor_user.email, AssignmentRole.LECTOR, ANY)
+             mock_schedule.assert_called_with(self.factor1_p1.document_id, {self.editor_user.email: AssignmentRole.LECTOR})
 
     @patch('assignments.views.Factor.objects.get')
     @patch('assignments.views.ProjectAssignment.objects.get')
@@ -550,64 +513,3 @@ class AssignmentsViewsTests(TestCase):
 
         response_no_id = self.client.post(reverse('assignments:assign_factor_to_user'), data=json.dumps({'assignments':[]}), content_type='application/json')
         self.assertEqual(response_no_id.status_code, 400)
-
-    # Test _update_drive_permission helper
-    def test_update_drive_permission_remove_permission(self):
-        """Test _update_drive_permission to remove an existing permission."""
-        mock_drive = MagicMock()
-        mock_drive.permissions.return_value.delete.return_value.execute.return_value = None
-        existing_perms = {'user@example.com': {'id': 'perm_id_123', 'role': 'writer', 'emailAddress': 'user@example.com'}}
-        
-        _update_drive_permission(mock_drive, "file_id_test", "user@example.com", None, existing_perms)
-        mock_drive.permissions.return_value.delete.assert_called_once_with(fileId="file_id_test", permissionId="perm_id_123")
-
-    def test_update_drive_permission_update_existing(self):
-        """Test _update_drive_permission to update an existing permission."""
-        mock_drive = MagicMock()
-        mock_drive.permissions.return_value.update.return_value.execute.return_value = None
-        existing_perms = {'user@example.com': {'id': 'perm_id_abc', 'role': 'reader', 'emailAddress': 'user@example.com'}}
-
-        _update_drive_permission(mock_drive, "file_id_test2", "user@example.com", AssignmentRole.EDITOR, existing_perms)
-        mock_drive.permissions.return_value.update.assert_called_once_with(fileId="file_id_test2", permissionId="perm_id_abc", body={'role': 'writer'})
-    
-    def test_update_drive_permission_create_new(self):
-        """Test _update_drive_permission to create a new permission."""
-        mock_drive = MagicMock()
-        mock_drive.permissions.return_value.create.return_value.execute.return_value = None
-        existing_perms = {} # No existing permission for this user
-
-        _update_drive_permission(mock_drive, "file_id_test3", "newuser@example.com", AssignmentRole.LECTOR, existing_perms)
-        mock_drive.permissions.return_value.create.assert_called_once_with(
-            fileId="file_id_test3",
-            body={'type': 'user', 'role': 'reader', 'emailAddress': 'newuser@example.com'},
-            sendNotificationEmail=False
-        )
-        
-    def test_update_drive_permission_no_change_needed(self):
-        """Test _update_drive_permission when existing permission matches target."""
-        mock_drive = MagicMock()
-        existing_perms = {'user@example.com': {'id': 'perm_id_xyz', 'role': 'writer', 'emailAddress': 'user@example.com'}}
-        
-        _update_drive_permission(mock_drive, "file_id_test4", "user@example.com", AssignmentRole.EDITOR, existing_perms)
-        mock_drive.permissions.return_value.update.assert_not_called()
-        mock_drive.permissions.return_value.create.assert_not_called()
-        mock_drive.permissions.return_value.delete.assert_not_called()
-
-    def test_update_drive_permission_http_errors(self):
-        """Test _update_drive_permission handling HttpErrors from Drive API."""
-        mock_drive_delete_err = MagicMock()
-        mock_drive_delete_err.permissions.return_value.delete.return_value.execute.side_effect = MockHttpError(404, "Not Found")
-        existing_perms_del = {'del_user@example.com': {'id': 'del_id', 'role': 'reader', 'emailAddress': 'del_user@example.com'}}
-        # Expect HttpError to be caught and logged, not re-raised by _update_drive_permission
-        _update_drive_permission(mock_drive_delete_err, "f_del", "del_user@example.com", None, existing_perms_del)
-        # (Check logs if logging is part of the test requirements, here we just ensure it doesn't crash)
-
-        mock_drive_update_err = MagicMock()
-        mock_drive_update_err.permissions.return_value.update.return_value.execute.side_effect = MockHttpError(500, "Server Error")
-        existing_perms_upd = {'upd_user@example.com': {'id': 'upd_id', 'role': 'reader', 'emailAddress': 'upd_user@example.com'}}
-        _update_drive_permission(mock_drive_update_err, "f_upd", "upd_user@example.com", AssignmentRole.EDITOR, existing_perms_upd)
-
-        mock_drive_create_err = MagicMock()
-        mock_drive_create_err.permissions.return_value.create.return_value.execute.side_effect = MockHttpError(403, "Forbidden")
-        _update_drive_permission(mock_drive_create_err, "f_crt", "crt_user@example.com", AssignmentRole.LECTOR, {})
-
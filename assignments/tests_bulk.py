@@ -0,0 +1,393 @@
+# assignments/tests_bulk.py
+"""
+Pruebas de las operaciones masivas de asignaciones y de la sincronización
+de permisos de Drive. Usan los modelos reales en lugar de los modelos
+simulados de tests.py.
+"""
+import json
+from unittest.mock import patch, MagicMock
+
+from django.core.cache import cache
+from django.test import TestCase, RequestFactory
+
+from login.models import User, Rol as LoginRol
+from .models import AssignmentRole, ProjectAssignment, FactorAssignment
+from .views import api_assignable_users_for_factor, api_mini_admin_users, assign_factor_to_user
+from . import drive_sync
+
+
+class MockHttpError(Exception):
+    """HttpError de googleapiclient con solo lo que drive_sync consulta."""
+
+    def __init__(self, resp_status, reason_str):
+        self.resp = MagicMock()
+        self.resp.status = resp_status
+        self.reason = reason_str
+        super().__init__(f"HTTP error {resp_status}: {reason_str}")
+
+
+class DriveSyncTests(TestCase):
+    """Diferencia de permisos y aplicación por lotes."""
+
+    def test_drive_sync_diff(self):
+        """Solo se tocan los emails del estado deseado; sin cambios si el rol ya coincide."""
+        current = {
+            'del@example.com': {'id': 'p1', 'role': 'reader'},
+            'upd@example.com': {'id': 'p2', 'role': 'reader'},
+            'same@example.com': {'id': 'p3', 'role': 'writer'},
+            'owner@example.com': {'id': 'p4', 'role': 'owner'},
+        }
+        desired = {'del@example.com': None, 'UPD@example.com': 'writer', 'same@example.com': 'writer',
+                   'new@example.com': 'reader', 'gone@example.com': None}
+        self.assertEqual(drive_sync.diff(current, desired), [
+            ('delete', 'del@example.com', None, 'p1'),
+            ('update', 'UPD@example.com', 'writer', 'p2'),
+            ('create', 'new@example.com', 'reader', None),
+        ])
+
+    def test_drive_sync_apply_batches_and_collects_failures(self):
+        """Las operaciones van en lotes de 100; los errores por operación se devuelven."""
+        mock_drive = MagicMock()
+        batches = []
+
+        def new_batch(callback):
+            batch = MagicMock()
+            batch.ids = []
+            batch.add.side_effect = lambda request, request_id: batch.ids.append(request_id)
+            def execute():
+                for request_id in batch.ids:
+                    error = MockHttpError(403, "Forbidden") if request_id == '5' else None
+                    callback(request_id, None, error)
+            batch.execute.side_effect = execute
+            batches.append(batch)
+            return batch
+
+        mock_drive.new_batch_http_request.side_effect = new_batch
+        ops = [('create', f'u{i}@example.com', 'reader', None) for i in range(150)]
+        failures = drive_sync.apply(mock_drive, 'file_x', ops)
+        self.assertEqual([len(b.ids) for b in batches], [100, 50])
+        self.assertEqual(list(failures), ['u5@example.com'])
+
+
+class BulkFactorAssignmentTests(TestCase):
+    """assign_factor_to_user con operaciones de conjunto."""
+
+    def setUp(self):
+        from datetime import date, timedelta
+        from django.test import RequestFactory
+        from projects.models import Project as RealProject
+        from factorManager.models import Factor as RealFactor
+
+        self.factory = RequestFactory()
+        self.admin = User.objects.create_user(
+            cedula='900000', email='bulk0@gmail.com', password='x',
+            first_name='Ada', last_name='Admin', rol=LoginRol.SUPERADMIN,
+        )
+        project = RealProject.objects.create(name='ProjBulk', start_date=date.today(),
+                                             end_date=date.today() + timedelta(days=5))
+        # bulk_create evita la creación del Google Doc en Factor.save()
+        self.factor, = RealFactor.objects.bulk_create([RealFactor(
+            project=project, name='FactorBulk',
+            start_date=date.today(), end_date=date.today() + timedelta(days=1),
+        )])
+        self.users = User.objects.bulk_create([
+            User(cedula=f'9000{i:02d}', email=f'bulk{i}@gmail.com', first_name='U', last_name=str(i), rol=LoginRol.LECTOR)
+            for i in range(1, 41)
+        ])
+
+    def _post(self, assignments):
+        from django.test.utils import CaptureQueriesContext
+        from django.db import connection
+        request = self.factory.post('/assignments/', json.dumps({
+            'factor_id': self.factor.pk, 'assignments': assignments,
+        }), content_type='application/json')
+        request.user = self.admin
+        with CaptureQueriesContext(connection) as queries:
+            response = assign_factor_to_user(request)
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_payload(self):
+        _, few = self._post([{'user_id': u.cedula, 'role': AssignmentRole.LECTOR} for u in self.users[:2]])
+        FactorAssignment.objects.all().delete()
+        response, many = self._post([{'user_id': u.cedula, 'role': AssignmentRole.LECTOR} for u in self.users])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(few, many)
+        self.assertEqual(FactorAssignment.objects.filter(factor=self.factor).count(), 40)
+
+    def test_diff_creates_updates_and_deletes(self):
+        a, b, c, d = self.users[:4]
+        FactorAssignment.objects.bulk_create([
+            FactorAssignment(factor=self.factor, user=a, role=AssignmentRole.LECTOR),
+            FactorAssignment(factor=self.factor, user=b, role=AssignmentRole.LECTOR),
+            FactorAssignment(factor=self.factor, user=c, role=AssignmentRole.LECTOR),
+        ])
+        response, _ = self._post([
+            {'user_id': a.cedula, 'role': AssignmentRole.EDITOR},   # actualizar
+            {'user_id': b.cedula, 'role': ''},                      # quitar
+            {'user_id': d.cedula, 'role': AssignmentRole.COMENTADOR},  # crear
+            {'user_id': self.admin.cedula, 'role': AssignmentRole.LECTOR},  # rol administrativo: omitido
+        ])                                                          # c no viene: quitar
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            dict(FactorAssignment.objects.filter(factor=self.factor).values_list('user_id', 'role')),
+            {a.cedula: AssignmentRole.EDITOR, d.cedula: AssignmentRole.COMENTADOR},
+        )
+
+    def test_unknown_user_is_404(self):
+        from django.http import Http404
+        with self.assertRaises(Http404):
+            self._post([{'user_id': '123123123', 'role': AssignmentRole.LECTOR}])
+        self.assertFalse(FactorAssignment.objects.exists())
+
+
+class DriveReconcileTests(TestCase):
+    """drive_sync.reconcile registra los fallos y los limpia al reintentar."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_failures_recorded_then_cleared_on_retry(self):
+        from assignments.models import DrivePermissionFailure
+
+        drive = MagicMock()
+        drive.permissions.return_value.list.return_value.execute.return_value = {
+            'permissions': [{'id': 'p1', 'emailAddress': 'Viejo@gmail.com', 'role': 'reader'}],
+        }
+        outcome = {'nuevo@gmail.com': MockHttpError(500, "Backend Error")}
+
+        def new_batch(callback):
+            batch = MagicMock()
+            ids = []
+            batch.add.side_effect = lambda request, request_id: ids.append(request_id)
+            batch.execute.side_effect = lambda: [
+                callback(i, None, outcome.get(['nuevo@gmail.com', 'viejo@gmail.com'][int(i)])) for i in ids
+            ]
+            return batch
+
+        drive.new_batch_http_request.side_effect = new_batch
+        desired = {'nuevo@gmail.com': 'writer', 'viejo@gmail.com': None}
+        failures = drive_sync.reconcile('doc1', desired, drive=drive)
+
+        self.assertEqual(list(failures), ['nuevo@gmail.com'])
+        pendiente = DrivePermissionFailure.objects.get()
+        self.assertEqual((pendiente.file_id, pendiente.email, pendiente.google_role), ('doc1', 'nuevo@gmail.com', 'writer'))
+
+        outcome.clear()
+        drive.permissions.return_value.list.return_value.execute.return_value = {'permissions': []}
+        self.assertEqual(drive_sync.retry_failures(drive=drive), 0)
+        self.assertFalse(DrivePermissionFailure.objects.exists())
+
+    def test_schedule_runs_after_commit(self):
+        with self.settings(DRIVE_SYNC_ASYNC=False), \
+             patch.object(drive_sync, 'reconcile') as reconcile, \
+             self.captureOnCommitCallbacks(execute=True):
+            drive_sync.schedule('doc1', {'a@gmail.com': AssignmentRole.LECTOR, 'b@gmail.com': None})
+            reconcile.assert_not_called()
+        reconcile.assert_called_once_with('doc1', {'a@gmail.com': 'reader', 'b@gmail.com': None})
+
+
+class DrivePermissionsCacheTests(TestCase):
+    """Listado paginado de permisos con caché e invalidación."""
+
+    def setUp(self):
+        cache.clear()
+        self.drive = MagicMock()
+        self.list = self.drive.permissions.return_value.list
+        self.list.return_value.execute.side_effect = [
+            {'permissions': [{'id': 'p1', 'emailAddress': 'Uno@gmail.com', 'role': 'reader'}],
+             'nextPageToken': 'pagina2'},
+            {'permissions': [{'id': 'p2', 'emailAddress': 'dos@gmail.com', 'role': 'writer'},
+                             {'id': 'p3', 'type': 'anyone', 'role': 'reader'}]},
+        ]
+
+    def test_list_follows_every_page(self):
+        permissions = drive_sync.current_permissions(self.drive, 'doc1')
+        self.assertEqual(set(permissions), {'uno@gmail.com', 'dos@gmail.com'})
+        self.assertEqual(self.list.call_count, 2)
+        self.assertIsNone(self.list.call_args_list[0].kwargs['pageToken'])
+        self.assertEqual(self.list.call_args_list[1].kwargs['pageToken'], 'pagina2')
+
+    def test_second_read_comes_from_cache(self):
+        first = drive_sync.current_permissions(self.drive, 'doc1')
+        self.assertEqual(drive_sync.current_permissions(self.drive, 'doc1'), first)
+        self.assertEqual(self.list.call_count, 2)
+
+    def test_reconcile_invalidates_after_changes(self):
+        drive_sync.current_permissions(self.drive, 'doc1')
+        with patch.object(drive_sync, 'apply', return_value={}) as apply:
+            drive_sync.reconcile('doc1', {'dos@gmail.com': None}, drive=self.drive)
+        apply.assert_called_once_with(self.drive, 'doc1', [('delete', 'dos@gmail.com', None, 'p2')])
+        self.assertIsNone(cache.get(drive_sync._cache_key('doc1')))
+
+    def test_reconcile_without_changes_keeps_cache(self):
+        drive_sync.current_permissions(self.drive, 'doc1')
+        drive_sync.reconcile('doc1', {'uno@gmail.com': 'reader'}, drive=self.drive)
+        self.assertIsNotNone(cache.get(drive_sync._cache_key('doc1')))
+        self.assertEqual(self.list.call_count, 2)
+
+
+class UserSearchTests(TestCase):
+    """Búsqueda por prefijo, paginación por cursor y caché de las APIs de usuarios."""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.admin = User.objects.create_user(
+            cedula='910000', email='admin.busqueda@gmail.com', password='x',
+            first_name='Admin', last_name='Busqueda', rol=LoginRol.SUPERADMIN, is_active=True)
+        people = [('Ana', 'Pérez'), ('Andrés', 'Gómez'), ('Beatriz', 'Anaya'), ('Carlos', 'Ruiz'), ('Ana', 'Zapata')]
+        for i, (first, last) in enumerate(people):
+            User.objects.create_user(
+                cedula=f'92000{i}', email=f'{first.lower()}{i}@gmail.com', password='x',
+                first_name=first, last_name=last, rol=LoginRol.LECTOR, is_active=True)
+        User.objects.create_user(
+            cedula='930000', email='ana.mini@gmail.com', password='x',
+            first_name='Ana', last_name='Mini', rol=LoginRol.MINIADMIN, is_active=True)
+        User.objects.create_user(
+            cedula='930001', email='ana.inactiva@gmail.com', password='x',
+            first_name='Ana', last_name='Inactiva', rol=LoginRol.LECTOR, is_active=False)
+
+    def _get(self, view, **params):
+        request = self.factory.get('/', params)
+        request.user = self.admin
+        response = view(request)
+        return response.status_code, json.loads(response.content)
+
+    def test_prefix_matches_names_email_and_cedula(self):
+        _, data = self._get(api_assignable_users_for_factor, q='an')
+        self.assertEqual([u['id'] for u in data['results']], ['920000', '920004', '920001', '920002'])
+        _, data = self._get(api_assignable_users_for_factor, q='ana zap')
+        self.assertEqual([u['id'] for u in data['results']], ['920004'])
+        _, data = self._get(api_assignable_users_for_factor, q='92000')
+        self.assertEqual(len(data['results']), 5)
+        _, data = self._get(api_assignable_users_for_factor, q='carlos3@')
+        self.assertEqual([u['id'] for u in data['results']], ['920003'])
+
+    def test_cursor_walks_all_pages_without_repeats(self):
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+            status, data = self._get(api_assignable_users_for_factor, **params)
+            self.assertEqual(status, 200)
+            self.assertLessEqual(len(data['results']), 2)
+            seen += [u['id'] for u in data['results']]
+            cursor = data['next']
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_invalid_cursor_is_bad_request(self):
+        status, _ = self._get(api_assignable_users_for_factor, cursor='no-es-un-cursor')
+        self.assertEqual(status, 400)
+
+    def test_mini_admin_search_only_returns_mini_admins(self):
+        _, data = self._get(api_mini_admin_users, q='ana')
+        self.assertEqual([u['id'] for u in data['results']], ['930000'])
+
+    def test_repeated_query_is_served_from_cache(self):
+        self._get(api_assignable_users_for_factor, q='ana')
+        with self.assertNumQueries(0):
+            self._get(api_assignable_users_for_factor, q='  ANA ')
+
+
+class BulkImportExportTests(TestCase):
+    """Importación/exportación masiva de asignaciones (assignments.bulk)."""
+
+    def setUp(self):
+        from datetime import date, timedelta
+        from projects.models import Project as RealProject
+        from factorManager.models import Factor as RealFactor
+
+        self.project = RealProject.objects.create(name='ProjImport', start_date=date.today(),
+                                                  end_date=date.today() + timedelta(days=5))
+        self.project.folder_id = 'carpeta1'
+        self.project.save(update_fields=['folder_id'])
+        self.factor, = RealFactor.objects.bulk_create([RealFactor(
+            project=self.project, name='FactorImport', document_id='doc1',
+            start_date=date.today(), end_date=date.today() + timedelta(days=1),
+        )])
+        self.mini = User.objects.create_user(
+            cedula='940000', email='mini.import@gmail.com', password='x',
+            first_name='Mini', last_name='Import', rol=LoginRol.MINIADMIN)
+        self.users = User.objects.bulk_create([
+            User(cedula=f'9400{i:02d}', email=f'import{i}@gmail.com', first_name='U', last_name=str(i), rol=LoginRol.LECTOR)
+            for i in range(1, 6)
+        ])
+
+    def _csv(self, lines):
+        import io
+        from assignments import bulk
+        return bulk.parse(io.StringIO('cedula,tipo,id,rol\n' + '\n'.join(lines) + '\n'))
+
+    def test_import_upserts_and_schedules_one_sync_per_file(self):
+        from assignments import bulk
+        FactorAssignment.objects.create(factor=self.factor, user=self.users[0], role=AssignmentRole.LECTOR)
+        FactorAssignment.objects.create(factor=self.factor, user=self.users[1], role=AssignmentRole.LECTOR)
+        rows = self._csv([
+            f'940000,proyecto,{self.project.pk},editor',
+            f'940001,factor,{self.factor.pk},editor',     # actualiza
+            f'940002,factor,{self.factor.pk},',           # elimina
+            f'940003,factor,{self.factor.pk},comentador',
+            f'940004,factor,{self.factor.pk},lector',
+        ])
+        with patch.object(bulk.drive_sync, 'schedule') as schedule, self.captureOnCommitCallbacks(execute=True):
+            summary = bulk.import_rows(rows)
+
+        self.assertEqual(summary['errores'], [])
+        self.assertEqual((summary['creadas'], summary['actualizadas'], summary['eliminadas']), (3, 1, 1))
+        roles = dict(FactorAssignment.objects.filter(factor=self.factor).values_list('user_id', 'role'))
+        self.assertEqual(roles, {'940001': 'editor', '940003': 'comentador', '940004': 'lector'})
+        self.assertEqual(ProjectAssignment.objects.get(project=self.project).role, 'editor')
+        schedule.assert_any_call('carpeta1', {'mini.import@gmail.com': 'editor'})
+        schedule.assert_any_call('doc1', {'import1@gmail.com': 'editor', 'import2@gmail.com': None,
+                                          'import3@gmail.com': 'comentador', 'import4@gmail.com': 'lector'})
+        self.assertEqual(schedule.call_count, 2)
+
+    def test_invalid_rows_reject_whole_file(self):
+        from assignments import bulk
+        rows = self._csv([
+            f'940001,factor,{self.factor.pk},lector',
+            f'999999,factor,{self.factor.pk},lector',
+            f'940002,factor,{self.factor.pk},dueño',
+            f'940001,proyecto,{self.project.pk},editor',
+            f'940000,factor,{self.factor.pk},lector',
+            f'940001,factor,{self.factor.pk},editor',
+        ])
+        summary = bulk.import_rows(rows)
+        self.assertEqual([line for line, _ in summary['errores']], [3, 4, 5, 6, 7])
+        self.assertFalse(FactorAssignment.objects.exists())
+
+    def test_dry_run_counts_without_saving(self):
+        from assignments import bulk
+        rows = self._csv([f'940001,factor,{self.factor.pk},lector'])
+        with patch.object(bulk.drive_sync, 'schedule') as schedule:
+            summary = bulk.import_rows(rows, dry_run=True)
+        self.assertEqual(summary['creadas'], 1)
+        self.assertFalse(FactorAssignment.objects.exists())
+        schedule.assert_not_called()
+
+    def test_export_round_trips_through_import(self):
+        import io
+        from assignments import bulk
+        FactorAssignment.objects.create(factor=self.factor, user=self.users[0], role=AssignmentRole.EDITOR)
+        ProjectAssignment.objects.create(project=self.project, user=self.mini, role=AssignmentRole.LECTOR)
+        exported = ''.join(bulk.export_csv())
+        self.assertEqual(exported.splitlines()[0], 'cedula,tipo,id,rol')
+        rows = bulk.parse(io.StringIO(exported))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(len(json.loads(''.join(bulk.export_json()))), 2)
+        self.assertEqual(bulk.import_rows(rows)['sin_cambios'], 2)
+
+    def test_import_view_reports_errors(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from assignments.views import import_assignments
+        admin = User.objects.create_user(
+            cedula='940099', email='admin.import@gmail.com', password='x',
+            first_name='Admin', last_name='Import', rol=LoginRol.SUPERADMIN)
+        upload = SimpleUploadedFile('asignaciones.csv', 'cedula,tipo,id,rol\n999999,factor,x,lector\n'.encode())
+        request = RequestFactory().post('/', {'archivo': upload})
+        request.user = admin
+        response = import_assignments(request)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(json.loads(response.content)['errores']), 2)
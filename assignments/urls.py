@@ -22,4 +22,8 @@ urlpatterns = [
     # Endpoints POST para guardar asignaciones
     path('assign/project-to-miniadmin/', views.assign_project_to_mini_admin, name='assign_project_to_mini_admin'),
     path('assign/factor-to-user/', views.assign_factor_to_user, name='assign_factor_to_user'),
+
+    # Importación / exportación masiva (SuperAdmin/Akadi)
+    path('bulk/import/', views.import_assignments, name='import_assignments'),
+    path('bulk/export/', views.export_assignments, name='export_assignments'),
 ]
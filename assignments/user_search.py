@@ -0,0 +1,83 @@
+# assignments/user_search.py
+"""
+Búsqueda paginada de usuarios para los selectores de asignaciones.
+
+El filtro por prefijo es core.user_search.matching. La paginación
+es por cursor sobre (first_name, last_name, cedula), así que cada página
+cuesta lo mismo sin importar cuántas cuentas haya antes. Las páginas se
+guardan en caché SEARCH_CACHE_TTL segundos.
+"""
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from core.user_search import matching
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+SEARCH_CACHE_TTL = getattr(settings, 'ASSIGNMENTS_SEARCH_CACHE_TTL', 30)
+ORDERING = ('first_name', 'last_name', 'cedula')
+
+
+class InvalidCursor(ValueError):
+    """El cursor recibido no es uno emitido por `page()`."""
+
+
+def encode_cursor(user):
+    raw = json.dumps([getattr(user, field) for field in ORDERING]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(str(exc)) from exc
+    if not (isinstance(values, list) and len(values) == len(ORDERING) and all(isinstance(v, str) for v in values)):
+        raise InvalidCursor('Cursor con formato inesperado.')
+    return values
+
+
+def _after(values):
+    """Q de las filas que van después de *values* en ORDERING."""
+    first_name, last_name, cedula = values
+    return (Q(first_name__gt=first_name)
+            | Q(first_name=first_name, last_name__gt=last_name)
+            | Q(first_name=first_name, last_name=last_name, cedula__gt=cedula))
+
+
+def page(queryset, query='', cursor=None, limit=PAGE_SIZE):
+    """{'results': [...], 'next': cursor o None} con hasta *limit* usuarios."""
+    queryset = matching(queryset, query).order_by(*ORDERING)
+    if cursor:
+        queryset = queryset.filter(_after(decode_cursor(cursor)))
+    users = list(queryset.only(*ORDERING, 'email')[:limit + 1])
+    more = len(users) > limit
+    users = users[:limit]
+    return {
+        'results': [{'id': u.cedula, 'name': u.get_full_name, 'email': u.email} for u in users],
+        'next': encode_cursor(users[-1]) if more else None,
+    }
+
+
+def parse_limit(value):
+    try:
+        return min(max(int(value), 1), MAX_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return PAGE_SIZE
+
+
+def cached_page(scope, queryset, query='', cursor=None, limit=PAGE_SIZE):
+    """`page()` con caché; *scope* distingue los conjuntos de usuarios buscados."""
+    query = ' '.join((query or '').lower().split())
+    digest = hashlib.sha1(f"{query}\x00{cursor or ''}\x00{limit}".encode()).hexdigest()
+    key = f"assignments:user_search:{scope}:{digest}"
+    data = cache.get(key)
+    if data is None:
+        data = page(queryset, query, cursor, limit)
+        cache.set(key, data, SEARCH_CACHE_TTL)
+    return data
@@ -5,22 +5,18 @@ import logging
 
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import JsonResponse, HttpResponseForbidden, HttpResponseBadRequest
+from django.http import Http404, JsonResponse, HttpResponseForbidden, HttpResponseBadRequest, StreamingHttpResponse
 from django.db import transaction
 from django.conf import settings
 from django.contrib import messages # Para mensajes al usuario
-
-from googleapiclient.errors import HttpError
+from django.utils import timezone
 
 # Asegúrate que Project y Factor están correctamente importados
 from projects.models import Project 
 from factorManager.models import Factor # Si se usa en otras partes de este archivo
 
-# Importa _drive_service desde projects.models o donde esté definido centralmente
-# para asegurar que usas la misma instancia/configuración.
-from projects.models import _drive_service as get_drive_service 
-
-from .models import ProjectAssignment, FactorAssignment, AssignmentRole
+from .models import ProjectAssignment, FactorAssignment, AssignmentRole, EXCLUDED_FACTOR_ROLES
+from . import bulk, drive_sync, user_search
 from login.models import Rol, User # User es settings.AUTH_USER_MODEL
 
 logger = logging.getLogger(__name__)
@@ -84,13 +80,14 @@ def api_projects_for_mini_admin_factor_assignment(request):
 @user_passes_test(is_super_admin_or_akadi) # Solo SuperAdmin/Akadi asignan proyectos a MiniAdmins
 def api_mini_admin_users(request):
     """
-    Devuelve una lista de usuarios que son MiniAdmin.
+    Busca MiniAdmins activos (?q=texto&cursor=...&limit=...).
     Usado por SuperAdmin/Akadi para seleccionar a quién asignar un proyecto.
     """
     try:
-        minis = User.objects.filter(rol=Rol.MINIADMIN, is_active=True).order_by('first_name', 'last_name')
-        data = [{'id': u.cedula, 'name': u.get_full_name} for u in minis]
-        return JsonResponse(data, safe=False)
+        minis = User.objects.filter(rol=Rol.MINIADMIN, is_active=True)
+        return JsonResponse(_user_search_page(request, 'miniadmins', minis))
+    except user_search.InvalidCursor:
+        return JsonResponse({'error': 'Cursor inválido'}, status=400)
     except Exception as e:
         logger.error(f"Error en api_mini_admin_users: {e}\n{traceback.format_exc()}")
         return JsonResponse({'error': 'Error cargando MiniAdmins'}, status=500)
@@ -100,19 +97,28 @@ def api_mini_admin_users(request):
 @user_passes_test(is_super_admin_akadi_or_mini_admin)
 def api_assignable_users_for_factor(request):
     """
-    Devuelve usuarios a los que se les puede asignar un Factor.
-    Excluye SuperAdmins, MiniAdmins y Akadi.
+    Busca usuarios a los que se les puede asignar un Factor
+    (?q=texto&cursor=...&limit=...). Excluye SuperAdmins, MiniAdmins y Akadi.
     """
     try:
-        excluded_roles = [Rol.SUPERADMIN, Rol.MINIADMIN, Rol.ACADI]
-        users = User.objects.filter(is_active=True).exclude(rol__in=excluded_roles).order_by('first_name', 'last_name')
-        data = [{'id': u.cedula, 'name': u.get_full_name} for u in users]
-        return JsonResponse(data, safe=False)
+        users = User.objects.filter(is_active=True).exclude(rol__in=EXCLUDED_FACTOR_ROLES)
+        return JsonResponse(_user_search_page(request, 'factor', users))
+    except user_search.InvalidCursor:
+        return JsonResponse({'error': 'Cursor inválido'}, status=400)
     except Exception as e:
         logger.error(f"Error en api_assignable_users_for_factor: {e}\n{traceback.format_exc()}")
         return JsonResponse({'error': 'Error cargando usuarios asignables'}, status=500)
 
 
+def _user_search_page(request, scope, queryset):
+    return user_search.cached_page(
+        scope, queryset,
+        query=request.GET.get('q', ''),
+        cursor=request.GET.get('cursor') or None,
+        limit=user_search.parse_limit(request.GET.get('limit')),
+    )
+
+
 @login_required
 @user_passes_test(is_super_admin_akadi_or_mini_admin)
 def api_factors_for_assignment(request, project_id):
@@ -150,7 +156,7 @@ def api_project_assignments_for_project(request, project_id):
     project = get_object_or_404(Project, id_project=project_id)
     # Solo mostrar asignaciones de MiniAdmins para este proyecto
     assignments = ProjectAssignment.objects.filter(project=project, user__rol=Rol.MINIADMIN).select_related('user')
-    data = [{'user_id': a.user.cedula, 'role': a.role} for a in assignments]
+    data = [{'user_id': a.user.cedula, 'name': a.user.get_full_name, 'role': a.role} for a in assignments]
     return JsonResponse(data, safe=False)
 
 
@@ -161,7 +167,7 @@ def api_factor_assignments_for_factor(request, factor_id):
     factor = get_object_or_404(Factor, id_factor=factor_id)
     excluded_roles = [Rol.SUPERADMIN, Rol.MINIADMIN, Rol.ACADI]
     assignments = FactorAssignment.objects.filter(factor=factor).exclude(user__rol__in=excluded_roles).select_related('user')
-    data = [{'user_id': a.user.cedula, 'role': a.role} for a in assignments]
+    data = [{'user_id': a.user.cedula, 'name': a.user.get_full_name, 'role': a.role} for a in assignments]
     return JsonResponse(data, safe=False)
 
 # --- Vista Principal de Asignaciones ---
@@ -176,64 +182,6 @@ def assignments_page(request):
 
 # --- Lógica de Asignación (POST) ---
 
-def _update_drive_permission(drive_service, file_id, user_email, new_app_role_str, current_drive_permissions_map):
-    """
-    Actualiza o crea un permiso en Google Drive para un usuario y archivo/carpeta dados.
-    Si new_app_role_str es None o no mapea a un rol de Drive, elimina el permiso existente.
-    """
-    google_role_map = {
-        AssignmentRole.LECTOR: 'reader',
-        AssignmentRole.COMENTADOR: 'commenter',
-        AssignmentRole.EDITOR: 'writer',
-    }
-    target_google_role = google_role_map.get(new_app_role_str) if new_app_role_str else None
-    user_email_lower = user_email.lower()
-    existing_perm_details = current_drive_permissions_map.get(user_email_lower)
-
-    logger.info(f"Drive Update: FileID='{file_id}', User='{user_email}', AppRole='{new_app_role_str}', TargetDriveRole='{target_google_role}', ExistingPerm='{bool(existing_perm_details)}'")
-
-    if not target_google_role: # Intención de remover el permiso o rol no válido
-        if existing_perm_details:
-            logger.info(f"Drive: Intentando eliminar permiso para '{user_email_lower}' en FileID '{file_id}' (PermID: {existing_perm_details['id']})")
-            try:
-                drive_service.permissions().delete(fileId=file_id, permissionId=existing_perm_details['id']).execute()
-                logger.info(f"Drive: Permiso eliminado para '{user_email_lower}' en FileID '{file_id}'.")
-            except HttpError as e:
-                logger.error(f"Drive: ERROR al eliminar permiso para '{user_email_lower}' en FileID '{file_id}'. Código: {e.resp.status}, Razón: {e._get_reason()}")
-        else:
-            logger.info(f"Drive: No se encontró permiso existente para '{user_email_lower}' en FileID '{file_id}' para eliminar.")
-        return
-
-    # Si llegamos aquí, target_google_role es válido (reader, commenter, o writer)
-    if existing_perm_details:
-        if existing_perm_details.get('role') != target_google_role:
-            logger.info(f"Drive: Intentando actualizar permiso para '{user_email_lower}' en FileID '{file_id}' de '{existing_perm_details.get('role')}' a '{target_google_role}' (PermID: {existing_perm_details['id']})")
-            try:
-                drive_service.permissions().update(
-                    fileId=file_id,
-                    permissionId=existing_perm_details['id'],
-                    body={'role': target_google_role},
-                    # transferOwnership=False # Es buena práctica incluirlo si no se pretende transferir
-                ).execute()
-                logger.info(f"Drive: Permiso actualizado para '{user_email_lower}' en FileID '{file_id}'.")
-            except HttpError as e:
-                logger.error(f"Drive: ERROR al actualizar permiso para '{user_email_lower}' en FileID '{file_id}'. Código: {e.resp.status}, Razón: {e._get_reason()}")
-        else:
-            logger.info(f"Drive: Permiso para '{user_email_lower}' en FileID '{file_id}' ya está correcto ('{target_google_role}'). No se necesita acción.")
-    else:
-        logger.info(f"Drive: Intentando crear permiso para '{user_email_lower}' en FileID '{file_id}' con rol '{target_google_role}'.")
-        try:
-            drive_service.permissions().create(
-                fileId=file_id,
-                body={'type': 'user', 'role': target_google_role, 'emailAddress': user_email}, # Usar el email original, no lowercased, para la creación
-                sendNotificationEmail=False
-            ).execute()
-            logger.info(f"Drive: Permiso creado para '{user_email_lower}' en FileID '{file_id}'.")
-        except HttpError as e:
-            logger.error(f"Drive: ERROR al crear permiso para '{user_email_lower}' en FileID '{file_id}'. Código: {e.resp.status}, Razón: {e._get_reason()}")
-
-
-
 @login_required
 @user_passes_test(is_super_admin_or_akadi) 
 @transaction.atomic
@@ -255,38 +203,11 @@ def assign_project_to_mini_admin(request):
     project = get_object_or_404(Project, id_project=project_id)
     logger.info(f"Iniciando asignación de proyecto '{project.name}' (ID: {project_id}) a MiniAdmins.")
 
-    drive_service = None
-    current_drive_permissions_map = {}
-    drive_sync_failed_globally = False
-
-    if project.folder_id:
-        try:
-            drive_service = get_drive_service()
-            perms_result = drive_service.permissions().list(
-                fileId=project.folder_id, 
-                fields='permissions(id,emailAddress,role)' # Solo los campos necesarios
-            ).execute()
-            # El email de Drive puede tener mayúsculas/minúsculas distintas al de la BD, normalizar a minúsculas para la clave del mapa.
-            current_drive_permissions_map = {
-                p['emailAddress'].lower(): p for p in perms_result.get('permissions', [])
-                if p.get('emailAddress') # Asegurarse que hay emailAddress
-            }
-            logger.info(f"Drive: Permisos actuales para carpeta '{project.name}' (FolderID: {project.folder_id}): {list(current_drive_permissions_map.keys())}")
-        except HttpError as e:
-            logger.error(f"Drive: FATAL - No se pudieron obtener permisos para carpeta '{project.name}' (FolderID: {project.folder_id}). Código: {e.resp.status}, Razón: {e._get_reason()}. La sincronización de Drive se omitirá.")
-            drive_service = None # Deshabilitar operaciones de Drive si no se pueden leer los permisos
-            drive_sync_failed_globally = True
-            messages.error(request, f"CRÍTICO: No se pudo conectar con Google Drive para obtener permisos de la carpeta del proyecto '{project.name}'. Los cambios de permisos en Drive no se aplicarán.")
-        except Exception as e:
-            logger.error(f"Drive: FATAL - Excepción inesperada obteniendo permisos para carpeta '{project.name}' (FolderID: {project.folder_id}): {e}. La sincronización de Drive se omitirá.")
-            drive_service = None
-            drive_sync_failed_globally = True
-            messages.error(request, f"CRÍTICO: Error inesperado con Google Drive para el proyecto '{project.name}'. Los cambios de permisos en Drive no se aplicarán.")
-    else:
+    if not project.folder_id:
         logger.warning(f"Proyecto '{project.name}' (ID: {project_id}) no tiene folder_id. No se sincronizarán permisos de Drive.")
-        # No es un error fatal si el proyecto no tiene carpeta, pero se debe notificar.
-        messages.info(request, f"El proyecto '{project.name}' no tiene una carpeta de Google Drive asociada. No se aplicaron cambios de permisos en Drive.")
 
+    # Estado deseado en Drive (email → rol o None); se aplica tras el commit (ver drive_sync)
+    drive_changes = {}
 
     # IDs de MiniAdmins que actualmente tienen una asignación a este proyecto en la BD
     current_bd_miniadmin_assignments = ProjectAssignment.objects.filter(
@@ -325,8 +246,7 @@ def assign_project_to_mini_admin(request):
             deleted_count, _ = ProjectAssignment.objects.filter(project=project, user=mini_admin_user).delete()
             if deleted_count:
                  logger.info(f"BD: Asignación eliminada para MiniAdmin '{mini_admin_user.email}'.")
-            if drive_service and project.folder_id:
-                _update_drive_permission(drive_service, project.folder_id, mini_admin_user.email, None, current_drive_permissions_map)
+            drive_changes[mini_admin_user.email] = None
         else: # Crear o actualizar asignación
             ProjectAssignment.objects.update_or_create(
                 project=project,
@@ -334,8 +254,7 @@ def assign_project_to_mini_admin(request):
                 defaults={'role': role_str}
             )
             logger.info(f"BD: Rol '{role_str}' asignado/actualizado para MiniAdmin '{mini_admin_user.email}' en proyecto '{project.name}'.")
-            if drive_service and project.folder_id:
-                _update_drive_permission(drive_service, project.folder_id, mini_admin_user.email, role_str, current_drive_permissions_map)
+            drive_changes[mini_admin_user.email] = role_str
 
     # 2. MiniAdmins que estaban en la BD pero no vinieron en el payload (significa que fueron deseleccionados completamente)
     #    y por lo tanto deben ser desasignados.
@@ -348,19 +267,17 @@ def assign_project_to_mini_admin(request):
             user_email_to_remove = assignment_to_delete.user.email
             logger.info(f"BD: MiniAdmin '{user_email_to_remove}' no presente en payload, eliminando asignación del proyecto '{project.name}'.")
             assignment_to_delete.delete()
-            if drive_service and project.folder_id:
-                _update_drive_permission(drive_service, project.folder_id, user_email_to_remove, None, current_drive_permissions_map)
+            drive_changes[user_email_to_remove] = None
     
     # Devolver el estado actual de asignaciones de MiniAdmins para este proyecto
     final_assignments = ProjectAssignment.objects.filter(project=project, user__rol=Rol.MINIADMIN).select_related('user')
     result_data = [{'user_id': pa.user.cedula, 'role': pa.role} for pa in final_assignments]
     
-    if drive_sync_failed_globally:
-        messages.warning(request, f"Las asignaciones del proyecto '{project.name}' se guardaron en la base de datos, pero hubo un problema crítico sincronizando con Google Drive.")
-    elif not project.folder_id:
+    if not project.folder_id:
          messages.info(request, f"Las asignaciones del proyecto '{project.name}' se guardaron. Este proyecto no tiene carpeta en Drive, por lo que no se sincronizaron permisos allí.")
     else:
-        messages.success(request, f"Asignaciones del proyecto '{project.name}' actualizadas y sincronizadas con Google Drive.")
+        drive_sync.schedule(project.folder_id, drive_changes)
+        messages.success(request, f"Asignaciones del proyecto '{project.name}' actualizadas. Los permisos de Google Drive se sincronizarán en segundo plano.")
         
     return JsonResponse({'status': 'ok', 'assignments': result_data})
 
@@ -392,74 +309,107 @@ def assign_factor_to_user(request):
         except ProjectAssignment.DoesNotExist:
             return JsonResponse({'error': 'No tienes asignación a este proyecto para gestionar sus factores.'}, status=403)
 
-    # --- Sincronización con Google Drive ---
-    drive = None
-    current_drive_permissions = {}
-    if factor.document_id:
-        try:
-            drive = get_drive_service()
-            perms_result = drive.permissions().list(fileId=factor.document_id, fields='permissions(id,emailAddress,role)').execute()
-            current_drive_permissions = {p['emailAddress'].lower(): p for p in perms_result.get('permissions', [])}
-        except Exception as e:
-            logger.error(f"Error obteniendo permisos de Drive para documento {factor.document_id}: {e}")
-            drive = None
-            messages.warning(request, "Hubo un error conectando con Google Drive. Los permisos de Drive no se sincronizaron.")
-            
-    # --- Actualizar BD ---
-    current_assigned_users_in_payload = {assign['user_id'] for assign in assignments_data if assign.get('role')}
-    
-    # 1. Eliminar asignaciones de usuarios que ya no están o cuyo rol es vacío
-    assignments_to_delete = FactorAssignment.objects.filter(factor=factor).exclude(user_id__in=current_assigned_users_in_payload)
-    if not drive: # Si no hay conexión a Drive, no intentar borrar permisos de Drive
-        assignments_to_delete.delete()
-    else:
-        for assign_del in assignments_to_delete:
-            user_email = assign_del.user.email.lower()
-            existing_perm = current_drive_permissions.get(user_email)
-            if existing_perm:
-                try:
-                    drive.permissions().delete(fileId=factor.document_id, permissionId=existing_perm['id']).execute()
-                except HttpError as e:
-                    logger.warning(f"Drive: No se pudo eliminar permiso para {user_email} en {factor.document_id}: {e}")
-            assign_del.delete()
-
-    # 2. Crear o actualizar asignaciones
-    for assignment_item in assignments_data:
-        user_id = assignment_item.get('user_id')
-        role_str = assignment_item.get('role')
-
-        if not user_id:
+    # --- Actualizar BD (operaciones de conjunto: consultas constantes sin importar el tamaño del lote) ---
+    # Rol pedido por cédula; '' significa quitar la asignación
+    payload_roles = {
+        item['user_id']: item.get('role') or ''
+        for item in assignments_data
+        if item.get('user_id')
+    }
+    users = User.objects.in_bulk(list(payload_roles), field_name='cedula')
+    missing = set(payload_roles) - set(users)
+    if missing:
+        raise Http404(f"Usuarios no encontrados: {', '.join(sorted(missing))}")
+
+    current = {
+        assignment.user_id: assignment
+        for assignment in FactorAssignment.objects.filter(factor=factor).select_related('user')
+    }
+
+    desired = {}
+    for cedula, role_str in payload_roles.items():
+        if not role_str:
             continue
-        
         # Asegurarse de no asignar a roles administrativos
-        excluded_roles = [Rol.SUPERADMIN, Rol.MINIADMIN, Rol.ACADI]
-        assigned_user = get_object_or_404(User, cedula=user_id)
-        if assigned_user.rol in excluded_roles:
-            logger.warning(f"Intento de asignar factor a usuario con rol administrativo: {assigned_user.cedula} ({assigned_user.rol})")
-            continue
-
-
-        if not role_str: # Si el rol es vacío, es como quitar el permiso
-            assignment_instance = FactorAssignment.objects.filter(factor=factor, user=assigned_user).first()
-            if assignment_instance:
-                if drive and factor.document_id:
-                    _update_drive_permission(drive, factor.document_id, assigned_user.email, None, current_drive_permissions)
-                assignment_instance.delete()
+        if users[cedula].rol in EXCLUDED_FACTOR_ROLES:
+            logger.warning(f"Intento de asignar factor a usuario con rol administrativo: {cedula} ({users[cedula].rol})")
             continue
-
         if role_str not in AssignmentRole.values:
-            logger.warning(f"Rol inválido '{role_str}' para usuario {user_id} en factor {factor_id}")
+            logger.warning(f"Rol inválido '{role_str}' para usuario {cedula} en factor {factor_id}")
             continue
+        desired[cedula] = role_str
+
+    # Se conservan sin cambios las asignaciones de quienes vinieron con un rol omitido (inválido o administrativo)
+    kept = {cedula for cedula, role_str in payload_roles.items() if role_str}
+    to_delete = [assignment for cedula, assignment in current.items() if cedula not in kept]
+    to_create = [
+        FactorAssignment(factor=factor, user=users[cedula], role=role_str)
+        for cedula, role_str in desired.items() if cedula not in current
+    ]
+    to_update = []
+    for cedula, role_str in desired.items():
+        assignment = current.get(cedula)
+        if assignment is not None and assignment.role != role_str:
+            assignment.role = role_str
+            to_update.append(assignment)
+
+    if to_delete:
+        FactorAssignment.objects.filter(pk__in=[a.pk for a in to_delete]).delete()
+    FactorAssignment.objects.bulk_create(to_create)
+    FactorAssignment.objects.bulk_update(to_update, ['role'])
+    if to_create or to_update:
+        # bulk_create/bulk_update no emiten post_save: se toca el proyecto a mano (ver core.signals)
+        Project.objects.filter(factors=factor.pk).update(updated_at=timezone.now())
+    logger.info(f"BD: Factor '{factor_id}': {len(to_create)} creadas, {len(to_update)} actualizadas, {len(to_delete)} eliminadas.")
+
+    # Permisos de Drive: se reconcilian en lote tras el commit, sin bloquear la transacción
+    if factor.document_id:
+        drive_changes = {assignment.user.email: None for assignment in to_delete}
+        drive_changes.update({users[cedula].email: role_str for cedula, role_str in desired.items()})
+        drive_sync.schedule(factor.document_id, drive_changes)
 
-        assignment, created = FactorAssignment.objects.update_or_create(
-            factor=factor,
-            user=assigned_user,
-            defaults={'role': role_str}
-        )
-        
-        if drive and factor.document_id:
-            _update_drive_permission(drive, factor.document_id, assigned_user.email, role_str, current_drive_permissions)
-
-    final_assignments = FactorAssignment.objects.filter(factor=factor).exclude(user__rol__in=excluded_roles).select_related('user')
+    final_assignments = FactorAssignment.objects.filter(factor=factor).exclude(user__rol__in=EXCLUDED_FACTOR_ROLES).select_related('user')
     result_data = [{'user_id': pa.user.cedula, 'role': pa.role} for pa in final_assignments]
     return JsonResponse({'status': 'ok', 'assignments': result_data})
+
+
+# --- Importación / exportación masiva ---
+
+@login_required
+@user_passes_test(is_super_admin_or_akadi)
+def import_assignments(request):
+    """
+    Importa asignaciones desde un CSV o JSON (campo 'archivo'; ver
+    assignments.bulk). Con dry_run=1 solo valida y cuenta los cambios.
+    """
+    if request.method != 'POST':
+        return HttpResponseForbidden("Método no permitido.")
+    uploaded = request.FILES.get('archivo')
+    if not uploaded:
+        return HttpResponseBadRequest("Falta el archivo.")
+    fmt = request.POST.get('formato') or ('json' if uploaded.name.lower().endswith('.json') else 'csv')
+    try:
+        rows = bulk.read_upload(uploaded.file, fmt)
+    except (bulk.ImportFormatError, UnicodeDecodeError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    summary = bulk.import_rows(rows, dry_run=request.POST.get('dry_run') in ('1', 'true'))
+    if summary['errores']:
+        summary['errores'] = [{'linea': line, 'error': msg} for line, msg in summary['errores']]
+        return JsonResponse(summary, status=400)
+    logger.info(f"Importación masiva por '{request.user.cedula}': {summary}")
+    return JsonResponse(summary)
+
+
+@login_required
+@user_passes_test(is_super_admin_or_akadi)
+def export_assignments(request):
+    """Descarga la matriz completa de asignaciones (?formato=csv|json)."""
+    if request.GET.get('formato') == 'json':
+        response = StreamingHttpResponse(bulk.export_json(), content_type='application/json')
+        filename = 'asignaciones.json'
+    else:
+        response = StreamingHttpResponse(bulk.export_csv(), content_type='text/csv; charset=utf-8')
+        filename = 'asignaciones.csv'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
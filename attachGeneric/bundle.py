@@ -0,0 +1,212 @@
+# attachGeneric/bundle.py
+"""
+Descarga en un solo ZIP de todos los adjuntos de una característica,
+factor o proyecto.
+
+El ZIP se escribe sobre un destino no buscable (zipfile usa entonces
+descriptores de datos) y cada bloque comprimido se entrega de inmediato
+al StreamingHttpResponse. Los archivos se descargan de Drive (o se leen
+de `archivo`) en hilos, como máximo BUNDLE_WORKERS a la vez; cada hilo
+deja sus bloques en una cola acotada, así que la memoria queda limitada
+a BUNDLE_WORKERS * PREFETCH_CHUNKS bloques sin importar el tamaño de la
+evidencia.
+"""
+import io
+import logging
+import queue
+import re
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+
+from database.models import File
+from traitManager.models import Trait
+
+try:
+    from factorManager.models import _drive_service
+    from googleapiclient.http import MediaIoBaseDownload
+except ImportError:  # pragma: no cover - sin cliente de Drive solo se empaquetan archivos locales
+    _drive_service = None
+    MediaIoBaseDownload = None
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_WORKERS = getattr(settings, 'ATTACH_BUNDLE_WORKERS', 4)
+CHUNK_SIZE = 1024 * 1024
+PREFETCH_CHUNKS = 4
+_PUT_TIMEOUT = 1.0
+_END = object()
+_UNSAFE = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
+
+_thread_state = threading.local()
+
+
+class BundleCancelled(Exception):
+    """El cliente abandonó la descarga: los hilos productores se detienen."""
+
+
+def traits_for(scope, obj):
+    """Características incluidas en el ZIP de *obj* (trait, factor o project)."""
+    if scope == 'trait':
+        return Trait.objects.filter(pk=obj.pk)
+    if scope == 'factor':
+        return Trait.objects.filter(factor=obj)
+    return Trait.objects.filter(factor__project=obj)
+
+
+def attachments_for(traits):
+    """Adjuntos de las características dadas, ordenados por ruta dentro del ZIP."""
+    traits = {str(t.pk): t for t in traits.select_related('factor')}
+    files = File.objects.filter(
+        content_type=ContentType.objects.get_for_model(Trait),
+        object_id__in=list(traits),
+        status='activo',
+    ).order_by('object_id', 'name')
+    return [(traits[f.object_id], f) for f in files]
+
+
+def _safe(name):
+    return _UNSAFE.sub('_', name or '').strip() or 'sin_nombre'
+
+
+def archive_names(entries, scope):
+    """Rutas únicas dentro del ZIP: [factor/]característica/nombre.tipo."""
+    used, names = {}, []
+    for trait, f in entries:
+        parts = [_safe(trait.name), f"{_safe(f.name)}.{_safe(f.type)}"]
+        if scope == 'project':
+            parts.insert(0, _safe(trait.factor.name))
+        path = '/'.join(parts)
+        count = used.get(path, 0)
+        used[path] = count + 1
+        if count:
+            stem, dot, ext = path.rpartition('.')
+            path = f"{stem} ({count + 1}).{ext}" if dot else f"{path} ({count + 1})"
+        names.append(path)
+    return names
+
+
+class _QueueWriter(io.RawIOBase):
+    """Destino de MediaIoBaseDownload que pasa cada bloque a la cola."""
+
+    def __init__(self, put):
+        self._put = put
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._put(bytes(data))
+        return len(data)
+
+
+def _thread_drive():
+    if getattr(_thread_state, 'drive', None) is None:
+        _thread_state.drive = _drive_service()
+    return _thread_state.drive
+
+
+def _produce(file_instance, chunks, cancelled):
+    """Hilo productor: deja los bloques de *file_instance* en *chunks*."""
+
+    def put(item):
+        while not cancelled.is_set():
+            try:
+                chunks.put(item, timeout=_PUT_TIMEOUT)
+                return
+            except queue.Full:
+                continue
+        raise BundleCancelled()
+
+    try:
+        drive_id = file_instance.drive_file_id or File.drive_id_from_link(file_instance.drive_link)
+        if file_instance.archivo:
+            with file_instance.archivo.open('rb') as fh:
+                for block in iter(lambda: fh.read(CHUNK_SIZE), b''):
+                    put(block)
+        elif drive_id and _drive_service and MediaIoBaseDownload:
+            request = _thread_drive().files().get_media(fileId=drive_id)
+            downloader = MediaIoBaseDownload(_QueueWriter(put), request, chunksize=CHUNK_SIZE)
+            done = False
+            while not done:
+                _, done = downloader.next_chunk(num_retries=3)
+        else:
+            raise FileNotFoundError('El adjunto no tiene archivo local ni id de Drive.')
+        put(_END)
+    except BundleCancelled:
+        pass
+    except Exception as exc:
+        logger.error(f"ZIP_ADJUNTOS: Error al leer '{file_instance.pk}': {exc}", exc_info=True)
+        try:
+            put(exc)
+        except BundleCancelled:
+            pass
+
+
+class _Sink(io.RawIOBase):
+    """Destino no buscable del ZipFile: acumula lo escrito hasta que se entrega."""
+
+    def __init__(self):
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data, self._parts = b''.join(self._parts), []
+        return data
+
+
+def stream_zip(entries, names, workers=None):
+    """
+    Generador de bytes del ZIP. Los adjuntos que no se pudieron leer se
+    listan en ERRORES.txt al final del archivo.
+    """
+    workers = max(1, workers or BUNDLE_WORKERS)
+    cancelled = threading.Event()
+    sink = _Sink()
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='zip-adjuntos')
+    pending = []
+
+    def schedule(index):
+        chunks = queue.Queue(maxsize=PREFETCH_CHUNKS)
+        pool.submit(_produce, entries[index][1], chunks, cancelled)
+        pending.append(chunks)
+
+    errors = []
+    try:
+        for index in range(min(workers, len(entries))):
+            schedule(index)
+        with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+            for index, name in enumerate(names):
+                chunks = pending.pop(0)
+                with archive.open(name, 'w', force_zip64=True) as member:
+                    while True:
+                        item = chunks.get()
+                        if item is _END:
+                            break
+                        if isinstance(item, Exception):
+                            errors.append(f"{name}: {item}")
+                            break
+                        member.write(item)
+                        data = sink.drain()
+                        if data:
+                            yield data
+                # El hueco del archivo terminado lo ocupa el siguiente en la fila
+                if index + workers < len(entries):
+                    schedule(index + workers)
+            if errors:
+                archive.writestr('ERRORES.txt', '\n'.join(errors) + '\n')
+        data = sink.drain()
+        if data:
+            yield data
+    finally:
+        cancelled.set()
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,66 @@
+# attachGeneric/dedup.py
+"""
+Deduplicación de adjuntos por contenido.
+
+Cada archivo se resume con SHA-256 leyéndolo por bloques (memoria
+acotada, sin importar su tamaño). Si el resumen ya está en
+StoredContent se reutiliza ese archivo de Drive: no se sube de nuevo ni
+se vuelven a otorgar permisos, solo se crea el File con la relación
+genérica.
+"""
+import hashlib
+
+from database.models import File
+from .models import StoredContent
+
+BLOCK_SIZE = 64 * 1024
+
+
+def digest(fileobj):
+    """SHA-256 (hex) y tamaño de un UploadedFile o archivo abierto."""
+    sha, size = hashlib.sha256(), 0
+    fileobj.seek(0)
+    if hasattr(fileobj, 'chunks'):
+        blocks = fileobj.chunks(BLOCK_SIZE)
+    else:
+        blocks = iter(lambda: fileobj.read(BLOCK_SIZE), b'')
+    for block in blocks:
+        sha.update(block)
+        size += len(block)
+    fileobj.seek(0)
+    return sha.hexdigest(), size
+
+
+def lookup(digests):
+    """{sha256: StoredContent} de los resúmenes ya conocidos (una consulta)."""
+    return StoredContent.objects.in_bulk(list(set(digests)))
+
+
+def remember(entries):
+    """
+    Registra contenido recién subido. *entries* es una lista de
+    (sha256, size, drive_file_id, drive_link). Si otra petición registró el
+    mismo resumen en paralelo, se conserva la primera.
+    """
+    StoredContent.objects.bulk_create(
+        [StoredContent(sha256=sha, size=size, drive_file_id=file_id, drive_link=link)
+         for sha, size, file_id, link in entries],
+        ignore_conflicts=True,
+    )
+
+
+def is_shared(file_instance):
+    """
+    True si otro File apunta al mismo archivo de Drive. Se compara por
+    drive_file_id, igual que la eliminación masiva: el enlace puede variar
+    (/view, /edit, parámetros) para el mismo archivo.
+    """
+    drive_file_id = file_instance.drive_file_id or File.drive_id_from_link(file_instance.drive_link)
+    if not drive_file_id:
+        return False
+    return File.objects.filter(drive_file_id=drive_file_id).exclude(pk=file_instance.pk).exists()
+
+
+def forget(drive_file_ids):
+    """Quita del índice el contenido cuyos archivos de Drive se eliminaron."""
+    StoredContent.objects.filter(drive_file_id__in=list(drive_file_ids)).delete()
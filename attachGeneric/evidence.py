@@ -0,0 +1,274 @@
+# attachGeneric/evidence.py
+"""
+Extracción e indexación del contenido de los adjuntos de características.
+
+- PDF: texto de cada página (requiere pypdf; sin él los PDF quedan con
+  estado 'error' y se reintentan con `indexar_evidencias --reintentar`).
+- ZIP: nombres de los miembros, leídos del directorio central sin
+  descomprimir nada.
+
+El texto se guarda en EvidenceText y sus términos normalizados en
+EvidenceTerm (índice invertido). El proceso es incremental: solo toma
+adjuntos sin EvidenceText. Corre en un hilo en segundo plano disparado al
+guardar adjuntos, o con el comando `indexar_evidencias`.
+"""
+import logging
+import re
+import tempfile
+import threading
+import unicodedata
+import zipfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from core.permissions import visible_traits
+from database.models import File
+from traitManager.models import Trait
+from .models import EvidenceTerm, EvidenceText
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pragma: no cover - dependencia opcional
+    PdfReader = None
+
+try:
+    from factorManager.models import _drive_service
+    from googleapiclient.http import MediaIoBaseDownload
+except ImportError:  # pragma: no cover
+    _drive_service = None
+    MediaIoBaseDownload = None
+
+logger = logging.getLogger(__name__)
+
+EXTRACTABLE_TYPES = ('pdf', 'zip')
+MAX_CHARS = getattr(settings, 'EVIDENCE_MAX_CHARS', 500_000)
+MAX_TERMS = 20_000
+MAX_QUERY_TERMS = 8
+SPOOL_SIZE = 8 * 1024 * 1024
+CLAIM_TIMEOUT = timedelta(minutes=15)
+_TERM = re.compile(r'[^\W_]{3,64}')
+
+_wake = threading.Event()
+_worker = None
+_worker_guard = threading.Lock()
+
+
+def normalize(text):
+    """Minúsculas y sin tildes, para que 'Acreditación' coincida con 'acreditacion'."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def terms_of(text, limit=None):
+    """Términos únicos (3+ caracteres) en orden de aparición."""
+    seen = dict.fromkeys(_TERM.findall(normalize(text)))
+    return list(seen)[:limit] if limit else list(seen)
+
+
+def extract_pdf(fh):
+    if PdfReader is None:
+        raise RuntimeError('pypdf no está instalado.')
+    parts, size = [], 0
+    for page in PdfReader(fh).pages:
+        text = page.extract_text() or ''
+        parts.append(text)
+        size += len(text)
+        if size >= MAX_CHARS:
+            break
+    return '\n'.join(parts)[:MAX_CHARS]
+
+
+def list_zip(fh):
+    """Nombres de los miembros del ZIP (solo se lee el directorio central)."""
+    with zipfile.ZipFile(fh) as archive:
+        return '\n'.join(info.filename for info in archive.infolist() if not info.is_dir())[:MAX_CHARS]
+
+
+def _open_source(file_instance, drive):
+    """Archivo buscable con el contenido del adjunto (local o descargado de Drive)."""
+    if file_instance.archivo:
+        return file_instance.archivo.open('rb')
+    drive_id = file_instance.drive_file_id or File.drive_id_from_link(file_instance.drive_link)
+    if not (drive_id and drive and MediaIoBaseDownload):
+        raise FileNotFoundError('El adjunto no tiene archivo local ni id de Drive.')
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    downloader = MediaIoBaseDownload(spool, drive.files().get_media(fileId=drive_id))
+    done = False
+    while not done:
+        _, done = downloader.next_chunk(num_retries=3)
+    spool.seek(0)
+    return spool
+
+
+def extract(file_instance, drive=None):
+    """Texto del adjunto según su tipo."""
+    with _open_source(file_instance, drive) as fh:
+        if file_instance.type == 'zip':
+            return list_zip(fh)
+        return extract_pdf(fh)
+
+
+def pending(retry_errors=False):
+    """Adjuntos de características aún sin procesar (o con error, si se pide)."""
+    qs = File.objects.filter(
+        content_type=ContentType.objects.get_for_model(Trait),
+        type__in=EXTRACTABLE_TYPES,
+    )
+    if retry_errors:
+        return qs.exclude(evidence_text__status__in=['ok', 'vacio'])
+    return qs.filter(evidence_text__isnull=True)
+
+
+def _claim(file_instance):
+    """
+    Marca el adjunto como 'procesando' antes de descargarlo. True si este
+    proceso lo tomó; False si otro indexador (hilo o comando) ya lo tiene.
+    Una marca más vieja que CLAIM_TIMEOUT se considera abandonada.
+    """
+    now = timezone.now()
+    taken = (EvidenceText.objects.filter(file=file_instance)
+             .exclude(status='procesando', extracted_at__gt=now - CLAIM_TIMEOUT)
+             .update(status='procesando', extracted_at=now))
+    if taken:
+        return True
+    try:
+        with transaction.atomic():
+            EvidenceText.objects.create(file=file_instance, trait_id=file_instance.object_id,
+                                        status='procesando')
+    except IntegrityError:
+        return False
+    return True
+
+
+def index_file(file_instance, drive=None):
+    """
+    Extrae e indexa un adjunto. Retorna el EvidenceText resultante, o None
+    si otro proceso lo está indexando en este momento.
+    """
+    if not _claim(file_instance):
+        return None
+    try:
+        content, status, error = extract(file_instance, drive), 'ok', ''
+        if not content.strip():
+            status = 'vacio'
+    except Exception as exc:
+        logger.warning(f"EVIDENCIAS: No se pudo extraer '{file_instance.pk}': {exc}")
+        content, status, error = '', 'error', str(exc)
+
+    with transaction.atomic():
+        document, _ = EvidenceText.objects.update_or_create(
+            file=file_instance,
+            defaults={'trait_id': file_instance.object_id, 'content': content,
+                      'status': status, 'error': error},
+        )
+        document.terms.all().delete()
+        terms = terms_of(f"{file_instance.name} {content}", limit=MAX_TERMS)
+        EvidenceTerm.objects.bulk_create(
+            [EvidenceTerm(term=term, document=document) for term in terms],
+            batch_size=1000, ignore_conflicts=True,
+        )
+    return document
+
+
+def _mark_error(file_instance, exc):
+    EvidenceText.objects.update_or_create(
+        file=file_instance,
+        defaults={'trait_id': file_instance.object_id, 'content': '',
+                  'status': 'error', 'error': str(exc)},
+    )
+
+
+def index_pending(limit=None, retry_errors=False):
+    """
+    Procesa los adjuntos pendientes. Retorna cuántos se procesaron. Un
+    adjunto que falla queda con estado 'error' y no detiene el resto.
+    """
+    files = pending(retry_errors).order_by('pk')
+    if limit:
+        files = files[:limit]
+    drive = None
+    processed = 0
+    for file_instance in files.iterator():
+        if drive is None and _drive_service and not file_instance.archivo:
+            try:
+                drive = _drive_service()
+            except Exception as exc:
+                logger.error(f"EVIDENCIAS: Drive no disponible: {exc}")
+        try:
+            index_file(file_instance, drive)
+        except Exception as exc:
+            logger.error(f"EVIDENCIAS: Error indexando '{file_instance.pk}': {exc}", exc_info=True)
+            _mark_error(file_instance, exc)
+        processed += 1
+    return processed
+
+
+def _work():
+    while True:
+        _wake.wait()
+        _wake.clear()
+        try:
+            index_pending()
+        except Exception:
+            logger.exception("EVIDENCIAS: Error en el indexador")
+        finally:
+            close_old_connections()
+
+
+def schedule():
+    """
+    Despierta al indexador en segundo plano al confirmarse la transacción
+    actual. Con EVIDENCE_INDEX_ASYNC = False no hace nada (se usa el comando).
+    """
+    if not getattr(settings, 'EVIDENCE_INDEX_ASYNC', True):
+        return
+
+    def _start():
+        global _worker
+        with _worker_guard:
+            if _worker is None or not _worker.is_alive():
+                _worker = threading.Thread(target=_work, name='evidence-indexer', daemon=True)
+                _worker.start()
+        _wake.set()
+
+    transaction.on_commit(_start)
+
+
+def _snippet(content, terms, width=160):
+    normalized = normalize(content)
+    positions = [normalized.find(term) for term in terms]
+    start = min((p for p in positions if p >= 0), default=0)
+    start = max(0, start - width // 4)
+    fragment = ' '.join(content[start:start + width].split())
+    return ('…' if start else '') + fragment + ('…' if start + width < len(content) else '')
+
+
+def search(user, query, limit=20):
+    """
+    Adjuntos cuyo contenido tiene todos los términos de *query*, solo de
+    características que *user* puede ver.
+    """
+    terms = terms_of(query, limit=MAX_QUERY_TERMS)
+    if not terms:
+        return []
+    matching = (EvidenceTerm.objects.filter(term__in=terms)
+                .values('document').annotate(hits=Count('term')).filter(hits=len(terms))
+                .values('document'))
+    documents = list(
+        EvidenceText.objects.filter(pk__in=matching, trait_id__in=visible_traits(user).values('pk'))
+        .select_related('file').order_by('-extracted_at')[:limit]
+    )
+    traits = Trait.objects.in_bulk({d.trait_id for d in documents})
+    return [{
+        'id_file': d.file_id,
+        'name': f"{d.file.name}.{d.file.type}",
+        'drive_link': d.file.drive_link,
+        'trait_id': d.trait_id,
+        'trait': traits[d.trait_id].name if d.trait_id in traits else None,
+        'snippet': _snippet(d.content, terms),
+    } for d in documents]
@@ -0,0 +1,36 @@
+# attachGeneric/management/commands/indexar_evidencias.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from attachGeneric import evidence
+
+
+class Command(BaseCommand):
+    help = "Extrae e indexa el texto de los adjuntos (PDF/ZIP) de características que aún no se han procesado."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            help="Máximo de adjuntos a procesar en cada pasada.",
+        )
+        parser.add_argument(
+            "--reintentar",
+            action="store_true",
+            help="Vuelve a procesar también los adjuntos que quedaron con error.",
+        )
+        parser.add_argument(
+            "--loop",
+            type=int,
+            metavar="SEGUNDOS",
+            help="Repite la pasada cada SEGUNDOS segundos (modo worker).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            procesados = evidence.index_pending(limit=options["limit"], retry_errors=options["reintentar"])
+            self.stdout.write(self.style.SUCCESS(f"{procesados} adjunto(s) indexado(s)."))
+            if not options["loop"]:
+                return
+            time.sleep(options["loop"])
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 02:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attachGeneric', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredContent',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('size', models.BigIntegerField()),
+                ('drive_file_id', models.CharField(max_length=128)),
+                ('drive_link', models.URLField(max_length=1024)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-19 02:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attachGeneric', '0002_storedcontent'),
+        ('database', '0003_file_drive_file_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvidenceText',
+            fields=[
+                ('file', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='evidence_text', serialize=False, to='database.file')),
+                ('trait_id', models.CharField(db_index=True, max_length=50)),
+                ('content', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('ok', 'Extraído'), ('vacio', 'Sin texto'), ('error', 'Error')], default='ok', max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('extracted_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EvidenceTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='attachGeneric.evidencetext')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('term', 'document'), name='evidence_term_unique')],
+            },
+        ),
+    ]
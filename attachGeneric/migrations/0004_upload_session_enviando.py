@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 04:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attachGeneric', '0003_evidence_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='uploadsession',
+            name='status',
+            field=models.CharField(choices=[('abierta', 'Abierta'), ('enviando', 'Enviando a Drive'), ('completa', 'Completa'), ('error', 'Error')], default='abierta', max_length=10),
+        ),
+    ]
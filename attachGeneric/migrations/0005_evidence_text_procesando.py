@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attachGeneric', '0004_upload_session_enviando'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='evidencetext',
+            name='status',
+            field=models.CharField(choices=[('procesando', 'En proceso'), ('ok', 'Extraído'), ('vacio', 'Sin texto'), ('error', 'Error')], default='ok', max_length=10),
+        ),
+    ]
@@ -1,3 +1,120 @@
+import os
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+
+
+def upload_tmp_dir():
+    """Carpeta local donde se acumulan los bloques de las subidas en curso."""
+    return getattr(settings, 'ATTACH_UPLOAD_TMP_DIR',
+                   os.path.join(settings.BASE_DIR, 'run_cache', 'subidas'))
+
+
+class UploadSession(models.Model):
+    """
+    Subida por bloques de un adjunto grande. Los bloques se anexan a un
+    archivo temporal en disco; `received` es el último offset confirmado,
+    desde donde se reanuda una subida interrumpida.
+    """
+    STATUS_CHOICES = [
+        ('abierta', 'Abierta'),
+        ('enviando', 'Enviando a Drive'),
+        ('completa', 'Completa'),
+        ('error', 'Error'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                             related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, default='application/octet-stream')
+    total_size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    director_programa = models.CharField(max_length=255)
+    trait_id = models.CharField(max_length=50, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='abierta')
+    file = models.ForeignKey('database.File', null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.total_size})"
+
+    @property
+    def temp_path(self):
+        return os.path.join(upload_tmp_dir(), f"{self.pk}.part")
+
+    @property
+    def is_complete(self):
+        return self.received >= self.total_size
+
+    def discard_temp(self):
+        try:
+            os.remove(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+    @classmethod
+    def purge_stale(cls, hours=24):
+        """Elimina sesiones abiertas sin actividad (y sus temporales)."""
+        limite = timezone.now() - timedelta(hours=hours)
+        for session in cls.objects.filter(status='abierta', updated_at__lt=limite):
+            session.discard_temp()
+            session.delete()
+
+
+class StoredContent(models.Model):
+    """
+    Índice de contenido de los adjuntos: un archivo de Drive por cada
+    sha256 distinto. Los File con el mismo contenido comparten drive_link.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.BigIntegerField()
+    drive_file_id = models.CharField(max_length=128)
+    drive_link = models.URLField(max_length=1024)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes)"
+
+
+class EvidenceText(models.Model):
+    """
+    Texto extraído de un adjunto (PDF) o listado de sus miembros (ZIP).
+    Existir la fila significa que el adjunto ya se procesó, aunque haya
+    fallado: la extracción es incremental y no lo vuelve a intentar.
+    """
+    STATUS_CHOICES = [
+        ('procesando', 'En proceso'),
+        ('ok', 'Extraído'),
+        ('vacio', 'Sin texto'),
+        ('error', 'Error'),
+    ]
+
+    file = models.OneToOneField('database.File', primary_key=True, on_delete=models.CASCADE,
+                                related_name='evidence_text')
+    trait_id = models.CharField(max_length=50, db_index=True)
+    content = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='ok')
+    error = models.TextField(blank=True)
+    extracted_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Texto de {self.file_id} ({self.status})"
+
+
+class EvidenceTerm(models.Model):
+    """
+    Índice invertido: un término normalizado por documento. El índice
+    único (term, document) sirve también para buscar por término.
+    """
+    term = models.CharField(max_length=64)
+    document = models.ForeignKey(EvidenceText, on_delete=models.CASCADE, related_name='terms')
 
-# Create your models here.
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'document'], name='evidence_term_unique'),
+        ]
@@ -1,6 +1,7 @@
 import os
+import json
 
-from django.test import TestCase
+from django.test import RequestFactory, TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -82,4 +83,550 @@ class ViewsTestCase(TestCase):
             'directorPrograma': self.superadmin.first_name
         })
         self.assertEqual(response.status_code, 400)
-        self.assertEqual(response.json()['error'], 'No se recibieron archivos.')
\ No newline at end of file
+        self.assertEqual(response.json()['error'], 'No se recibieron archivos.')
+
+class ParallelUploadTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.director = User.objects.create_user(
+            cedula='111222333', email='dir@gmail.com', password='x',
+            first_name='Dora', last_name='Díaz', rol='superadmin',
+        )
+
+    def _request(self, *nombres, contenido=None):
+        from django.test import RequestFactory
+        archivos = [SimpleUploadedFile(n, contenido or f'%PDF-1.4 {n}'.encode(), content_type='application/pdf')
+                    for n in nombres]
+        request = RequestFactory().post('/attachGeneric/guardar-archivos/', {
+            'archivos': archivos, 'directorPrograma': self.director.cedula,
+        })
+        request.user = self.director
+        return request
+
+    def test_uploads_run_in_pool_and_report_per_file(self):
+        import threading
+        from unittest.mock import MagicMock, patch
+        from attachGeneric import views
+
+        hilos = set()
+
+        def fake_upload(drive, archivo, metadata, fields, mimetype=None):
+            hilos.add(threading.current_thread().name)
+            if archivo.name == 'falla.pdf':
+                raise RuntimeError('cuota excedida')
+            return {'id': f'ID-{archivo.name}', 'webViewLink': f'https://drive/{archivo.name}'}
+
+        with patch.object(views, '_drive_service', return_value=MagicMock()), \
+             patch.object(views, 'get_or_create_drive_folder', return_value='CARPETA'), \
+             patch.object(views.drive_upload, 'upload', side_effect=fake_upload):
+            response = views.guardar_archivos_adjuntos(self._request('a.pdf', 'b.pdf', 'falla.pdf'))
+
+        self.assertEqual(response.status_code, 200)
+        import json
+        files = json.loads(response.content)['files']
+        self.assertEqual([f['name'] for f in files], ['a.pdf', 'b.pdf', 'falla.pdf'])
+        self.assertEqual([f['drive'] for f in files], ['ok', 'ok', 'error'])
+        self.assertEqual(files[0]['drive_link'], 'https://drive/a.pdf')
+        self.assertIn('seconds', files[2])
+        self.assertTrue(all(h.startswith('adjuntos') for h in hilos))
+        self.assertEqual(File.objects.count(), 3)
+        self.assertIsNone(File.objects.get(name='falla').drive_link)
+
+    def test_duplicate_content_reuses_drive_file(self):
+        from unittest.mock import MagicMock, patch
+        from attachGeneric import views
+        from attachGeneric.models import StoredContent
+
+        def fake_upload(drive, archivo, metadata, fields, mimetype=None):
+            return {'id': f'ID-{archivo.name}', 'webViewLink': f'https://drive/{archivo.name}'}
+
+        with patch.object(views, '_drive_service', return_value=MagicMock()), \
+             patch.object(views, 'get_or_create_drive_folder', return_value='CARPETA'), \
+             patch.object(views.drive_upload, 'upload', side_effect=fake_upload) as upload:
+            # El mismo contenido dos veces en el lote y luego en otra petición
+            primera = views.guardar_archivos_adjuntos(self._request('a.pdf', 'copia.pdf', contenido=b'%PDF igual'))
+            segunda = views.guardar_archivos_adjuntos(self._request('otra.pdf', contenido=b'%PDF igual'))
+
+        self.assertEqual(upload.call_count, 1)
+        import json
+        self.assertEqual([f['drive'] for f in json.loads(primera.content)['files']], ['ok', 'ok'])
+        self.assertEqual(json.loads(segunda.content)['files'][0]['drive'], 'reutilizado')
+        self.assertEqual(StoredContent.objects.count(), 1)
+        self.assertEqual(set(File.objects.values_list('drive_link', flat=True)), {'https://drive/a.pdf'})
+
+    def test_delete_keeps_drive_file_while_shared(self):
+        from attachGeneric import dedup
+        link = 'https://drive.google.com/file/d/ABC/view'
+        dedup.remember([('f' * 64, 10, 'ABC', link)])
+        primero = File.objects.create(name='a', type='pdf', drive_file_id='ABC', drive_link=link)
+        # Mismo archivo con otro enlace; sin drive_file_id en la fila propia se usa el del enlace
+        File.objects.create(name='b', type='pdf', drive_file_id='ABC',
+                            drive_link='https://drive.google.com/file/d/ABC/edit?usp=sharing')
+        antiguo = File.objects.create(name='c', type='pdf', drive_link=link)
+        self.assertTrue(dedup.is_shared(primero))
+        self.assertTrue(dedup.is_shared(antiguo))
+        File.objects.filter(name='b').delete()
+        self.assertFalse(dedup.is_shared(primero))
+        self.assertTrue(dedup.is_shared(antiguo))
+        self.assertFalse(dedup.is_shared(File(name='d', type='pdf', drive_file_id='OTRO')))
+
+    def test_invalid_type_rejected_before_upload(self):
+        from unittest.mock import patch
+        from attachGeneric import views
+        with patch.object(views.drive_upload, 'upload') as upload:
+            response = views.guardar_archivos_adjuntos(self._request('a.pdf', 'malo.exe'))
+        self.assertEqual(response.status_code, 400)
+        upload.assert_not_called()
+        self.assertEqual(File.objects.count(), 0)
+
+
+class ChunkedUploadTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(
+            cedula='444555666', email='sube@gmail.com', password='x',
+            first_name='Sara', last_name='Uribe', rol='superadmin',
+        )
+
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        self.tmp = tempfile.TemporaryDirectory()
+        self.override = override_settings(ATTACH_UPLOAD_TMP_DIR=self.tmp.name)
+        self.override.enable()
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        self.override.disable()
+        self.tmp.cleanup()
+
+    def _call(self, view, request, user=None, **kwargs):
+        request.user = user or self.user
+        response = view(request, **kwargs)
+        return response.status_code, json.loads(response.content)
+
+    def _iniciar(self, size, filename='grande.pdf'):
+        from attachGeneric import views
+        request = self.factory.post('/attachGeneric/subidas/', json.dumps({
+            'filename': filename, 'size': size, 'directorPrograma': self.user.cedula,
+        }), content_type='application/json')
+        return self._call(views.iniciar_subida, request)
+
+    def _put(self, upload_id, data, start, total, user=None):
+        from attachGeneric import views
+        request = self.factory.put(
+            f'/attachGeneric/subidas/{upload_id}/', data,
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{start + len(data) - 1}/{total}',
+        )
+        return self._call(views.subir_bloque, request, user=user, upload_id=upload_id)
+
+    def _offset(self, upload_id):
+        from attachGeneric import views
+        request = self.factory.get(f'/attachGeneric/subidas/{upload_id}/')
+        return self._call(views.subir_bloque, request, upload_id=upload_id)[1]['offset']
+
+    def _finalizar(self, upload_id):
+        from attachGeneric import views
+        request = self.factory.post(f'/attachGeneric/subidas/{upload_id}/finalizar/')
+        return self._call(views.finalizar_subida, request, upload_id=upload_id)
+
+    def test_chunks_resume_and_finalize(self):
+        from unittest.mock import MagicMock, patch
+        from attachGeneric import views
+        from attachGeneric.models import UploadSession
+
+        contenido = b'%PDF-1.4 ' + b'x' * 991
+        status, data = self._iniciar(len(contenido))
+        self.assertEqual(status, 201)
+        upload_id = data['upload_id']
+
+        self.assertEqual(self._put(upload_id, contenido[:400], 0, 1000)[1]['offset'], 400)
+        # Un bloque fuera de orden no se escribe; el cliente reanuda desde el offset
+        status, data = self._put(upload_id, contenido[600:], 600, 1000)
+        self.assertEqual((status, data['offset']), (409, 400))
+        self.assertEqual(self._offset(upload_id), 400)
+        self.assertEqual(self._finalizar(upload_id)[0], 409)
+
+        self.assertEqual(self._put(upload_id, contenido[400:], 400, 1000)[1]['offset'], 1000)
+        session = UploadSession.objects.get(pk=upload_id)
+        with open(session.temp_path, 'rb') as fh:
+            self.assertEqual(fh.read(), contenido)
+
+        recibido = {}
+
+        def fake_upload(drive, archivo, metadata, fields, mimetype=None):
+            recibido['bytes'] = archivo.read()
+            recibido['name'] = metadata['name']
+            return {'id': 'ID-1', 'webViewLink': 'https://drive/grande'}
+
+        with self.settings(GOOGLE_DRIVE_ATTACHGENERIC_FOLDER_ID='RAIZ'), \
+             patch.object(views, '_drive_service', return_value=MagicMock()), \
+             patch.object(views, '_thread_drive', return_value=MagicMock()), \
+             patch.object(views, 'get_or_create_drive_folder', return_value='CARPETA'), \
+             patch.object(views.drive_upload, 'upload', side_effect=fake_upload):
+            status, data = self._finalizar(upload_id)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(data['drive_link'], 'https://drive/grande')
+        self.assertEqual(recibido, {'bytes': contenido, 'name': 'grande.pdf'})
+        session.refresh_from_db()
+        self.assertEqual(session.status, 'completa')
+        self.assertEqual(session.file.drive_link, 'https://drive/grande')
+        self.assertFalse(os.path.exists(session.temp_path))
+
+    def test_rejects_oversized_and_foreign_sessions(self):
+        from attachGeneric import views
+        self.assertEqual(self._iniciar(views.CHUNKED_MAX_SIZE + 1)[0], 400)
+        self.assertEqual(self._iniciar(10, filename='malo.exe')[0], 400)
+
+        upload_id = self._iniciar(10)[1]['upload_id']
+        otro = get_user_model().objects.create_user(
+            cedula='777888999', email='otro@gmail.com', password='x',
+            first_name='Otto', last_name='Ruiz', rol='superadmin',
+        )
+        from django.http import Http404
+        with self.assertRaises(Http404):
+            self._put(upload_id, b'0123456789', 0, 10, user=otro)
+
+    def test_concurrent_finalize_uploads_once(self):
+        from unittest.mock import MagicMock, patch
+        from attachGeneric import views
+        from attachGeneric.models import UploadSession
+
+        contenido = b'%PDF-1.4 ' + b'y' * 91
+        upload_id = self._iniciar(len(contenido))[1]['upload_id']
+        self._put(upload_id, contenido, 0, len(contenido))
+        segundo = {}
+
+        def fake_upload(drive, archivo, metadata, fields, mimetype=None):
+            # Otro POST de finalizar llega mientras este sigue subiendo
+            segundo['status'] = self._finalizar(upload_id)[0]
+            return {'id': 'ID-2', 'webViewLink': 'https://drive/una-vez'}
+
+        with self.settings(GOOGLE_DRIVE_ATTACHGENERIC_FOLDER_ID='RAIZ'), \
+             patch.object(views, '_drive_service', return_value=MagicMock()), \
+             patch.object(views, '_thread_drive', return_value=MagicMock()), \
+             patch.object(views, 'get_or_create_drive_folder', return_value='CARPETA'), \
+             patch.object(views.drive_upload, 'upload', side_effect=fake_upload) as upload:
+            status, data = self._finalizar(upload_id)
+            # Un reintento posterior devuelve el resultado sin volver a subir
+            again_status, again = self._finalizar(upload_id)
+
+        self.assertEqual((status, segundo['status'], again_status), (200, 409, 200))
+        self.assertEqual(upload.call_count, 1)
+        self.assertEqual(again['drive_link'], 'https://drive/una-vez')
+        self.assertEqual(File.objects.filter(drive_file_id='ID-2').count(), 1)
+        self.assertEqual(UploadSession.objects.get(pk=upload_id).status, 'completa')
+
+    def test_incomplete_chunk_keeps_offset(self):
+        from attachGeneric import views
+        upload_id = self._iniciar(10)[1]['upload_id']
+        request = self.factory.put(
+            f'/attachGeneric/subidas/{upload_id}/', b'0123',
+            content_type='application/octet-stream', HTTP_CONTENT_RANGE='bytes 0-9/10',
+        )
+        status, data = self._call(views.subir_bloque, request, upload_id=upload_id)
+        self.assertEqual((status, data['offset']), (400, 0))
+        self.assertEqual(self._put(upload_id, b'0123456789', 0, 10)[1]['offset'], 10)
+
+    def test_requires_edit_permission_on_trait(self):
+        from datetime import date, timedelta
+        from attachGeneric import views
+        from attachGeneric.models import UploadSession
+        from projects.models import Project
+        from factorManager.models import Factor
+        from traitManager.models import Trait
+
+        project = Project.objects.create(name='ProjSubida', start_date=date.today(),
+                                         end_date=date.today() + timedelta(days=5))
+        factor, = Factor.objects.bulk_create([Factor(
+            project=project, name='FactorSubida',
+            start_date=date.today(), end_date=date.today() + timedelta(days=1),
+        )])
+        trait = Trait.objects.create(factor=factor, name='TraitSubida')
+        lector = get_user_model().objects.create_user(
+            cedula='555666777', email='lee@gmail.com', password='x',
+            first_name='Lea', last_name='Mora', rol='sin_rol',
+        )
+        request = self.factory.post('/attachGeneric/subidas/', json.dumps({
+            'filename': 'grande.pdf', 'size': 10, 'directorPrograma': self.user.cedula,
+            'id_evento': trait.pk,
+        }), content_type='application/json')
+        status, _ = self._call(views.iniciar_subida, request, user=lector)
+        self.assertEqual(status, 403)
+        self.assertFalse(UploadSession.objects.exists())
+
+        request = self.factory.post('/attachGeneric/subidas/', json.dumps({
+            'filename': 'grande.pdf', 'size': 10, 'directorPrograma': self.user.cedula,
+            'id_evento': trait.pk,
+        }), content_type='application/json')
+        self.assertEqual(self._call(views.iniciar_subida, request)[0], 201)
+
+
+class BulkDeleteTestCase(TestCase):
+    def setUp(self):
+        from datetime import date, timedelta
+        from projects.models import Project
+        from factorManager.models import Factor
+        from traitManager.models import Trait
+        from django.contrib.contenttypes.models import ContentType
+
+        self.user = get_user_model().objects.create_user(
+            cedula='121212', email='borra@gmail.com', password='x',
+            first_name='Bea', last_name='Rojas', rol='superadmin',
+        )
+        project = Project.objects.create(name='ProjBorrar', start_date=date.today(),
+                                         end_date=date.today() + timedelta(days=5))
+        # bulk_create evita la creación del Google Doc en Factor.save()
+        factor, = Factor.objects.bulk_create([Factor(
+            project=project, name='FactorBorrar',
+            start_date=date.today(), end_date=date.today() + timedelta(days=1),
+        )])
+        self.trait = Trait.objects.create(factor=factor, name='TraitBorrar')
+        ct = ContentType.objects.get_for_model(Trait)
+        self.propios = [
+            File.objects.create(name=n, type='pdf', content_type=ct, object_id=self.trait.pk,
+                                drive_file_id=f'ID-{n}', drive_link=f'https://drive.google.com/file/d/ID-{n}/view')
+            for n in ('a', 'b')
+        ]
+        # Adjunto de otra característica que comparte el contenido de 'b'
+        File.objects.create(name='b2', type='pdf', drive_file_id='ID-b',
+                            drive_link='https://drive.google.com/file/d/ID-b/view')
+
+    def _post(self, ids):
+        request = RequestFactory().post(f'/attachGeneric/trait/{self.trait.pk}/delete-attachments/',
+                                        {'archivos': ids})
+        request.user = self.user
+        return request
+
+    def test_one_permission_check_one_batch_one_delete(self):
+        from unittest.mock import MagicMock, patch
+        from assignments.models import AssignmentRole
+        from attachGeneric import views
+
+        drive = MagicMock()
+        with patch.object(views, '_drive_service', return_value=drive) as servicio, \
+             patch.object(views, 'get_trait_permission', return_value=AssignmentRole.EDITOR) as permiso:
+            response = views.delete_attachments_bulk(self._post([f.pk for f in self.propios]), pk=self.trait.pk)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['eliminados'], 2)
+        permiso.assert_called_once()
+        servicio.assert_called_once()
+        drive.new_batch_http_request.return_value.execute.assert_called_once()
+        # Solo se borra en Drive el contenido que nadie más usa
+        drive.files.return_value.delete.assert_called_once_with(fileId='ID-a')
+        self.assertEqual(list(File.objects.values_list('name', flat=True)), ['b2'])
+
+    def test_requires_edit_permission(self):
+        from unittest.mock import patch
+        from attachGeneric import views
+        with patch.object(views, 'get_trait_permission', return_value=None):
+            response = views.delete_attachments_bulk(self._post([self.propios[0].pk]), pk=self.trait.pk)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(File.objects.count(), 3)
+
+
+class ZipBundleTestCase(TestCase):
+    def setUp(self):
+        import tempfile
+        from datetime import date, timedelta
+        from django.contrib.contenttypes.models import ContentType
+        from django.test import override_settings
+        from projects.models import Project
+        from factorManager.models import Factor
+        from traitManager.models import Trait
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        override = override_settings(MEDIA_ROOT=self.tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = get_user_model().objects.create_user(
+            cedula='343434', email='zip@gmail.com', password='x',
+            first_name='Zoe', last_name='Pardo', rol='superadmin',
+        )
+        self.user.is_superuser = True
+        self.project = Project.objects.create(name='ProjZip', start_date=date.today(),
+                                              end_date=date.today() + timedelta(days=5))
+        # bulk_create evita la creación del Google Doc en Factor.save()
+        factor, = Factor.objects.bulk_create([Factor(
+            project=self.project, name='FactorZip',
+            start_date=date.today(), end_date=date.today() + timedelta(days=1),
+        )])
+        ct = ContentType.objects.get_for_model(Trait)
+        uno = Trait.objects.create(factor=factor, name='Uno')
+        dos = Trait.objects.create(factor=factor, name='Dos')
+        local = File(name='acta', type='pdf', content_type=ct, object_id=uno.pk)
+        local.archivo.save('acta.pdf', SimpleUploadedFile('acta.pdf', b'%PDF local' * 1000))
+        File.objects.create(name='acta', type='pdf', content_type=ct, object_id=dos.pk, drive_file_id='DRV')
+        File.objects.create(name='perdido', type='pdf', content_type=ct, object_id=dos.pk)
+
+    def test_project_zip_streams_local_and_drive_files(self):
+        import io
+        import zipfile
+        from unittest.mock import MagicMock, patch
+        from django.http import StreamingHttpResponse
+        from attachGeneric import bundle, views
+
+        class FakeDownload:
+            def __init__(self, fd, request, chunksize):
+                self.fd = fd
+
+            def next_chunk(self, num_retries=0):
+                self.fd.write(b'%PDF drive')
+                return None, True
+
+        request = RequestFactory().get(f'/attachGeneric/zip/project/{self.project.pk}/')
+        request.user = self.user
+        with patch.object(bundle, '_drive_service', return_value=MagicMock()), \
+             patch.object(bundle, 'MediaIoBaseDownload', FakeDownload):
+            response = views.descargar_zip(request, scope='project', pk=self.project.pk)
+            self.assertIsInstance(response, StreamingHttpResponse)
+            contenido = b''.join(response.streaming_content)
+
+        archive = zipfile.ZipFile(io.BytesIO(contenido))
+        self.assertEqual(sorted(archive.namelist()),
+                         ['ERRORES.txt', 'FactorZip/Dos/acta.pdf', 'FactorZip/Dos/perdido.pdf', 'FactorZip/Uno/acta.pdf'])
+        self.assertEqual(archive.read('FactorZip/Uno/acta.pdf'), b'%PDF local' * 1000)
+        self.assertEqual(archive.read('FactorZip/Dos/acta.pdf'), b'%PDF drive')
+        self.assertIn('perdido.pdf', archive.read('ERRORES.txt').decode())
+
+    def test_archive_names_are_unique(self):
+        from attachGeneric import bundle
+        trait = type('T', (), {'name': 'A/B'})()
+        entries = [(trait, File(name='x', type='pdf')), (trait, File(name='x', type='pdf'))]
+        self.assertEqual(bundle.archive_names(entries, 'trait'), ['A_B/x.pdf', 'A_B/x (2).pdf'])
+
+
+class EvidenceIndexTestCase(TestCase):
+    def setUp(self):
+        import io
+        import tempfile
+        import zipfile
+        from datetime import date, timedelta
+        from django.contrib.contenttypes.models import ContentType
+        from django.test import override_settings
+        from projects.models import Project
+        from factorManager.models import Factor
+        from traitManager.models import Trait
+        from assignments.models import AssignmentRole, FactorAssignment
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        override = override_settings(MEDIA_ROOT=self.tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        User = get_user_model()
+        self.lector = User.objects.create_user(
+            cedula='565656', email='lee@gmail.com', password='x',
+            first_name='Lea', last_name='Mora', rol='lector',
+        )
+        self.ajeno = User.objects.create_user(
+            cedula='575757', email='ajeno@gmail.com', password='x',
+            first_name='Ana', last_name='Gil', rol='lector',
+        )
+        project = Project.objects.create(name='ProjBuscar', start_date=date.today(),
+                                         end_date=date.today() + timedelta(days=5))
+        # bulk_create evita la creación del Google Doc en Factor.save()
+        factor, = Factor.objects.bulk_create([Factor(
+            project=project, name='FactorBuscar',
+            start_date=date.today(), end_date=date.today() + timedelta(days=1),
+        )])
+        FactorAssignment.objects.create(factor=factor, user=self.lector, role=AssignmentRole.LECTOR)
+        self.trait = Trait.objects.create(factor=factor, name='Currículo')
+        ct = ContentType.objects.get_for_model(Trait)
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('actas/Acta_Comité_2024.pdf', b'x')
+            archive.writestr('planes/plan_estudios.docx', b'y')
+        self.zip_file = File(name='soportes', type='zip', content_type=ct, object_id=self.trait.pk)
+        self.zip_file.archivo.save('soportes.zip', SimpleUploadedFile('soportes.zip', buffer.getvalue()))
+        self.pdf_file = File(name='informe', type='pdf', content_type=ct, object_id=self.trait.pk)
+        self.pdf_file.archivo.save('informe.pdf', SimpleUploadedFile('informe.pdf', b'%PDF-1.4'))
+
+    def test_incremental_indexing_and_scoped_search(self):
+        from unittest.mock import patch
+        from attachGeneric import evidence
+        from attachGeneric.models import EvidenceText
+
+        with patch.object(evidence, 'extract_pdf', return_value='Resultados de la autoevaluación institucional'):
+            self.assertEqual(evidence.index_pending(), 2)
+            self.assertEqual(evidence.index_pending(), 0)
+
+        self.assertEqual(EvidenceText.objects.get(file=self.zip_file).status, 'ok')
+        self.assertIn('Acta_Comité_2024.pdf', EvidenceText.objects.get(file=self.zip_file).content)
+
+        resultados = evidence.search(self.lector, 'comite acta')
+        self.assertEqual([r['name'] for r in resultados], ['soportes.zip'])
+        self.assertEqual(resultados[0]['trait'], 'Currículo')
+        self.assertIn('Acta_Comité', resultados[0]['snippet'])
+        self.assertEqual([r['name'] for r in evidence.search(self.lector, 'AUTOEVALUACION')], ['informe.pdf'])
+        self.assertEqual(evidence.search(self.ajeno, 'comite acta'), [])
+
+    def test_failed_extraction_is_recorded_and_retried_on_request(self):
+        from unittest.mock import patch
+        from attachGeneric import evidence
+        from attachGeneric.models import EvidenceText
+
+        with patch.object(evidence, 'extract_pdf', side_effect=RuntimeError('pypdf no está instalado.')):
+            evidence.index_pending()
+        self.assertEqual(EvidenceText.objects.get(file=self.pdf_file).status, 'error')
+        self.assertEqual(evidence.index_pending(), 0)
+        with patch.object(evidence, 'extract_pdf', return_value='texto'):
+            self.assertEqual(evidence.index_pending(retry_errors=True), 1)
+        self.assertEqual(EvidenceText.objects.get(file=self.pdf_file).status, 'ok')
+
+    def test_index_error_marks_file_and_continues(self):
+        from unittest.mock import patch
+        from attachGeneric import evidence
+        from attachGeneric.models import EvidenceText
+
+        real_index = evidence.index_file
+
+        def flaky(file_instance, drive=None):
+            if file_instance.pk == self.zip_file.pk:
+                raise RuntimeError('fallo al guardar')
+            return real_index(file_instance, drive)
+
+        with patch.object(evidence, 'extract_pdf', return_value='texto'), \
+             patch.object(evidence, 'index_file', side_effect=flaky):
+            self.assertEqual(evidence.index_pending(), 2)
+        fallido = EvidenceText.objects.get(file=self.zip_file)
+        self.assertEqual((fallido.status, fallido.error), ('error', 'fallo al guardar'))
+        self.assertEqual(EvidenceText.objects.get(file=self.pdf_file).status, 'ok')
+
+    def test_reindex_ignores_existing_terms(self):
+        from unittest.mock import patch
+        from attachGeneric import evidence
+        from attachGeneric.models import EvidenceTerm
+
+        with patch.object(evidence, 'extract_pdf', return_value='texto repetido texto'):
+            evidence.index_file(self.pdf_file)
+            document = evidence.index_file(self.pdf_file)
+        self.assertEqual(EvidenceTerm.objects.filter(document=document, term='texto').count(), 1)
+
+    def test_file_claimed_by_another_indexer_is_not_downloaded(self):
+        from datetime import timedelta
+        from unittest.mock import patch
+        from django.utils import timezone
+        from attachGeneric import evidence
+        from attachGeneric.models import EvidenceText
+
+        EvidenceText.objects.create(file=self.pdf_file, trait_id=self.pdf_file.object_id, status='procesando')
+        with patch.object(evidence, 'extract') as extract:
+            self.assertIsNone(evidence.index_file(self.pdf_file))
+        extract.assert_not_called()
+
+        # Una marca abandonada se vuelve a tomar
+        EvidenceText.objects.filter(file=self.pdf_file).update(
+            extracted_at=timezone.now() - evidence.CLAIM_TIMEOUT - timedelta(minutes=1))
+        with patch.object(evidence, 'extract', return_value='texto recuperado'):
+            document = evidence.index_file(self.pdf_file)
+        self.assertEqual(document.status, 'ok')
@@ -9,6 +9,14 @@ urlpatterns = [
     # URL para adjuntar a una Característica
     path('trait/<str:pk>/',     views.attach_generic_trait,       name='attach_generic_trait'),
 
+    # Subida por bloques para archivos grandes
+    path('subidas/',                          views.iniciar_subida,   name='iniciar_subida'),
+    path('subidas/<uuid:upload_id>/',          views.subir_bloque,     name='subir_bloque'),
+    path('subidas/<uuid:upload_id>/finalizar/', views.finalizar_subida, name='finalizar_subida'),
+
     path('delete-attachment/<str:file_pk>/', views.delete_attachment, name='delete_attachment'),
+    path('api/buscar/', views.api_buscar_evidencias, name='api_buscar_evidencias'),
+    path('zip/<str:scope>/<str:pk>/', views.descargar_zip, name='descargar_zip'),
+    path('trait/<str:pk>/delete-attachments/', views.delete_attachments_bulk, name='delete_attachments_bulk'),
 
 ]
\ No newline at end of file
@@ -1,16 +1,25 @@
 # attachGeneric/views.py
-import io
 import os
+import re
+import json
+import shutil
+import tempfile
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from pyexpat.errors import messages 
 
 from django.contrib.auth import get_user_model
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_http_methods, require_POST
 from django.shortcuts import redirect, render, get_object_or_404
 from django.contrib.contenttypes.models import ContentType
 from django.conf import settings
 from django.db import transaction
 from django.urls import reverse
+from django.utils import timezone
 
 try:
     from calendar_create_event.models import Event
@@ -18,18 +27,25 @@ except ImportError:
     Event = None
     logging.info("Modelo Event de calendar_create_event no encontrado.")
 
-from core.permissions import can_edit, get_trait_permission
+from core.permissions import (
+    can_edit, can_view, get_factor_permission, get_project_permission, get_trait_permission,
+)
+from login.models import Rol
 from database.models import File 
+from .models import UploadSession, upload_tmp_dir
+from . import bundle, dedup, evidence
 from traitManager.models import Trait 
+from factorManager.models import Factor
+from projects.models import Project
 
 try:
     from factorManager.models import _drive_service, _set_permissions 
-    from googleapiclient.http import MediaIoBaseUpload
+    from core import drive_upload
     GOOGLE_DRIVE_ENABLED = True
 except ImportError:
     _drive_service = None
     _set_permissions = None
-    MediaIoBaseUpload = None
+    drive_upload = None
     GOOGLE_DRIVE_ENABLED = False
     logging.warning("Utilidades de Google Drive no pudieron ser importadas. Funcionalidad de Drive desactivada.")
 
@@ -90,7 +106,55 @@ def obtener_directores_programa(request):
         logger.error(f"OBTENER_DIRECTORES: Error crítico: {str(e)}", exc_info=True)
         return JsonResponse({'error': 'Error interno al obtener directores.'}, status=500)
 
-@transaction.atomic 
+UPLOAD_WORKERS = getattr(settings, 'ATTACH_UPLOAD_WORKERS', 4)
+_thread_state = threading.local()
+
+
+def _thread_drive():
+    """Cliente de Drive propio de cada hilo (los clientes no son thread-safe)."""
+    if getattr(_thread_state, 'drive', None) is None:
+        _thread_state.drive = _drive_service()
+    return _thread_state.drive
+
+
+def _permission_grants():
+    """Permisos a otorgar en cada adjunto: misma regla que factorManager._set_permissions."""
+    return [
+        (email, 'writer' if rol in (Rol.SUPERADMIN, Rol.MINIADMIN) else 'reader')
+        for email, rol in User.objects.values_list('email', 'rol')
+    ]
+
+
+def _upload_one(archivo_subido, folder_id, grants, nombre=None, mimetype=None):
+    """
+    Sube un archivo y comparte el resultado con un lote de permisos.
+    Corre en un hilo del pool: no toca la base de datos.
+    """
+    inicio = time.perf_counter()
+    nombre = nombre or archivo_subido.name
+    try:
+        drive = _thread_drive()
+        gfile = drive_upload.upload(drive, archivo_subido, {'name': nombre, 'parents': [folder_id]},
+                                    mimetype=mimetype, fields='id, webViewLink')
+        # Drive admite hasta 100 llamadas por petición por lotes
+        for i in range(0, len(grants), 100):
+            batch = drive.new_batch_http_request()
+            for email, role in grants[i:i + 100]:
+                batch.add(drive.permissions().create(
+                    fileId=gfile['id'],
+                    body={'type': 'user', 'role': role, 'emailAddress': email},
+                    sendNotificationEmail=False,
+                ))
+            batch.execute()
+        logger.info(f"GUARDAR_ARCHIVOS: Archivo '{nombre}' subido a Drive. Link: {gfile.get('webViewLink')}")
+        return {'drive': 'ok', 'drive_link': gfile.get('webViewLink'), 'drive_id': gfile['id'],
+                'seconds': round(time.perf_counter() - inicio, 3)}
+    except Exception as e_drive_upload:
+        logger.error(f"GUARDAR_ARCHIVOS: Error al subir '{nombre}' a Drive: {str(e_drive_upload)}", exc_info=True)
+        return {'drive': 'error', 'drive_link': None, 'error': str(e_drive_upload),
+                'seconds': round(time.perf_counter() - inicio, 3)}
+
+
 def guardar_archivos_adjuntos(request):
     if request.method != 'POST':
         return JsonResponse({'error': 'Método no permitido.'}, status=405)
@@ -109,6 +173,11 @@ def guardar_archivos_adjuntos(request):
                 logger.warning(f"GUARDAR_ARCHIVOS: Archivo '{f.name}' excede tamaño. Tamaño: {size_mb}MB.")
                 return JsonResponse({'error': f"ERROR: El archivo '{f.name}' pesa {size_mb} MB — el límite es 10 MB."}, status=400)
 
+        for f in archivos_recibidos:
+            if os.path.splitext(f.name)[1][1:].lower() not in ['pdf', 'zip']:
+                logger.warning(f"GUARDAR_ARCHIVOS: Tipo de archivo no permitido: {f.name}")
+                return JsonResponse({'error': f'Tipo de archivo no permitido: {f.name}'}, status=400)
+
         director_programa_id = request.POST.get('directorPrograma')
         if not director_programa_id or director_programa_id == 'Seleccionar...':
             logger.warning("GUARDAR_ARCHIVOS: Director de programa no seleccionado.")
@@ -164,64 +233,62 @@ def guardar_archivos_adjuntos(request):
         elif GOOGLE_DRIVE_ENABLED:
             logger.warning("GUARDAR_ARCHIVOS: Drive habilitado pero _drive_service o GOOGLE_DRIVE_ATTACHGENERIC_FOLDER_ID faltan.")
 
-        files_saved_details = []
-        for archivo_subido in archivos_recibidos:
-            nombre_original = archivo_subido.name
-            nombre_sin_extension, extension = os.path.splitext(nombre_original)
-            tipo_archivo = extension[1:].lower()
-            logger.info(f"GUARDAR_ARCHIVOS: Procesando archivo '{nombre_original}' tipo '{tipo_archivo}'.")
-
-            if tipo_archivo not in ['pdf', 'zip']:
-                logger.warning(f"GUARDAR_ARCHIVOS: Tipo de archivo no permitido: {nombre_original}")
-                return JsonResponse({'error': f'Tipo de archivo no permitido: {nombre_original}'}, status=400)
-
-            drive_link = None 
-            if drive_service and target_drive_folder_id and MediaIoBaseUpload:
-                try:
-                    logger.info(f"GUARDAR_ARCHIVOS: Intentando subir '{nombre_original}' a Drive.")
-                    file_metadata_drive = {'name': nombre_original, 'parents': [target_drive_folder_id]}
-                    archivo_subido.seek(0) 
-                    media_drive = MediaIoBaseUpload(io.BytesIO(archivo_subido.read()), mimetype=archivo_subido.content_type, resumable=True)
-                    gfile = drive_service.files().create(body=file_metadata_drive, media_body=media_drive, fields='id, webViewLink').execute()
-                    file_id_on_drive = gfile.get('id')
-                    drive_link = gfile.get('webViewLink') 
-                    if _set_permissions:
-                        _set_permissions(file_id_on_drive)
-                    logger.info(f"GUARDAR_ARCHIVOS: Archivo '{nombre_original}' subido a Drive. Link: {drive_link}")
-                except Exception as e_drive_upload:
-                    logger.error(f"GUARDAR_ARCHIVOS: Error al subir '{nombre_original}' a Drive: {str(e_drive_upload)}", exc_info=True)
-            
-            archivo_subido.seek(0) # Rebobinar para guardado local
-
-            logger.info(f"GUARDAR_ARCHIVOS: Preparando para guardar '{nombre_original}' en la base de datos.")
-            file_instance_data = {
-                'name': nombre_sin_extension,
-                'type': tipo_archivo,
-                'director_programa': director_programa_nombre_completo,
-                'status': 'activo',
-                'content_type': content_type_for_file, 
-                'object_id': object_id_for_file,       
-                'id_event': event_fk_instance,         
-                'drive_link': drive_link               
-            }
-            logger.debug(f"GUARDAR_ARCHIVOS: Datos para File model: {file_instance_data}")
-            
-            file_instance = File(
-                #archivo=archivo_subido, # El campo FileField se pasa al crear la instancia
-                **file_instance_data
-            )
-            
-            try:
-                file_instance.save()
-                logger.info(f"GUARDAR_ARCHIVOS: Archivo '{nombre_original}' guardado en BD con PK: {file_instance.pk}")
-                files_saved_details.append({'name': nombre_original, 'status': 'guardado', 'drive_link': drive_link})
-            except Exception as db_error:
-                logger.error(f"GUARDAR_ARCHIVOS: Error al guardar '{nombre_original}' en BD: {str(db_error)}", exc_info=True)
-                # Si un archivo falla al guardar en BD, la transacción se revierte.
-                # Podrías devolver un error específico aquí o dejar que el try/except general lo capture.
-                # Por ahora, para depurar, es mejor que el error específico se registre y se lance.
-                raise # Re-lanzar para que el try/except general lo capture y devuelva un 500 claro.
+        # Resumen SHA-256 de cada archivo: el contenido ya conocido no se vuelve a subir
+        resumenes = [dedup.digest(archivo) for archivo in archivos_recibidos]
+        conocidos = dedup.lookup(sha for sha, _ in resumenes)
+        pendientes = {}  # sha256 -> primer archivo del lote con ese contenido
+        for archivo, (sha, _) in zip(archivos_recibidos, resumenes):
+            if sha not in conocidos:
+                pendientes.setdefault(sha, archivo)
+
+        # Subidas concurrentes, fuera de cualquier transacción
+        subidos = {}
+        if pendientes and drive_service and target_drive_folder_id and drive_upload:
+            grants = _permission_grants()
+            workers = max(1, min(UPLOAD_WORKERS, len(pendientes)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='adjuntos') as pool:
+                subidos = dict(zip(pendientes, pool.map(
+                    lambda archivo: _upload_one(archivo, target_drive_folder_id, grants),
+                    pendientes.values(),
+                )))
+
+        resultados = []
+        for sha, _ in resumenes:
+            if sha in conocidos:
+                resultados.append({'drive': 'reutilizado', 'drive_link': conocidos[sha].drive_link,
+                                   'drive_id': conocidos[sha].drive_file_id, 'seconds': 0.0})
+            else:
+                resultados.append(subidos.get(sha, {'drive': 'omitido', 'drive_link': None, 'seconds': 0.0}))
+        tamanos = dict(resumenes)
+        nuevos = [(sha, tamanos[sha], r['drive_id'], r['drive_link'])
+                  for sha, r in subidos.items() if r['drive'] == 'ok']
 
+        file_instances = []
+        files_saved_details = []
+        for archivo_subido, resultado in zip(archivos_recibidos, resultados):
+            nombre_sin_extension, extension = os.path.splitext(archivo_subido.name)
+            file_instances.append(File(
+                name=nombre_sin_extension,
+                type=extension[1:].lower(),
+                director_programa=director_programa_nombre_completo,
+                status='activo',
+                content_type=content_type_for_file,
+                object_id=object_id_for_file,
+                id_event=event_fk_instance,
+                drive_link=resultado['drive_link'],
+                drive_file_id=resultado.get('drive_id'),
+            ))
+            files_saved_details.append({'name': archivo_subido.name, 'status': 'guardado', **resultado})
+
+        # Un solo INSERT para todo el lote
+        with transaction.atomic():
+            dedup.remember(nuevos)
+            File.objects.bulk_create(file_instances)
+            if content_type_for_file is not None:
+                # bulk_create no emite post_save: se toca la característica a mano (ver core.signals)
+                Trait.objects.filter(pk=object_id_for_file).update(updated_at=timezone.now())
+                evidence.schedule()
+        logger.info(f"GUARDAR_ARCHIVOS: {len(file_instances)} archivo(s) guardado(s) en BD.")
 
         logger.info("GUARDAR_ARCHIVOS: Proceso completado exitosamente.")
         return JsonResponse({'mensaje': 'Archivos guardados exitosamente.', 'files': files_saved_details})
@@ -258,22 +325,18 @@ def delete_attachment(request, file_pk):
     if request.method == 'POST':
         file_name_display = f"{file_instance.name}.{file_instance.type}"
         
-        # 1. Eliminar de Google Drive si existe el enlace
-        if file_instance.drive_link and file_instance.drive_link.strip():
+        # 1. Eliminar de Google Drive si existe el enlace y ningún otro adjunto lo comparte
+        if dedup.is_shared(file_instance):
+            logger.info(f"DELETE_ATTACHMENT: El contenido de {file_name_display} lo usan otros adjuntos; se conserva en Drive.")
+        elif file_instance.drive_link and file_instance.drive_link.strip():
             try:
-                drive_file_id = None
-                # Intenta extraer el ID del archivo de Drive del webViewLink
-                # Formato típico: https://docs.google.com/document/d/FILE_ID/edit
-                # O para otros archivos: https://drive.google.com/file/d/FILE_ID/view
-                parts = file_instance.drive_link.split('/')
-                if 'd' in parts:
-                    id_index = parts.index('d') + 1
-                    if id_index < len(parts):
-                        drive_file_id = parts[id_index]
-                
+                # Filas anteriores a drive_file_id: se extrae del webViewLink (ver completar_drive_ids)
+                drive_file_id = file_instance.drive_file_id or File.drive_id_from_link(file_instance.drive_link)
+
                 if drive_file_id:
                     drive = _drive_service() # Asumiendo que _drive_service() está disponible aquí [cite: 277]
                     drive.files().delete(fileId=drive_file_id).execute()
+                    dedup.forget([drive_file_id])
                     logger.info(f"DELETE_ATTACHMENT: Archivo '{drive_file_id}' (parte de {file_name_display}) eliminado de Google Drive.")
                 else:
                     logger.warning(f"DELETE_ATTACHMENT: No se pudo extraer el ID de Drive del enlace: {file_instance.drive_link} para el archivo {file_name_display}")
@@ -298,4 +361,299 @@ def delete_attachment(request, file_pk):
         # Solo permitir POST para la eliminación por seguridad.
         messages.error(request, "Método no permitido para eliminar el archivo.")
 
-    return redirect(redirect_url)
\ No newline at end of file
+    return redirect(redirect_url)
+
+
+# ---------------------------------------------------------------------
+#  Subida por bloques (archivos grandes): iniciar, PUT de rangos, finalizar
+# ---------------------------------------------------------------------
+CHUNKED_MAX_SIZE = getattr(settings, 'ATTACH_CHUNKED_MAX_SIZE', 500 * 1024 * 1024)
+CHUNK_SIZE_HINT = 8 * 1024 * 1024
+FINALIZE_TIMEOUT = timedelta(minutes=30)
+_COPY_BUFFER = 64 * 1024
+_CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+def _session_state(session):
+    return {
+        'upload_id': str(session.pk),
+        'offset': session.received,
+        'total_size': session.total_size,
+        'status': session.status,
+        'chunk_size': CHUNK_SIZE_HINT,
+    }
+
+
+@require_POST
+def iniciar_subida(request):
+    """
+    Abre una sesión de subida. JSON: filename, size, directorPrograma y,
+    opcionalmente, id_evento (pk de la característica).
+    """
+    try:
+        data = json.loads(request.body)
+        nombre = os.path.basename(str(data['filename']))
+        total = int(data['size'])
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Se requieren filename y size.'}, status=400)
+
+    if os.path.splitext(nombre)[1][1:].lower() not in ['pdf', 'zip']:
+        return JsonResponse({'error': f'Tipo de archivo no permitido: {nombre}'}, status=400)
+    if total <= 0 or total > CHUNKED_MAX_SIZE:
+        limite_mb = CHUNKED_MAX_SIZE // (1024 * 1024)
+        return JsonResponse({'error': f"ERROR: El archivo '{nombre}' excede el límite de {limite_mb} MB."}, status=400)
+
+    director = User.objects.filter(cedula=data.get('directorPrograma')).first()
+    if director is None or not f"{director.first_name} {director.last_name}".strip():
+        return JsonResponse({'error': 'El director de programa seleccionado no es válido.'}, status=400)
+
+    trait_id = data.get('id_evento') or None
+    if trait_id:
+        trait_instance = Trait.objects.filter(pk=trait_id).select_related('factor').first()
+        if trait_instance is None:
+            return JsonResponse({'error': f'El objeto asociado con ID "{trait_id}" no existe o el ID es inválido.'}, status=400)
+        if not can_edit(get_trait_permission(request.user, trait_instance)):
+            return JsonResponse({'error': 'No tienes permiso para adjuntar archivos a esta característica.'}, status=403)
+
+    UploadSession.purge_stale()
+    session = UploadSession.objects.create(
+        user=request.user,
+        filename=nombre,
+        content_type=data.get('content_type') or 'application/octet-stream',
+        total_size=total,
+        director_programa=f"{director.first_name} {director.last_name}".strip(),
+        trait_id=trait_id,
+    )
+    os.makedirs(upload_tmp_dir(), exist_ok=True)
+    open(session.temp_path, 'wb').close()
+    logger.info(f"SUBIDA_BLOQUES: Sesión {session.pk} iniciada para '{nombre}' ({total} bytes).")
+    return JsonResponse(_session_state(session), status=201)
+
+
+@require_http_methods(['GET', 'PUT'])
+def subir_bloque(request, upload_id):
+    """
+    GET: offset confirmado (para reanudar).
+    PUT: anexa el cuerpo en la posición indicada por Content-Range; el
+    bloque debe empezar exactamente en el offset confirmado.
+    """
+    session = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+    if request.method == 'GET' or session.status != 'abierta':
+        return JsonResponse(_session_state(session))
+
+    match = _CONTENT_RANGE.match(request.headers.get('Content-Range', ''))
+    if not match:
+        return JsonResponse({'error': 'Content-Range inválido (bytes inicio-fin/total).'}, status=400)
+    inicio, fin, total = map(int, match.groups())
+    if total != session.total_size or fin < inicio or fin >= total:
+        return JsonResponse({'error': 'El rango no corresponde a la sesión.'}, status=400)
+    if inicio != session.received:
+        return JsonResponse({**_session_state(session), 'error': 'Offset inesperado.'}, status=409)
+
+    # El cuerpo se lee a un temporal antes de bloquear la sesión: un cliente
+    # lento no debe retener el bloqueo ni la transacción mientras envía
+    esperado = fin - inicio + 1
+    escritos = 0
+    with tempfile.TemporaryFile(dir=upload_tmp_dir()) as bloque_tmp:
+        while escritos < esperado:
+            bloque = request.read(min(_COPY_BUFFER, esperado - escritos))
+            if not bloque:
+                break
+            bloque_tmp.write(bloque)
+            escritos += len(bloque)
+        if escritos != esperado:
+            # Bloque incompleto: se descarta, el offset confirmado no cambia
+            return JsonResponse({**_session_state(session), 'error': 'Bloque incompleto.'}, status=400)
+
+        bloque_tmp.seek(0)
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(pk=session.pk)
+            if session.status != 'abierta' or inicio != session.received:
+                # El cliente debe reanudar desde el offset confirmado
+                return JsonResponse({**_session_state(session), 'error': 'Offset inesperado.'}, status=409)
+            with open(session.temp_path, 'r+b') as destino:
+                destino.seek(inicio)
+                destino.truncate()
+                shutil.copyfileobj(bloque_tmp, destino, _COPY_BUFFER)
+            session.received = fin + 1
+            session.save(update_fields=['received', 'updated_at'])
+    return JsonResponse(_session_state(session))
+
+
+@require_POST
+def finalizar_subida(request, upload_id):
+    """
+    Envía el archivo completo a Drive (por bloques) y crea el registro File.
+    La sesión se reclama primero (estado 'enviando') para que un doble envío
+    o un reintento del cliente no suba ni registre el archivo dos veces.
+    """
+    session = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if session.status == 'completa':
+            return JsonResponse({**_session_state(session), 'drive_link': session.file.drive_link if session.file else None})
+        # Una finalización que murió a medias se puede reclamar tras FINALIZE_TIMEOUT
+        if session.status == 'enviando' and session.updated_at > timezone.now() - FINALIZE_TIMEOUT:
+            return JsonResponse({**_session_state(session), 'error': 'La finalización ya está en curso.'}, status=409)
+        if not session.is_complete:
+            return JsonResponse({**_session_state(session), 'error': 'La subida aún no está completa.'}, status=409)
+        session.status = 'enviando'
+        session.save(update_fields=['status', 'updated_at'])
+
+    try:
+        return _finalizar(session)
+    except Exception:
+        # Falló antes de registrar el archivo: se puede reintentar
+        UploadSession.objects.filter(pk=session.pk, status='enviando').update(status='abierta')
+        raise
+
+
+def _finalizar(session):
+    with open(session.temp_path, 'rb') as fh:
+        sha, tamano = dedup.digest(fh)
+    conocido = dedup.lookup([sha]).get(sha)
+
+    resultado = {'drive': 'omitido', 'drive_link': None, 'seconds': 0.0}
+    if conocido is not None:
+        resultado = {'drive': 'reutilizado', 'drive_link': conocido.drive_link,
+                     'drive_id': conocido.drive_file_id, 'seconds': 0.0}
+    elif GOOGLE_DRIVE_ENABLED and _drive_service and getattr(settings, 'GOOGLE_DRIVE_ATTACHGENERIC_FOLDER_ID', None):
+        try:
+            carpeta = get_or_create_drive_folder(_drive_service(), settings.GOOGLE_DRIVE_ATTACHGENERIC_FOLDER_ID, 'archivos')
+            with open(session.temp_path, 'rb') as fh:
+                resultado = _upload_one(fh, carpeta, _permission_grants(),
+                                        nombre=session.filename, mimetype=session.content_type)
+        except Exception as e_drive:
+            logger.error(f"SUBIDA_BLOQUES: Error configurando Drive: {str(e_drive)}", exc_info=True)
+            resultado = {'drive': 'error', 'drive_link': None, 'error': str(e_drive), 'seconds': 0.0}
+    if resultado['drive'] == 'error':
+        # El temporal se conserva para reintentar la finalización
+        session.status = 'abierta'
+        session.save(update_fields=['status', 'updated_at'])
+        return JsonResponse({**_session_state(session), **resultado}, status=502)
+
+    nombre_sin_extension, extension = os.path.splitext(session.filename)
+    with transaction.atomic():
+        if resultado['drive'] == 'ok':
+            dedup.remember([(sha, tamano, resultado['drive_id'], resultado['drive_link'])])
+        file_instance = File.objects.create(
+            name=nombre_sin_extension,
+            type=extension[1:].lower(),
+            director_programa=session.director_programa,
+            status='activo',
+            content_type=ContentType.objects.get_for_model(Trait) if session.trait_id else None,
+            object_id=session.trait_id,
+            drive_link=resultado['drive_link'],
+            drive_file_id=resultado.get('drive_id'),
+        )
+        session.status = 'completa'
+        session.file = file_instance
+        session.save(update_fields=['status', 'file', 'updated_at'])
+        if session.trait_id:
+            evidence.schedule()
+    session.discard_temp()
+    logger.info(f"SUBIDA_BLOQUES: Sesión {session.pk} finalizada ({session.total_size} bytes).")
+    return JsonResponse({**_session_state(session), **resultado})
+
+
+
+# ---------------------------------------------------------------------
+#  Eliminación por lotes de los adjuntos de una característica
+# ---------------------------------------------------------------------
+@require_POST
+def delete_attachments_bulk(request, pk):
+    """
+    Elimina varios adjuntos de la característica *pk* (POST `archivos`,
+    lista de id_file). Permiso verificado una vez, borrado en Drive en una
+    sola petición por lotes y filas eliminadas con una sola consulta.
+    """
+    trait_instance = get_object_or_404(Trait, pk=pk)
+    if not can_edit(get_trait_permission(request.user, trait_instance)):
+        return JsonResponse({'error': 'No tienes permiso para eliminar archivos de esta característica.'}, status=403)
+
+    ids = request.POST.getlist('archivos')
+    adjuntos = File.objects.filter(
+        pk__in=ids,
+        content_type=ContentType.objects.get_for_model(Trait),
+        object_id=str(trait_instance.pk),
+    )
+    filas = list(adjuntos.values_list('pk', 'drive_file_id', 'drive_link'))
+    if not filas:
+        return JsonResponse({'error': 'No se encontraron adjuntos para eliminar.'}, status=404)
+
+    drive_ids = {drive_id or File.drive_id_from_link(link) for _, drive_id, link in filas} - {None}
+    # El contenido deduplicado que otros adjuntos siguen usando se conserva en Drive
+    compartidos = set(File.objects.filter(drive_file_id__in=drive_ids)
+                      .exclude(pk__in=[fila[0] for fila in filas])
+                      .values_list('drive_file_id', flat=True))
+    drive_ids -= compartidos
+
+    fallidos = []
+    if drive_ids and GOOGLE_DRIVE_ENABLED and _drive_service:
+        def _callback(request_id, response, exception):
+            if exception is not None:
+                logger.error(f"DELETE_ATTACHMENTS: Error al eliminar '{request_id}' de Drive: {exception}")
+                fallidos.append(request_id)
+
+        ordenados = sorted(drive_ids)
+        try:
+            drive = _drive_service()
+            for i in range(0, len(ordenados), 100):
+                batch = drive.new_batch_http_request(callback=_callback)
+                for drive_id in ordenados[i:i + 100]:
+                    batch.add(drive.files().delete(fileId=drive_id), request_id=drive_id)
+                batch.execute()
+        except Exception as e:
+            logger.error(f"DELETE_ATTACHMENTS: Error con Google Drive: {str(e)}", exc_info=True)
+            fallidos = ordenados
+
+    with transaction.atomic():
+        eliminados = len(filas)
+        adjuntos.delete()
+        dedup.forget(drive_ids - set(fallidos))
+    logger.info(f"DELETE_ATTACHMENTS: {eliminados} adjunto(s) eliminados de la característica {trait_instance.pk}.")
+    return JsonResponse({'eliminados': eliminados, 'drive_fallidos': fallidos})
+
+
+
+# ---------------------------------------------------------------------
+#  Descarga de toda la evidencia en un ZIP (streaming)
+# ---------------------------------------------------------------------
+_ZIP_SCOPES = {
+    'trait': (Trait, get_trait_permission),
+    'factor': (Factor, get_factor_permission),
+    'project': (Project, get_project_permission),
+}
+
+
+def descargar_zip(request, scope, pk):
+    """ZIP con los adjuntos de la característica, factor o proyecto *pk*."""
+    if scope not in _ZIP_SCOPES:
+        raise Http404("Ámbito de descarga no válido.")
+    model, permission = _ZIP_SCOPES[scope]
+    obj = get_object_or_404(model, pk=pk)
+    if not can_view(permission(request.user, obj)):
+        return JsonResponse({'error': 'No tienes acceso a este recurso.'}, status=403)
+
+    entries = bundle.attachments_for(bundle.traits_for(scope, obj))
+    names = bundle.archive_names(entries, scope)
+    logger.info(f"ZIP_ADJUNTOS: {len(entries)} adjunto(s) de {scope} {pk} para {request.user}.")
+    response = StreamingHttpResponse(bundle.stream_zip(entries, names), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="evidencias_{scope}_{pk}.zip"'
+    return response
+
+
+
+# ---------------------------------------------------------------------
+#  Búsqueda en el contenido de las evidencias
+# ---------------------------------------------------------------------
+def api_buscar_evidencias(request):
+    """GET ?q=términos → adjuntos visibles para el usuario que los contienen todos."""
+    query = request.GET.get('q', '').strip()
+    if len(query) < 3:
+        return JsonResponse({'error': 'La búsqueda requiere al menos 3 caracteres.'}, status=400)
+    try:
+        limit = min(int(request.GET.get('limit', 20)), 100)
+    except ValueError:
+        limit = 20
+    return JsonResponse({'results': evidence.search(request.user, query, limit=limit)})
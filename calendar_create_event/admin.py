@@ -1,3 +1,16 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import Event, EventException
+
+
+class EventExceptionInline(admin.TabularInline):
+    model = EventException
+    extra = 0
+    fields = ('original_date', 'cancelled', 'new_date', 'new_time')
+
+
+@admin.register(Event)
+class EventAdmin(admin.ModelAdmin):
+    list_display = ('title', 'date', 'time', 'meeting_type', 'rrule')
+    search_fields = ('title',)
+    inlines = [EventExceptionInline]
@@ -0,0 +1,194 @@
+# ARCHIVO: calendar_create_event/availability.py
+"""
+Disponibilidad (free/busy) y detección de choques entre reuniones.
+
+Todas las reuniones se asumen de la misma duración
+(MEETING_DURATION_MINUTES, 60 por defecto). Con duración fija, dos
+reuniones se cruzan si sus inicios distan menos de esa duración, así que
+el choque se resuelve con un rango sobre el índice (date, time) unido a
+la tabla de participantes, en una sola consulta para todo el grupo.
+
+Las series (Event.rrule) no tienen filas por ocurrencia: se traen en una
+segunda consulta las series de los usuarios que pueden caer en el rango,
+y se expanden con recurrence.occurrences aplicando sus EventException
+(una tercera consulta, solo si hay series).
+
+Una serie nueva se verifica ocurrencia por ocurrencia dentro de
+SERIES_WINDOW_DAYS con find_series_conflicts: un solo free_busy para toda
+la ventana y la comparación en Python.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Event, EventException
+from .recurrence import SERIES_WINDOW_DAYS, occurrences
+
+DURATION_MINUTES = getattr(settings, 'MEETING_DURATION_MINUTES', 60)
+
+Participation = Event.participants.through
+
+
+def _duration(minutes=None):
+    return timedelta(minutes=minutes or DURATION_MINUTES)
+
+
+def _window_q(start, end):
+    """
+    Q sobre (date, time) para inicios estrictamente entre start y end,
+    partida por día para que la base use el índice compuesto.
+    """
+    query = Q()
+    day = start.date()
+    while day <= end.date():
+        lower = start.time() if day == start.date() else None
+        upper = end.time() if day == end.date() else None
+        part = Q(event__date=day)
+        if lower is not None:
+            part &= Q(event__time__gt=lower)
+        if upper is not None:
+            part &= Q(event__time__lt=upper)
+        query |= part
+        day += timedelta(days=1)
+    return query
+
+
+def _rows(queryset):
+    return queryset.values_list(
+        'user_id', 'event_id', 'event__title', 'event__date', 'event__time',
+    ).order_by('event__date', 'event__time')
+
+
+def _series_rows(user_ids, start_date, end_date, exclude_event_id=None):
+    """
+    Filas (user_id, event_id, título, fecha, hora) de las ocurrencias de
+    series entre start_date y end_date (inclusive), con las mismas
+    columnas que _rows.
+    """
+    queryset = (Participation.objects
+                .filter(user_id__in=user_ids)
+                .exclude(event__rrule='')
+                # Series que empiezan antes del fin del rango o con una
+                # ocurrencia movida hacia él
+                .filter(Q(event__date__lte=end_date)
+                        | Q(event__exceptions__new_date__range=(start_date, end_date)))
+                .values_list('user_id', 'event_id', 'event__title', 'event__date',
+                             'event__time', 'event__rrule')
+                .distinct())
+    if exclude_event_id is not None:
+        queryset = queryset.exclude(event_id=exclude_event_id)
+    members = defaultdict(set)
+    series = {}
+    for user_id, event_id, title, date, time, rrule in queryset:
+        members[event_id].add(user_id)
+        series[event_id] = Event(id=event_id, title=title, date=date, time=time, rrule=rrule)
+    if not series:
+        return []
+    exceptions = defaultdict(list)
+    for exc in EventException.objects.filter(event_id__in=series):
+        exceptions[exc.event_id].append(exc)
+
+    rows = []
+    for event_id, event in series.items():
+        for occ in occurrences(event, start_date, end_date, exceptions=exceptions[event_id]):
+            rows.extend((user_id, event_id, event.title, occ.date, occ.time)
+                        for user_id in members[event_id])
+    return rows
+
+
+def _sorted(rows):
+    return sorted(rows, key=lambda row: (row[3], row[4]))
+
+
+def find_conflicts(date, time, user_ids, duration_minutes=None, exclude_event_id=None):
+    """
+    Reuniones (u ocurrencias de series) de los usuarios dados que se cruzan
+    con una nueva reunión en date/time. Retorna {user_id: [{'event_id', 'title', 'start', 'end'}]}
+    con solo los usuarios que tienen choque.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    duration = _duration(duration_minutes)
+    start = datetime.combine(date, time)
+    lower, upper = start - duration, start + duration
+    queryset = Participation.objects.filter(
+        _window_q(lower, upper), user_id__in=user_ids, event__rrule='',
+    )
+    if exclude_event_id is not None:
+        queryset = queryset.exclude(event_id=exclude_event_id)
+    series = [
+        row for row in _series_rows(user_ids, lower.date(), upper.date(), exclude_event_id)
+        if lower < datetime.combine(row[3], row[4]) < upper
+    ]
+    return _group(_sorted([*_rows(queryset), *series]), duration)
+
+
+def find_series_conflicts(event, user_ids, duration_minutes=None, exclude_event_id=None, exceptions=None):
+    """
+    Como find_conflicts, pero para cada ocurrencia de la serie *event*
+    (Event con rrule, guardado o no) desde su inicio, o desde hoy si ya
+    empezó, hasta SERIES_WINDOW_DAYS días después. *exceptions* son sus
+    EventException (ninguna si la serie es nueva).
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    duration = _duration(duration_minutes)
+    first = max(event.date, timezone.localdate())
+    starts = [
+        timezone.make_aware(datetime.combine(occ.date, occ.time))
+        for occ in occurrences(event, first, first + timedelta(days=SERIES_WINDOW_DAYS),
+                               exceptions=exceptions or [])
+    ]
+    if not starts:
+        return {}
+    # Un día de margen: una reunión de la víspera puede cruzarse con la primera ocurrencia
+    busy = free_busy(user_ids, starts[0].date() - timedelta(days=1), starts[-1].date() + timedelta(days=1),
+                     duration_minutes, exclude_event_id=exclude_event_id)
+    conflicts = {}
+    for user_id, intervals in busy.items():
+        # La ocurrencia más cercana anterior o posterior decide el choque
+        hits = []
+        for interval in intervals:
+            index = bisect_right(starts, interval['start'])
+            nearby = starts[max(index - 1, 0):index + 1]
+            if any(abs(interval['start'] - start) < duration for start in nearby):
+                hits.append(interval)
+        if hits:
+            conflicts[user_id] = hits
+    return conflicts
+
+
+def free_busy(user_ids, start_date, end_date, duration_minutes=None, exclude_event_id=None):
+    """
+    Intervalos ocupados de cada usuario entre start_date y end_date
+    (inclusive), incluidas las ocurrencias de reuniones periódicas.
+    """
+    user_ids = list(user_ids)
+    busy = {user_id: [] for user_id in user_ids}
+    queryset = Participation.objects.filter(
+        user_id__in=user_ids, event__date__range=(start_date, end_date), event__rrule='',
+    )
+    if exclude_event_id is not None:
+        queryset = queryset.exclude(event_id=exclude_event_id)
+    rows = _sorted([*_rows(queryset), *_series_rows(user_ids, start_date, end_date, exclude_event_id)])
+    busy.update(_group(rows, _duration(duration_minutes)))
+    return busy
+
+
+def _group(rows, duration):
+    grouped = defaultdict(list)
+    for user_id, event_id, title, date, time in rows:
+        start = timezone.make_aware(datetime.combine(date, time))
+        grouped[user_id].append({
+            'event_id': event_id,
+            'title': title,
+            'start': start,
+            'end': start + duration,
+        })
+    return dict(grouped)
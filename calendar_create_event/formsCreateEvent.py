@@ -1,6 +1,9 @@
 # calendar_create_event/forms.py
 from django import forms
-from .models import Event
+from django.utils import timezone
+from .models import Event, EventException
+from .availability import find_conflicts, find_series_conflicts
+from .recurrence import iter_dates, parse_rrule
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -13,11 +16,122 @@ class EventForm(forms.ModelForm):
         required=False,
         label="Participantes"
     )
+    ignore_conflicts = forms.BooleanField(
+        required=False,
+        label="Agendar de todas formas aunque haya choques de horario"
+    )
 
     class Meta:
         model = Event
-        fields = ['title', 'description', 'date', 'time', 'meeting_type', 'location', 'link', 'participants']
+        fields = ['title', 'description', 'date', 'time', 'meeting_type', 'location', 'link', 'rrule', 'participants']
         widgets = {
             'date': forms.DateInput(attrs={'type': 'date'}),
             'time': forms.TimeInput(attrs={'type': 'time'}),
         }
+
+    def clean_rrule(self):
+        rrule = (self.cleaned_data.get('rrule') or '').strip().upper()
+        if rrule.startswith('RRULE:'):
+            rrule = rrule[6:]
+        if rrule:
+            try:
+                parse_rrule(rrule)
+            except ValueError as exc:
+                raise forms.ValidationError(str(exc))
+        return rrule
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date, time = cleaned_data.get('date'), cleaned_data.get('time')
+        participants = cleaned_data.get('participants')
+        if not (date and time and participants) or cleaned_data.get('ignore_conflicts'):
+            return cleaned_data
+
+        user_ids = [user.pk for user in participants]
+        rrule = cleaned_data.get('rrule')
+        if rrule:
+            # Cada ocurrencia de la serie, no solo la primera
+            exceptions = list(self.instance.exceptions.all()) if self.instance.pk else []
+            conflicts = find_series_conflicts(
+                Event(date=date, time=time, rrule=rrule), user_ids,
+                exclude_event_id=self.instance.pk, exceptions=exceptions,
+            )
+        else:
+            conflicts = find_conflicts(date, time, user_ids, exclude_event_id=self.instance.pk)
+        if conflicts:
+            names = {user.pk: user.get_full_name for user in participants}
+            detail = '; '.join(
+                f"{names[user_id]}: {', '.join(_describe(c, bool(rrule)) for c in items)}"
+                for user_id, items in conflicts.items()
+            )
+            raise forms.ValidationError(
+                f"Hay participantes con reuniones a esa hora ({detail}).",
+                code='conflict',
+            )
+        return cleaned_data
+
+
+def _describe(conflict, with_date):
+    """Título del choque; en una serie también la fecha, que no es la del formulario."""
+    if with_date:
+        return f"{conflict['title']} ({timezone.localtime(conflict['start']):%d/%m})"
+    return conflict['title']
+
+
+class EventExceptionForm(forms.ModelForm):
+    """Cancela o mueve una ocurrencia de una serie (ver recurrence.py)."""
+    ignore_conflicts = forms.BooleanField(
+        required=False,
+        label="Mover de todas formas aunque haya choques de horario"
+    )
+
+    class Meta:
+        model = EventException
+        fields = ['original_date', 'cancelled', 'new_date', 'new_time']
+        widgets = {
+            'original_date': forms.DateInput(attrs={'type': 'date'}),
+            'new_date': forms.DateInput(attrs={'type': 'date'}),
+            'new_time': forms.TimeInput(attrs={'type': 'time'}),
+        }
+
+    def __init__(self, *args, event, **kwargs):
+        self.event = event
+        super().__init__(*args, **kwargs)
+
+    def clean_original_date(self):
+        day = self.cleaned_data['original_date']
+        if not self.event.rrule:
+            raise forms.ValidationError("La reunión no es periódica.")
+        for occurrence in iter_dates(self.event.date, parse_rrule(self.event.rrule), not_before=day):
+            if occurrence >= day:
+                if occurrence == day:
+                    return day
+                break
+        raise forms.ValidationError("La serie no tiene una ocurrencia en esa fecha.")
+
+    def clean(self):
+        cleaned = super().clean()
+        if not cleaned.get('cancelled') and not (cleaned.get('new_date') or cleaned.get('new_time')):
+            raise forms.ValidationError("Indica si la ocurrencia se cancela o su nueva fecha u hora.")
+        if cleaned.get('cancelled'):
+            cleaned['new_date'] = cleaned['new_time'] = None
+        elif cleaned.get('original_date') and not cleaned.get('ignore_conflicts'):
+            # Mover una ocurrencia es agendarla de nuevo: mismo control que EventForm
+            participants = list(self.event.participants.all())
+            conflicts = find_conflicts(
+                cleaned.get('new_date') or cleaned['original_date'],
+                cleaned.get('new_time') or self.event.time,
+                [user.pk for user in participants],
+                exclude_event_id=self.event.pk,
+            )
+            if conflicts:
+                names = {user.pk: user.get_full_name for user in participants}
+                detail = '; '.join(
+                    f"{names[user_id]}: {', '.join(c['title'] for c in items)}"
+                    for user_id, items in conflicts.items()
+                )
+                raise forms.ValidationError(
+                    f"Hay participantes con reuniones a esa hora ({detail}).",
+                    code='conflict',
+                )
+        return cleaned
@@ -0,0 +1,86 @@
+# ARCHIVO: calendar_create_event/mailer.py
+"""
+Invitaciones a eventos.
+
+La plantilla se renderiza una sola vez por evento con un marcador en el
+lugar del nombre del destinatario; cada mensaje solo sustituye ese
+marcador. Los mensajes van a la bandeja de salida (core.outbox), que los
+envía por lotes, con reintentos, fuera del ciclo de la petición.
+"""
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.template.loader import render_to_string
+from django.utils.html import escape
+
+from core import outbox
+from core.models import OutboxEmail
+
+TEMPLATE_NAME = 'calendar_create_event/email_invitation.html'
+RECIPIENT_MARKER = '%%DESTINATARIO%%'
+GROUP = 'evento:{}'
+
+
+class _RecipientPlaceholder:
+    """Sustituto del usuario en la plantilla; se reemplaza por destinatario."""
+
+    get_full_name = RECIPIENT_MARKER
+
+
+def build_invitations(event):
+    """
+    Construye un mensaje por participante con una sola renderización de
+    la plantilla y una sola consulta de participantes.
+    """
+    subject = f"Invitación: {event.title}"
+    html_template = render_to_string(TEMPLATE_NAME, {
+        'event': event,
+        'user': _RecipientPlaceholder(),
+    })
+    from_email = settings.DEFAULT_FROM_EMAIL
+    messages_ = []
+    for participant in event.participants.only('email', 'first_name', 'last_name'):
+        if not participant.email:
+            continue
+        html = html_template.replace(RECIPIENT_MARKER, escape(participant.get_full_name))
+        msg = EmailMultiAlternatives(subject=subject, body='', from_email=from_email,
+                                     to=[participant.email])
+        msg.attach_alternative(html, "text/html")
+        messages_.append(msg)
+    return messages_
+
+
+def get_delivery_report(event_id):
+    """
+    Estado de las invitaciones de un evento según la bandeja de salida, o
+    None si no se ha encolado ninguna.
+    """
+    rows = (OutboxEmail.objects.filter(group=GROUP.format(event_id))
+            .values_list('to', 'status', 'last_error'))
+    sent, failed, pending = [], {}, []
+    for to, status, error in rows:
+        recipient = to[0] if to else ''
+        if status == OutboxEmail.ENVIADO:
+            sent.append(recipient)
+        elif status == OutboxEmail.FALLIDO:
+            failed[recipient] = error
+        else:
+            pending.append(recipient)
+    if not (sent or failed or pending):
+        return None
+    return {
+        'event_id': event_id,
+        'total': len(sent) + len(failed) + len(pending),
+        'sent': sent,
+        'failed': failed,
+        'pending': pending,
+    }
+
+
+def queue_invitations(event):
+    """
+    Guarda las invitaciones del evento en la bandeja de salida; el
+    trabajador de core.outbox las envía al confirmarse la transacción.
+    """
+    messages_ = build_invitations(event)
+    if messages_:
+        outbox.enqueue_messages(messages_, group=GROUP.format(event.pk))
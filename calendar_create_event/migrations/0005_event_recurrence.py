@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-19 02:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_create_event', '0004_event_date_time_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='rrule',
+            field=models.CharField(blank=True, default='', help_text='Subconjunto de RRULE, p. ej. FREQ=WEEKLY;INTERVAL=1;BYDAY=MO,WE;UNTIL=20251231', max_length=255, verbose_name='Regla de recurrencia'),
+        ),
+        migrations.CreateModel(
+            name='EventException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_date', models.DateField(verbose_name='Fecha original de la ocurrencia')),
+                ('cancelled', models.BooleanField(default=False, verbose_name='Cancelada')),
+                ('new_date', models.DateField(blank=True, null=True, verbose_name='Nueva fecha')),
+                ('new_time', models.TimeField(blank=True, null=True, verbose_name='Nueva hora')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exceptions', to='calendar_create_event.event')),
+            ],
+            options={
+                'unique_together': {('event', 'original_date')},
+            },
+        ),
+    ]
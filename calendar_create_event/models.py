@@ -18,6 +18,47 @@ class Event(models.Model):
         settings.AUTH_USER_MODEL,
         related_name='event_participants'
     )
+    rrule = models.CharField(
+        "Regla de recurrencia", max_length=255, blank=True, default='',
+        help_text="Subconjunto de RRULE, p. ej. FREQ=WEEKLY;INTERVAL=1;BYDAY=MO,WE;UNTIL=20251231",
+    )
+    updated_at = models.DateTimeField("Última modificación", auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Consultas de rango del calendario y de detección de choques
+            models.Index(fields=['date', 'time'], name='event_date_time_idx'),
+        ]
  
     def __str__(self):
-        return f"{self.title} - {self.date}"
\ No newline at end of file
+        return f"{self.title} - {self.date}"
+
+    @property
+    def is_recurring(self):
+        return bool(self.rrule)
+
+    @property
+    def recurrence_label(self):
+        from .recurrence import describe
+        return describe(self.rrule) if self.rrule else ''
+
+    def occurrences(self, start, end):
+        """Ocurrencias entre start y end (inclusive); ver recurrence.py."""
+        from .recurrence import occurrences
+        return list(occurrences(self, start, end))
+
+
+class EventException(models.Model):
+    """Cambio puntual de una ocurrencia de una serie: cancelada o movida."""
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='exceptions')
+    original_date = models.DateField("Fecha original de la ocurrencia")
+    cancelled = models.BooleanField("Cancelada", default=False)
+    new_date = models.DateField("Nueva fecha", null=True, blank=True)
+    new_time = models.TimeField("Nueva hora", null=True, blank=True)
+
+    class Meta:
+        unique_together = ('event', 'original_date')
+
+    def __str__(self):
+        estado = 'cancelada' if self.cancelled else f'movida a {self.new_date or self.original_date}'
+        return f"{self.event.title} ({self.original_date}): {estado}"
\ No newline at end of file
@@ -0,0 +1,185 @@
+# ARCHIVO: calendar_create_event/recurrence.py
+"""
+Reuniones periódicas con un subconjunto de RRULE (RFC 5545).
+
+Una serie es una sola fila de Event con `rrule`; sus ocurrencias no se
+guardan, se generan bajo demanda para el rango que se está mostrando.
+Las excepciones por ocurrencia (cancelada o movida) viven en
+EventException.
+
+Partes soportadas: FREQ=DAILY|WEEKLY|MONTHLY, INTERVAL, COUNT, UNTIL
+(AAAAMMDD) y BYDAY (solo con WEEKLY).
+"""
+import calendar as _calendar
+from datetime import date, datetime, timedelta
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+FREQ_LABELS = {'DAILY': 'diaria', 'WEEKLY': 'semanal', 'MONTHLY': 'mensual'}
+# Ventana (antes y después de hoy) en la que se listan y verifican las series
+SERIES_WINDOW_DAYS = 90
+
+
+def parse_rrule(text):
+    """
+    Convierte la regla en dict. Lanza ValueError si usa partes no
+    soportadas o valores inválidos.
+    """
+    rule = {'freq': None, 'interval': 1, 'count': None, 'until': None, 'byday': None}
+    text = (text or '').strip()
+    if text.upper().startswith('RRULE:'):
+        text = text[6:]
+    for part in filter(None, text.split(';')):
+        name, _, value = part.partition('=')
+        name, value = name.strip().upper(), value.strip().upper()
+        if name == 'FREQ' and value in FREQUENCIES:
+            rule['freq'] = value
+        elif name == 'INTERVAL' and value.isdigit() and int(value) > 0:
+            rule['interval'] = int(value)
+        elif name == 'COUNT' and value.isdigit() and int(value) > 0:
+            rule['count'] = int(value)
+        elif name == 'UNTIL':
+            rule['until'] = datetime.strptime(value[:8], '%Y%m%d').date()
+        elif name == 'BYDAY' and all(day in WEEKDAYS for day in value.split(',')):
+            rule['byday'] = sorted({WEEKDAYS.index(day) for day in value.split(',')})
+        else:
+            raise ValueError(f"Parte de RRULE no soportada: {part}")
+    if rule['freq'] is None:
+        raise ValueError("La regla de recurrencia requiere FREQ.")
+    if rule['byday'] and rule['freq'] != 'WEEKLY':
+        raise ValueError("BYDAY solo se admite con FREQ=WEEKLY.")
+    return rule
+
+
+def describe(text):
+    """Descripción corta para plantillas y correos, p. ej. 'semanal (cada 2)'."""
+    rule = parse_rrule(text)
+    label = FREQ_LABELS[rule['freq']]
+    if rule['interval'] > 1:
+        label += f" (cada {rule['interval']})"
+    if rule['until']:
+        label += f" hasta {rule['until']:%d/%m/%Y}"
+    elif rule['count']:
+        label += f", {rule['count']} veces"
+    return label
+
+
+def _add_months(day, months):
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    if day.day > _calendar.monthrange(year, month)[1]:
+        return None  # el mes no tiene ese día: se omite, como en RFC 5545
+    return date(year, month, day.day)
+
+
+def iter_dates(dtstart, rule, not_before=None):
+    """
+    Genera las fechas de la serie en orden. Sin COUNT salta directamente
+    a *not_before*, de modo que el costo depende del rango consultado y
+    no de la antigüedad de la serie.
+    """
+    interval, count, until = rule['interval'], rule['count'], rule['until']
+    skip = count is None and not_before is not None and not_before > dtstart
+    produced = 0
+
+    def emit(day):
+        nonlocal produced
+        if day < dtstart:
+            return None
+        if until and day > until:
+            return False
+        produced += 1
+        if count and produced > count:
+            return False
+        return True
+
+    if rule['freq'] == 'DAILY':
+        k = (not_before - dtstart).days // interval if skip else 0
+        while True:
+            ok = emit(dtstart + timedelta(days=k * interval))
+            if ok is False:
+                return
+            if ok:
+                yield dtstart + timedelta(days=k * interval)
+            k += 1
+
+    elif rule['freq'] == 'WEEKLY':
+        weekdays = rule['byday'] or [dtstart.weekday()]
+        first_week = dtstart - timedelta(days=dtstart.weekday())
+        k = ((not_before - first_week).days // 7) // interval if skip else 0
+        while True:
+            week = first_week + timedelta(weeks=k * interval)
+            for weekday in weekdays:
+                day = week + timedelta(days=weekday)
+                ok = emit(day)
+                if ok is False:
+                    return
+                if ok:
+                    yield day
+            k += 1
+
+    else:  # MONTHLY
+        k = ((not_before.year - dtstart.year) * 12 + not_before.month - dtstart.month) // interval if skip else 0
+        while True:
+            day = _add_months(dtstart, k * interval)
+            k += 1
+            if day is None:
+                continue
+            ok = emit(day)
+            if ok is False:
+                return
+            if ok:
+                yield day
+
+
+class Occurrence:
+    """
+    Una ocurrencia concreta de un evento. Se comporta como el Event
+    (mismos atributos) con la fecha y hora de esa ocurrencia.
+    """
+
+    def __init__(self, event, day, time=None, original_date=None):
+        self.event = event
+        self.date = day
+        self.time = time or event.time
+        self.original_date = original_date or day
+
+    def __getattr__(self, name):
+        return getattr(self.event, name)
+
+
+def occurrences(event, start, end, exceptions=None):
+    """
+    Ocurrencias de *event* entre start y end (inclusive), aplicando las
+    excepciones dadas (por defecto, las de event.exceptions.all()).
+    """
+    if not event.rrule:
+        if start <= event.date <= end:
+            yield Occurrence(event, event.date)
+        return
+
+    if exceptions is None:
+        exceptions = event.exceptions.all()
+    by_date = {exc.original_date: exc for exc in exceptions}
+    rule = parse_rrule(event.rrule)
+
+    result = []
+    for day in iter_dates(event.date, rule, not_before=start):
+        if day > end:
+            break
+        if day < start:
+            continue
+        exc = by_date.get(day)
+        if exc is None:
+            result.append(Occurrence(event, day))
+        elif not exc.cancelled and start <= (exc.new_date or day) <= end:
+            result.append(Occurrence(event, exc.new_date or day, exc.new_time, day))
+
+    # Ocurrencias movidas hacia el rango desde fuera de él
+    for exc in by_date.values():
+        if exc.cancelled or not exc.new_date or start <= exc.original_date <= end:
+            continue
+        if start <= exc.new_date <= end:
+            result.append(Occurrence(event, exc.new_date, exc.new_time, exc.original_date))
+
+    yield from sorted(result, key=lambda occ: (occ.date, occ.time))
@@ -146,3 +146,305 @@ class EditEventTest(TestCase):
         ev = Event.objects.get(pk=self.ev.id)
         self.assertEqual(ev.title, 'Reacreditación nueva')
         self.assertEqual(ev.location, 'Sala 2')
+
+
+class InvitationMailerTest(TestCase):
+    def setUp(self):
+        self.users = []
+        for i in range(3):
+            u = User.objects.create_user(
+                cedula=f'3333333{i}', email=f'inv{i}@gmail.com', password='Cc3#cccc',
+                first_name=f'Nombre{i}', last_name='Apellido',
+            )
+            self.users.append(u)
+        self.event = Event.objects.create(
+            title='Comité', description='Revisión', date='2025-06-15', time='09:00',
+            meeting_type='Virtual', link='https://zoom.us/abc',
+        )
+        self.event.participants.set(self.users)
+
+    def test_single_render_and_single_connection(self):
+        from unittest.mock import patch
+        from django.core import mail
+        from calendar_create_event import mailer
+        from core import outbox
+
+        with patch('calendar_create_event.mailer.render_to_string',
+                   wraps=mailer.render_to_string) as render, \
+             patch('core.outbox.get_connection', wraps=outbox.get_connection) as conn, \
+             self.settings(OUTBOX_ASYNC=False, OUTBOX_RATE_PER_MINUTE=0):
+            with self.captureOnCommitCallbacks(execute=True):
+                mailer.queue_invitations(self.event)
+                self.assertEqual(conn.call_count, 0)  # nada se envía antes del commit
+
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(conn.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        bodies = {m.to[0]: m.alternatives[0][0] for m in mail.outbox}
+        self.assertIn('Nombre1 Apellido', bodies['inv1@gmail.com'])
+        self.assertNotIn(mailer.RECIPIENT_MARKER, bodies['inv1@gmail.com'])
+
+        report = mailer.get_delivery_report(self.event.pk)
+        self.assertEqual(report['total'], 3)
+        self.assertEqual(report['failed'], {})
+
+    def test_report_records_failures(self):
+        from unittest.mock import patch
+        from calendar_create_event import mailer
+        from core import outbox
+
+        def flaky(messages):
+            if messages[0].to[0] == 'inv2@gmail.com':
+                raise OSError('buzón no disponible')
+            return 1
+
+        self.assertIsNone(mailer.get_delivery_report(self.event.pk))
+        mailer.queue_invitations(self.event)
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                   side_effect=flaky), \
+             self.settings(OUTBOX_MAX_ATTEMPTS=1, OUTBOX_RATE_PER_MINUTE=0):
+            outbox.send_pending()
+        report = mailer.get_delivery_report(self.event.pk)
+        self.assertEqual(len(report['sent']), 2)
+        self.assertIn('inv2@gmail.com', report['failed'])
+
+
+class ConflictDetectionTest(TestCase):
+    def setUp(self):
+        from calendar_create_event.models import Event
+        self.admin = User.objects.create_user(
+            cedula='44444440', email='adm@gmail.com', password='Dd4$dddd', rol='superadmin',
+        )
+        self.admin.is_active = True; self.admin.save()
+        self.busy = User.objects.create_user(cedula='44444441', email='busy@gmail.com', password='x')
+        self.free = User.objects.create_user(cedula='44444442', email='free@gmail.com', password='x')
+        self.existing = Event.objects.create(
+            title='Consejo', date='2025-06-15', time='09:00', meeting_type='Presencial',
+        )
+        self.existing.participants.set([self.busy])
+
+    def test_find_conflicts_window(self):
+        from datetime import date, time
+        from calendar_create_event.availability import find_conflicts
+        ids = [self.busy.pk, self.free.pk]
+        with self.assertNumQueries(2):  # reuniones únicas + series (ninguna)
+            conflicts = find_conflicts(date(2025, 6, 15), time(9, 30), ids)
+        self.assertEqual(list(conflicts), [self.busy.pk])
+        self.assertEqual(find_conflicts(date(2025, 6, 15), time(10, 0), ids), {})
+        self.assertEqual(
+            find_conflicts(date(2025, 6, 15), time(9, 0), ids, exclude_event_id=self.existing.pk), {}
+        )
+
+    def test_free_busy_single_query(self):
+        from datetime import date
+        from calendar_create_event.availability import free_busy
+        with self.assertNumQueries(2):
+            busy = free_busy([self.busy.pk, self.free.pk], date(2025, 6, 1), date(2025, 6, 30))
+        self.assertEqual(busy[self.free.pk], [])
+        self.assertEqual(busy[self.busy.pk][0]['event_id'], self.existing.pk)
+
+    def test_recurring_series_block_their_occurrences(self):
+        from datetime import date, time
+        from calendar_create_event.availability import find_conflicts, free_busy
+        from calendar_create_event.models import Event, EventException
+        series = Event.objects.create(
+            title='Seguimiento', date='2025-01-06', time='14:00', meeting_type='Virtual',
+            rrule='FREQ=WEEKLY',  # lunes
+        )
+        series.participants.set([self.free])
+        EventException.objects.create(event=series, original_date='2025-06-09', cancelled=True)
+        EventException.objects.create(event=series, original_date='2025-06-16',
+                                      new_date='2025-06-17', new_time='08:00')
+
+        ids = [self.free.pk]
+        self.assertEqual(find_conflicts(date(2025, 6, 2), time(14, 30), ids)[self.free.pk][0]['event_id'],
+                         series.pk)
+        self.assertEqual(find_conflicts(date(2025, 6, 9), time(14, 0), ids), {})   # cancelada
+        self.assertEqual(find_conflicts(date(2025, 6, 16), time(14, 0), ids), {})  # movida
+        self.assertIn(self.free.pk, find_conflicts(date(2025, 6, 17), time(8, 30), ids))
+        self.assertEqual(find_conflicts(date(2025, 6, 2), time(14, 0), ids, exclude_event_id=series.pk), {})
+
+        with self.assertNumQueries(3):
+            busy = free_busy(ids, date(2025, 6, 1), date(2025, 6, 30))
+        starts = [(b['start'].day, b['start'].hour) for b in busy[self.free.pk]]
+        self.assertEqual(starts, [(2, 14), (17, 8), (23, 14), (30, 14)])
+
+    def test_form_rejects_conflict_unless_ignored(self):
+        from calendar_create_event.formsCreateEvent import EventForm
+        data = {
+            'title': 'Choque', 'date': '2025-06-15', 'time': '09:15',
+            'meeting_type': 'Presencial', 'participants': [self.busy.pk],
+        }
+        form = EventForm(data)
+        self.assertFalse(form.is_valid())
+        self.assertIn('Consejo', str(form.non_field_errors()))
+        self.assertTrue(EventForm({**data, 'ignore_conflicts': 'on'}).is_valid())
+
+    def test_guardar_evento_returns_409(self):
+        from django.test import RequestFactory
+        from calendar_create_event.views import guardar_evento
+        import json
+        request = RequestFactory().post(
+            '/createEvent/guardar_evento/', content_type='application/json',
+            data=json.dumps({
+                'title': 'Choque', 'description': 'x', 'date': '2025-06-15', 'time': '08:30',
+                'meetingType': 'Presencial', 'participants': [self.busy.pk],
+            }),
+        )
+        request.user = self.admin
+        response = guardar_evento(request)
+        self.assertEqual(response.status_code, 409)
+        self.assertIn(self.busy.pk, json.loads(response.content)['conflicts'])
+
+    def test_new_series_checks_later_occurrences(self):
+        import json
+        from datetime import timedelta
+        from django.test import RequestFactory
+        from django.utils import timezone
+        from calendar_create_event.formsCreateEvent import EventForm
+        from calendar_create_event.views import guardar_evento
+        start = timezone.localdate() + timedelta(days=7)
+        # Libre en la primera ocurrencia, ocupado en la tercera semana
+        Event.objects.create(
+            title='Claustro', date=start + timedelta(days=14), time='10:30', meeting_type='Presencial',
+        ).participants.set([self.free])
+        data = {
+            'title': 'Serie', 'date': start.isoformat(), 'time': '10:00',
+            'meeting_type': 'Presencial', 'participants': [self.free.pk], 'rrule': 'FREQ=WEEKLY',
+        }
+        form = EventForm(data)
+        self.assertFalse(form.is_valid())
+        self.assertIn('Claustro', str(form.non_field_errors()))
+        self.assertTrue(EventForm({**data, 'rrule': ''}).is_valid())
+        self.assertTrue(EventForm({**data, 'rrule': 'FREQ=WEEKLY;COUNT=2'}).is_valid())
+
+        request = RequestFactory().post(
+            '/createEvent/guardar_evento/', content_type='application/json',
+            data=json.dumps({
+                'title': 'Serie', 'description': 'x', 'date': start.isoformat(), 'time': '10:00',
+                'meetingType': 'Presencial', 'participants': [self.free.pk], 'rrule': 'FREQ=WEEKLY',
+            }),
+        )
+        request.user = self.admin
+        response = guardar_evento(request)
+        self.assertEqual(response.status_code, 409)
+        self.assertIn(self.free.pk, json.loads(response.content)['conflicts'])
+
+
+class RecurrenceTest(TestCase):
+    def setUp(self):
+        from calendar_create_event.models import EventException
+        self.series = Event.objects.create(
+            title='Comité semanal', date='2025-06-02', time='08:00',
+            meeting_type='Virtual', link='https://zoom.us/s',
+            rrule='FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20251231',
+        )
+        self.series.refresh_from_db()
+        EventException.objects.create(event=self.series, original_date='2025-06-04', cancelled=True)
+        EventException.objects.create(
+            event=self.series, original_date='2025-06-09', new_date='2025-06-10',
+        )
+
+    def test_parse_rejects_unsupported_parts(self):
+        from calendar_create_event.recurrence import parse_rrule
+        self.assertEqual(parse_rrule('FREQ=DAILY;INTERVAL=2')['interval'], 2)
+        for bad in ('INTERVAL=2', 'FREQ=YEARLY', 'FREQ=DAILY;BYDAY=MO', 'FREQ=DAILY;BYHOUR=9'):
+            with self.assertRaises(ValueError):
+                parse_rrule(bad)
+
+    def test_expansion_applies_exceptions(self):
+        from datetime import date
+        days = [o.date for o in self.series.occurrences(date(2025, 6, 1), date(2025, 6, 15))]
+        self.assertEqual(days, [date(2025, 6, 2), date(2025, 6, 10), date(2025, 6, 11)])
+
+    def test_expansion_cost_independent_of_series_age(self):
+        from datetime import date
+        from calendar_create_event.recurrence import iter_dates, parse_rrule
+        rule = parse_rrule('FREQ=DAILY')
+        first = next(iter_dates(date(2000, 1, 1), rule, not_before=date(2025, 6, 1)))
+        self.assertEqual(first, date(2025, 6, 1))
+
+    def test_count_and_monthly_skip(self):
+        from datetime import date
+        from calendar_create_event.recurrence import iter_dates, parse_rrule
+        days = list(iter_dates(date(2025, 1, 31), parse_rrule('FREQ=MONTHLY;COUNT=3')))
+        self.assertEqual(days, [date(2025, 1, 31), date(2025, 3, 31), date(2025, 5, 31)])
+
+    def test_form_validates_rrule(self):
+        from calendar_create_event.formsCreateEvent import EventForm
+        data = {'title': 'x', 'date': '2025-06-15', 'time': '09:00', 'meeting_type': 'Presencial'}
+        self.assertFalse(EventForm({**data, 'rrule': 'FREQ=HOURLY'}).is_valid())
+        form = EventForm({**data, 'rrule': 'rrule:freq=weekly'})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['rrule'], 'FREQ=WEEKLY')
+
+
+class EventOccurrenceEditTest(TestCase):
+    def setUp(self):
+        from django.test import RequestFactory
+        self.factory = RequestFactory()
+        self.admin = User.objects.create_user(
+            cedula='55555550', email='occ@gmail.com', password='x', rol='superadmin',
+        )
+        self.series = Event.objects.create(
+            title='Semanal', date='2025-06-02', time='09:00', meeting_type='Presencial',
+            rrule='FREQ=WEEKLY;COUNT=4',
+        )
+
+    def _post(self, data):
+        from django.contrib.messages.storage.fallback import FallbackStorage
+        from calendar_create_event.views import edit_occurrence
+        request = self.factory.post(f'/edit/{self.series.pk}/ocurrencia/', data)
+        request.user = self.admin
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        response = edit_occurrence(request, self.series.pk)
+        self.assertEqual(response.status_code, 302)
+        return [str(m) for m in request._messages]
+
+    def test_cancel_move_and_restore(self):
+        from datetime import date, time
+        before = Event.objects.get(pk=self.series.pk).updated_at
+        self._post({'original_date': '2025-06-09', 'cancelled': 'on'})
+        self._post({'original_date': '2025-06-16', 'new_date': '2025-06-17', 'new_time': '15:00'})
+        series = Event.objects.get(pk=self.series.pk)
+        days = [(o.date, o.time) for o in series.occurrences(date(2025, 6, 1), date(2025, 6, 30))]
+        self.assertEqual(days, [(date(2025, 6, 2), time(9)), (date(2025, 6, 17), time(15)),
+                                (date(2025, 6, 23), time(9))])
+        self.assertGreater(series.updated_at, before)
+
+        # Volver a enviar la misma fecha reemplaza la excepción
+        self._post({'original_date': '2025-06-16', 'cancelled': 'on'})
+        self.assertTrue(self.series.exceptions.get(original_date='2025-06-16').cancelled)
+
+        self._post({'accion': 'restaurar', 'original_date': '2025-06-09'})
+        self.assertFalse(self.series.exceptions.filter(original_date='2025-06-09').exists())
+
+    def test_move_checks_participant_conflicts(self):
+        participant = User.objects.create_user(cedula='55555551', email='occ2@gmail.com', password='x')
+        self.series.participants.set([participant])
+        Event.objects.create(
+            title='Consejo', date='2025-06-17', time='15:30', meeting_type='Presencial',
+        ).participants.set([participant])
+        move = {'original_date': '2025-06-16', 'new_date': '2025-06-17', 'new_time': '15:00'}
+        errors = self._post(move)
+        self.assertIn('Consejo', errors[0])
+        self.assertFalse(self.series.exceptions.exists())
+        self._post({**move, 'ignore_conflicts': 'on'})
+        self.assertEqual(self.series.exceptions.get().new_date.isoformat(), '2025-06-17')
+
+    def test_rejects_dates_outside_the_series(self):
+        from calendar_create_event.models import EventException
+        errors = self._post({'original_date': '2025-06-10', 'cancelled': 'on'})  # martes
+        self.assertIn('ocurrencia', errors[0])
+        self._post({'original_date': '2025-06-30', 'cancelled': 'on'})  # después de COUNT=4
+        self._post({'original_date': '2025-06-09'})  # sin acción
+        self._post({'original_date': 'no-es-fecha', 'cancelled': 'on'})
+        self.assertFalse(EventException.objects.exists())
+
+    def test_registered_in_admin(self):
+        from django.contrib import admin
+        from calendar_create_event.models import EventException
+        self.assertIn(Event, admin.site._registry)
+        inlines = admin.site._registry[Event].inlines
+        self.assertEqual([inline.model for inline in inlines], [EventException])
@@ -1,9 +1,12 @@
 from django.urls import path
-from .views import create_event, guardar_evento, edit_event
+from .views import create_event, guardar_evento, edit_event, edit_occurrence, api_free_busy
 
 urlpatterns = [
     path('',              create_event,    name='create_event'),
     path('guardar_evento/', guardar_evento, name='guardar_evento'),
+    path('api/disponibilidad/', api_free_busy, name='api_free_busy'),
     # Event.id is IntegerField, so use <int:…>
     path('edit/<int:event_id>/', edit_event, name='edit_event'),
+    # Cancelar/mover/restaurar una ocurrencia de una serie (POST)
+    path('edit/<int:event_id>/ocurrencia/', edit_occurrence, name='edit_occurrence'),
 ]
\ No newline at end of file
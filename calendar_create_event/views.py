@@ -3,17 +3,20 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
-from django.template.loader import render_to_string
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test # Importaciones añadidas
+from django.views.decorators.http import require_POST
 from django.conf import settings # Para settings.AUTH_USER_MODEL si es necesario aquí
 
 from .models import Event
-from .formsCreateEvent import EventForm
-from .utils import send_invitation_email # Asumo que esta función está en utils.py
+from .formsCreateEvent import EventExceptionForm, EventForm
+from .mailer import queue_invitations
+from .availability import find_conflicts, find_series_conflicts, free_busy
+from .recurrence import parse_rrule
 from login.models import Rol # Importar el modelo Rol de tu app login
 
 import json
+from datetime import datetime, timedelta
 
 # --- Función de prueba de permisos ---
 def user_is_admin_for_meetings(user):
@@ -71,6 +74,26 @@ def guardar_evento(request):
                 if field not in data or not data[field]:
                     return JsonResponse({"success": False, "error": f"El campo '{field}' es obligatorio."}, status=400)
 
+            rrule = (data.get("rrule") or "").strip().upper()
+            if rrule:
+                parse_rrule(rrule)  # ValueError -> 400
+
+            participant_ids = data.get("participants", [])
+            if participant_ids and not data.get("ignoreConflicts"):
+                day = datetime.strptime(data["date"], "%Y-%m-%d").date()
+                hour = datetime.strptime(data["time"][:5], "%H:%M").time()
+                if rrule:
+                    # Cada ocurrencia de la serie, no solo la primera
+                    conflicts = find_series_conflicts(Event(date=day, time=hour, rrule=rrule), participant_ids)
+                else:
+                    conflicts = find_conflicts(day, hour, participant_ids)
+                if conflicts:
+                    return JsonResponse({
+                        "success": False,
+                        "error": "Hay participantes con reuniones a esa hora.",
+                        "conflicts": _serialize_busy(conflicts),
+                    }, status=409)
+
             event = Event.objects.create(
                 title=data["title"],
                 description=data["description"],
@@ -79,10 +102,10 @@ def guardar_evento(request):
                 location=(data.get("location") if data.get("meetingType") == "Presencial" else ""),
                 link=(data.get("link") if data.get("meetingType") == "Virtual" else ""),
                 meeting_type=data["meetingType"],
+                rrule=rrule,
                 # No hay 'organizer' en el modelo Event actual. Si lo añades:
                 # organizer=request.user 
             )
-            participant_ids = data.get("participants", [])
             if participant_ids: # Asegurarse de que participant_ids no sea None
                  event.participants.set(participant_ids)
             
@@ -90,6 +113,8 @@ def guardar_evento(request):
             return JsonResponse({"success": True, "message": "Evento guardado y correos enviados."})
         except json.JSONDecodeError:
             return JsonResponse({"success": False, "error": "Error al decodificar JSON."}, status=400)
+        except ValueError:
+            return JsonResponse({"success": False, "error": "Fecha, hora o recurrencia con formato inválido."}, status=400)
         except Exception as e:
             # Loggear el error real en el servidor para depuración
             # logger.error(f"Error al guardar evento: {str(e)}") 
@@ -121,20 +146,79 @@ def edit_event(request, event_id):
         form = EventForm(instance=evento)
     return render(request, 'calendar_create_event/edit_event.html', {
         'form': form, 
-        'evento': evento
+        'evento': evento,
+        'exception_form': EventExceptionForm(event=evento) if evento.rrule else None,
+        'excepciones': evento.exceptions.order_by('original_date'),
     })
 
+
+@login_required
+@user_passes_test(user_is_admin_for_meetings, login_url='/login/restricted_access/')
+@require_POST
+def edit_occurrence(request, event_id):
+    """
+    Cancela, mueve o restaura (accion=restaurar) una ocurrencia de una serie.
+    La excepción de esa fecha se reemplaza si ya existía.
+    """
+    evento = get_object_or_404(Event, id=event_id)
+    try:
+        day = datetime.strptime(request.POST.get('original_date', ''), "%Y-%m-%d").date()
+    except ValueError:
+        day = None
+
+    if request.POST.get('accion') == 'restaurar':
+        # La señal de EventException actualiza updated_at (ETag del feed .ics)
+        if day is not None and evento.exceptions.filter(original_date=day).delete()[0]:
+            messages.success(request, 'Ocurrencia restaurada.')
+        return redirect('edit_event', event_id=evento.id)
+
+    existing = evento.exceptions.filter(original_date=day).first() if day else None
+    form = EventExceptionForm(request.POST, instance=existing, event=evento)
+    if form.is_valid():
+        exception = form.save(commit=False)
+        exception.event = evento
+        exception.save()
+        estado = 'cancelada' if exception.cancelled else 'movida'
+        messages.success(request, f'Ocurrencia del {exception.original_date:%d/%m/%Y} {estado}.')
+    else:
+        errores = '; '.join(e for errors in form.errors.values() for e in errors)
+        messages.error(request, f'No se pudo modificar la ocurrencia: {errores}')
+    return redirect('edit_event', event_id=evento.id)
+
+@login_required
+@user_passes_test(user_is_admin_for_meetings, login_url='/login/restricted_access/')
+def api_free_busy(request):
+    """
+    Ocupación de varios usuarios en un rango de fechas.
+    Parámetros: ?users=<cedula>,<cedula>&start=YYYY-MM-DD&end=YYYY-MM-DD
+    """
+    user_ids = [u for u in request.GET.get('users', '').split(',') if u]
+    try:
+        start = datetime.strptime(request.GET['start'], "%Y-%m-%d").date()
+        end = datetime.strptime(request.GET['end'], "%Y-%m-%d").date()
+    except (KeyError, ValueError):
+        return JsonResponse({"success": False, "error": "Parámetros start y end requeridos (YYYY-MM-DD)."}, status=400)
+    if not user_ids or end < start or end - start > timedelta(days=62):
+        return JsonResponse({"success": False, "error": "Usuarios o rango inválidos (máximo 62 días)."}, status=400)
+
+    busy = free_busy(user_ids, start, end)
+    return JsonResponse({"success": True, "busy": _serialize_busy(busy)})
+
+
+def _serialize_busy(busy):
+    return {
+        user_id: [
+            {**item, 'start': item['start'].isoformat(), 'end': item['end'].isoformat()}
+            for item in items
+        ]
+        for user_id, items in busy.items()
+    }
+
 # --- Función de ayuda para enviar invitaciones ---
-def _send_invites(event, request): # Añadido request por si es útil para la plantilla o contexto
-    """Envía un correo a cada participante con la invitación."""
-    subject = f"Invitación: {event.title}"
-    # Asegúrate de que settings.AUTH_USER_MODEL está correctamente configurado
-    # y que user.email es el campo correcto para el correo.
-    for user_participant in event.participants.all():
-        html_content = render_to_string('calendar_create_event/email_invitation.html', {
-            'event': event,
-            'user': user_participant, # El usuario participante que recibe el correo
-            'request': request # Opcional, por si la plantilla de correo necesita info del request
-        })
-        # La función send_invitation_email ya debería manejar el from_email desde settings
-        send_invitation_email(user_participant.email, subject, html_content)
\ No newline at end of file
+def _send_invites(event, request): # Se conserva request por compatibilidad con las vistas
+    """
+    Encola las invitaciones del evento. La plantilla se renderiza una vez y
+    el envío ocurre fuera de la petición, tras confirmar la transacción
+    (ver mailer.py).
+    """
+    queue_invitations(event)
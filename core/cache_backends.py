@@ -0,0 +1,151 @@
+# core/cache_backends.py
+"""
+Backends de caché con conteo de aciertos y fallos.
+
+Son los backends de Django (Redis, base de datos, archivos, memoria local) con un mixin
+que cuenta cada lectura. Los contadores se acumulan en la instancia (Django
+crea una por hilo) y cada STATS_FLUSH_EVERY lecturas se suman (incr) a dos
+claves de la propia caché, así que en un backend compartido reflejan a
+todos los workers. `stats()` y el comando `estadisticas_cache` los consultan.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+
+STATS_KEYS = {'hits': 'core:cache_stats:hits', 'misses': 'core:cache_stats:misses'}
+STATS_FLUSH_EVERY = 100
+_MISSING = object()
+
+
+class InstrumentedCacheMixin:
+    """Cuenta aciertos/fallos de get() y get_many() sin contar las lecturas internas."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._pending = {'hits': 0, 'misses': 0}
+        self._local = {'hits': 0, 'misses': 0}
+        self._busy = threading.local()
+
+    def _count(self, hits, misses):
+        if getattr(self._busy, 'depth', 0):
+            return
+        with self._stats_lock:
+            self._pending['hits'] += hits
+            self._pending['misses'] += misses
+            self._local['hits'] += hits
+            self._local['misses'] += misses
+            if sum(self._pending.values()) < STATS_FLUSH_EVERY:
+                return
+            pending, self._pending = self._pending, {'hits': 0, 'misses': 0}
+        self._publish(pending)
+
+    def _publish(self, pending):
+        with self._quiet():
+            for name, amount in pending.items():
+                if not amount:
+                    continue
+                key = STATS_KEYS[name]
+                if self.add(key, amount, None):
+                    continue
+                try:
+                    self.incr(key, amount)
+                except ValueError:  # expulsada entre add e incr
+                    self.set(key, amount, None)
+
+    @contextmanager
+    def _quiet(self):
+        """Las lecturas hechas aquí dentro (internas del backend o de las estadísticas) no cuentan."""
+        self._busy.depth = getattr(self._busy, 'depth', 0) + 1
+        try:
+            yield
+        finally:
+            self._busy.depth -= 1
+
+    def get(self, key, default=None, version=None):
+        with self._quiet():
+            value = super().get(key, _MISSING, version)
+        hit = value is not _MISSING
+        self._count(int(hit), int(not hit))
+        return value if hit else default
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        with self._quiet():
+            found = super().get_many(keys, version)
+        self._count(len(found), len(keys) - len(found))
+        return found
+
+    # En varios backends incr/decr/has_key se resuelven con get(): no son lecturas del usuario
+
+    def incr(self, key, delta=1, version=None):
+        with self._quiet():
+            return super().incr(key, delta, version)
+
+    def decr(self, key, delta=1, version=None):
+        with self._quiet():
+            return super().decr(key, delta, version)
+
+    def has_key(self, key, version=None):
+        with self._quiet():
+            return super().has_key(key, version)
+
+    def flush_stats(self):
+        """Publica de inmediato lo acumulado en esta instancia."""
+        with self._stats_lock:
+            pending, self._pending = self._pending, {'hits': 0, 'misses': 0}
+        self._publish(pending)
+
+    def stats(self):
+        """{'hits', 'misses', 'hit_rate', 'local'}: totales compartidos y los de esta instancia."""
+        self.flush_stats()
+        with self._quiet():
+            shared = self.get_many(STATS_KEYS.values())
+        hits = shared.get(STATS_KEYS['hits'], 0)
+        misses = shared.get(STATS_KEYS['misses'], 0)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else None,
+            'local': dict(self._local),
+        }
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._pending = {'hits': 0, 'misses': 0}
+            self._local = {'hits': 0, 'misses': 0}
+        self.delete_many(STATS_KEYS.values())
+
+
+class InstrumentedRedisCache(InstrumentedCacheMixin, RedisCache):
+    """Redis (o compatible, p. ej. Valkey); requiere el paquete redis."""
+
+
+class InstrumentedDatabaseCache(InstrumentedCacheMixin, DatabaseCache):
+    """
+    Tabla de la base de datos (createcachetable): respaldo sin Redis. incr
+    no es atómico, así que los contadores son aproximados con carga.
+    """
+
+
+class InstrumentedFileBasedCache(InstrumentedCacheMixin, FileBasedCache):
+    """Archivos en disco: solo para un único servidor con poca carga."""
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    """Memoria del proceso: solo para pruebas o un único worker."""
+
+
+def stats():
+    """{alias: stats()} de las cachés configuradas que llevan conteo."""
+    return {
+        alias: caches[alias].stats()
+        for alias in caches.settings
+        if isinstance(caches[alias], InstrumentedCacheMixin)
+    }
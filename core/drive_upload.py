@@ -0,0 +1,61 @@
+# core/drive_upload.py
+"""
+Subida de archivos a Google Drive en sesiones reanudables por bloques.
+
+El archivo se lee directamente desde el UploadedFile de Django (en memoria
+o TemporaryUploadedFile en disco) o desde cualquier archivo abierto, un
+bloque de DRIVE_UPLOAD_CHUNK_SIZE bytes a la vez. La memoria por subida
+queda acotada al tamaño de bloque, sin importar el tamaño del archivo.
+"""
+from django.conf import settings
+from googleapiclient.http import MediaIoBaseUpload
+
+# Drive exige bloques múltiplos de 256 KiB (salvo el último)
+CHUNK_UNIT = 256 * 1024
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+NUM_RETRIES = 3
+
+
+def chunk_size(value=None):
+    """Tamaño de bloque configurado, redondeado a un múltiplo de 256 KiB."""
+    value = value or getattr(settings, 'DRIVE_UPLOAD_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    return max(CHUNK_UNIT, (int(value) // CHUNK_UNIT) * CHUNK_UNIT)
+
+
+class ChunkedFileUpload(MediaIoBaseUpload):
+    """
+    MediaIoBaseUpload que nunca entrega el stream completo al cliente HTTP:
+    cada petición lee solo el bloque en curso con getbytes().
+    """
+
+    def has_stream(self):
+        return False
+
+
+def _raw_file(fileobj):
+    # UploadedFile envuelve el archivo real en .file; se usa ese directamente
+    return getattr(fileobj, 'file', fileobj)
+
+
+def media_for(fileobj, mimetype=None, chunksize=None):
+    """Adaptador de un UploadedFile (o archivo abierto) para una subida reanudable."""
+    raw = _raw_file(fileobj)
+    raw.seek(0)
+    mimetype = mimetype or getattr(fileobj, 'content_type', None) or 'application/octet-stream'
+    return ChunkedFileUpload(raw, mimetype=mimetype, chunksize=chunk_size(chunksize), resumable=True)
+
+
+def upload(drive, fileobj, metadata, mimetype=None, fields='id', chunksize=None, progress=None):
+    """
+    Sube *fileobj* a Drive bloque a bloque y retorna la respuesta de
+    files().create. *progress*, si se da, recibe los bytes enviados.
+    """
+    media = media_for(fileobj, mimetype=mimetype, chunksize=chunksize)
+    request = drive.files().create(body=metadata, media_body=media, fields=fields)
+    response = None
+    while response is None:
+        status, response = request.next_chunk(num_retries=NUM_RETRIES)
+        if status is not None and progress is not None:
+            progress(status.resumable_progress)
+    return response
+
@@ -0,0 +1,33 @@
+# core/management/commands/enviar_correos.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import outbox
+
+
+class Command(BaseCommand):
+    help = "Envía los correos pendientes de la bandeja de salida (core.OutboxEmail)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limite",
+            type=int,
+            default=None,
+            help="Mensajes por lote (por defecto OUTBOX_BATCH_SIZE).",
+        )
+        parser.add_argument(
+            "--continuo",
+            action="store_true",
+            help=f"No termina: revisa la bandeja cada {outbox.POLL_INTERVAL} segundos.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            enviados, fallidos = outbox.send_all(options["limite"])
+            if enviados or fallidos:
+                self.stdout.write(f"{enviados} enviados, {fallidos} fallidos.")
+            if not options["continuo"]:
+                break
+            time.sleep(outbox.POLL_INTERVAL)
+        self.stdout.write(self.style.SUCCESS("Bandeja de salida procesada."))
@@ -0,0 +1,29 @@
+# core/management/commands/estadisticas_cache.py
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+
+from core import cache_backends
+
+
+class Command(BaseCommand):
+    help = "Muestra aciertos, fallos y tasa de acierto de las cachés (sumando todos los workers)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reiniciar",
+            action="store_true",
+            help="Pone los contadores en cero después de mostrarlos.",
+        )
+
+    def handle(self, *args, **options):
+        resultados = cache_backends.stats()
+        if not resultados:
+            self.stdout.write("Ninguna caché configurada lleva conteo (use core.cache_backends).")
+            return
+        for alias, datos in resultados.items():
+            tasa = "sin lecturas" if datos["hit_rate"] is None else f"{datos['hit_rate']:.1%}"
+            self.stdout.write(f"{alias}: {datos['hits']} aciertos, {datos['misses']} fallos ({tasa})")
+            if options["reiniciar"]:
+                caches[alias].reset_stats()
+        if options["reiniciar"]:
+            self.stdout.write(self.style.SUCCESS("Contadores reiniciados."))
@@ -3,12 +3,15 @@
 # =============================================
 """Mixins de acceso rápido para views basados en los helpers de permisos."""
 from __future__ import annotations
+import hashlib
 from typing import Iterable, Optional
 
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.core.exceptions import PermissionDenied
+from django.middleware.csrf import get_token
 from django.shortcuts import redirect
+from django.utils.cache import get_conditional_response, patch_cache_control
 
 from assignments.models import AssignmentRole
 from core.permissions import (
@@ -76,6 +79,64 @@ class FactorRoleRequiredMixin(LoginRequiredMixin):
         request.current_permission_role = role  # type: ignore[attr-defined]
         return super().dispatch(request, *args, **kwargs)
 
+# ---------------------------------------------------------------------------
+# GET condicional (ETag) para vistas de detalle
+# ---------------------------------------------------------------------------
+
+class ConditionalDetailMixin:
+    """
+    Responde ``304 Not Modified`` en visitas repetidas a un detalle sin cambios.
+
+    El ETag se calcula con los sellos ``updated_at`` del objeto y de los
+    ancestros listados en *version_ancestors* (rutas tipo ``trait__factor``),
+    junto con el rol del usuario. Se evalúa después de los permisos y antes
+    de ``get_context_data``. Debe ir detrás de ``ObjectPermissionRequiredMixin``.
+    """
+    version_ancestors: Iterable[str] = ()
+
+    def get_version_stamps(self, obj):
+        stamps = [obj.updated_at]
+        for path in self.version_ancestors:
+            related = obj
+            for attr in path.split('__'):
+                related = getattr(related, attr)
+            stamps.append(related.updated_at)
+        return stamps
+
+    def get_etag(self, obj) -> str:
+        request = self.request
+        user = request.user
+        get_token(request)  # garantiza que CSRF_COOKIE exista desde la primera visita
+        parts = [
+            obj._meta.label_lower,
+            str(obj.pk),
+            *(stamp.isoformat() for stamp in self.get_version_stamps(obj)),
+            str(getattr(request, 'current_permission_role', None)),
+            str(user.pk),
+            str(getattr(user, 'rol', '')),
+            # El token CSRF de los formularios cambia al iniciar sesión de nuevo.
+            request.META.get('CSRF_COOKIE', ''),
+        ]
+        return '"%s"' % hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object_for_permission()
+        etag = self.get_etag(self.object)
+
+        # Con mensajes pendientes la página cambia aunque el objeto no.
+        if not len(messages.get_messages(request)):
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                not_modified['ETag'] = etag
+                patch_cache_control(not_modified, private=True, no_cache=True)
+                return not_modified
+
+        context = self.get_context_data(object=self.object)
+        response = self.render_to_response(context)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
 # ---------------------------------------------------------------------------
 # Facilitar importación desde *core.mixins*
 # ---------------------------------------------------------------------------
@@ -85,6 +146,6 @@ FilteredListPermissionMixin  = FilteredListPermissionMixin
 
 __all__ = [
     'ElevatedAccessRequiredMixin', 'AdminOrMiniAdminRequiredMixin',
-    'ProjectRoleRequiredMixin', 'FactorRoleRequiredMixin',
+    'ProjectRoleRequiredMixin', 'FactorRoleRequiredMixin', 'ConditionalDetailMixin',
     'ObjectPermissionRequiredMixin', 'FilteredListPermissionMixin',
 ]
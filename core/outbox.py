@@ -0,0 +1,244 @@
+# core/outbox.py
+"""
+Bandeja de salida de correo.
+
+Las vistas no hablan con SMTP. `enqueue()` guarda cada mensaje en
+OutboxEmail y, al confirmarse la transacción, despierta un hilo que los
+envía por lotes:
+
+- Reclama hasta OUTBOX_BATCH_SIZE mensajes (SELECT ... FOR UPDATE SKIP
+  LOCKED en PostgreSQL), así que varios workers no envían el mismo dos
+  veces.
+- Abre una sola conexión SMTP por lote y la reutiliza.
+- Respeta OUTBOX_RATE_PER_MINUTE mensajes por minuto (límite del
+  proveedor) entre todos los procesos: el cupo de cada minuto es un
+  contador en la caché, y un lote solo reclama los mensajes que caben en
+  él. Lo que no cabe queda para el minuto siguiente, sin dormir con la
+  conexión abierta.
+- Un fallo reprograma el mensaje con espera exponencial. Después de
+  OUTBOX_MAX_ATTEMPTS intentos queda como 'fallido'.
+
+El hilo también revisa la tabla cada POLL_INTERVAL segundos para tomar
+los reintentos, pero solo existe en el proceso web que encoló correo.
+`enviar_correos --continuo` (proceso worker del Procfile) hace el mismo
+trabajo de forma permanente, así que los reintentos no dependen de que
+alguien vuelva a encolar tras un reinicio.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 30
+CLAIM_TIMEOUT = timedelta(minutes=10)
+BACKOFF_BASE = 30
+BACKOFF_MAX = 60 * 60
+RATE_WINDOW = 60
+
+_wake = threading.Event()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue_messages(messages, group=''):
+    """Guarda *messages* (EmailMessage/EmailMultiAlternatives) para enviarlos tras el commit."""
+    rows = []
+    for msg in messages:
+        html = next((content for content, mimetype in getattr(msg, 'alternatives', [])
+                     if mimetype == 'text/html'), '')
+        rows.append(OutboxEmail(
+            subject=msg.subject[:255], body=msg.body or '', html=html,
+            from_email=msg.from_email or '', to=list(msg.to), group=group,
+        ))
+    if rows:
+        OutboxEmail.objects.bulk_create(rows)
+        schedule()
+    return rows
+
+
+def enqueue(subject, body, to, html='', from_email=None, group=''):
+    """Atajo para un solo mensaje; *to* es una lista de direcciones."""
+    msg = EmailMultiAlternatives(subject=subject, body=body, from_email=from_email, to=list(to))
+    if html:
+        msg.attach_alternative(html, 'text/html')
+    return enqueue_messages([msg], group=group)[0]
+
+
+def _claim(limit):
+    """Marca como 'enviando' hasta *limit* mensajes listos y los retorna."""
+    now = timezone.now()
+    ready = (Q(status=OutboxEmail.PENDIENTE, next_attempt_at__lte=now)
+             # Reclamados por un proceso que murió a mitad del lote
+             | Q(status=OutboxEmail.ENVIANDO, claimed_at__lt=now - CLAIM_TIMEOUT))
+    with transaction.atomic():
+        ids = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(ready).order_by('next_attempt_at', 'pk')
+            .values_list('pk', flat=True)[:limit]
+        )
+        OutboxEmail.objects.filter(pk__in=ids).update(status=OutboxEmail.ENVIANDO, claimed_at=now)
+    return list(OutboxEmail.objects.filter(pk__in=ids).order_by('pk'))
+
+
+def _build(row, connection):
+    msg = EmailMultiAlternatives(subject=row.subject, body=row.body, to=row.to,
+                                 from_email=row.from_email or None, connection=connection)
+    if row.html:
+        msg.attach_alternative(row.html, 'text/html')
+    return msg
+
+
+def _reserve(limit):
+    """
+    Reserva hasta *limit* envíos del cupo del minuto actual. Retorna
+    (reservados, clave del contador); la clave es None sin
+    OUTBOX_RATE_PER_MINUTE (0 = sin límite).
+    """
+    rate = _setting('OUTBOX_RATE_PER_MINUTE', 60)
+    if not rate:
+        return limit, None
+    key = f"outbox:rate:{int(time.time() // RATE_WINDOW)}"
+    # Dos minutos de vida: sobra para el lote que lo está usando
+    if cache.add(key, limit, RATE_WINDOW * 2):
+        used = limit
+    else:
+        try:
+            used = cache.incr(key, limit)
+        except ValueError:  # expiró entre add e incr
+            cache.set(key, limit, RATE_WINDOW * 2)
+            used = limit
+    granted = max(0, min(limit, rate - (used - limit)))
+    _release(key, limit - granted)
+    return granted, key
+
+
+def _release(key, count):
+    """Devuelve al contador *count* envíos reservados que no se usaron."""
+    if key is None or count <= 0:
+        return
+    try:
+        cache.decr(key, count)
+    except ValueError:
+        pass
+
+
+def _failed(row, error):
+    max_attempts = _setting('OUTBOX_MAX_ATTEMPTS', 5)
+    attempts = row.attempts + 1
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    OutboxEmail.objects.filter(pk=row.pk).update(
+        attempts=F('attempts') + 1,
+        last_error=str(error)[:2000],
+        status=OutboxEmail.FALLIDO if attempts >= max_attempts else OutboxEmail.PENDIENTE,
+        next_attempt_at=timezone.now() + timedelta(seconds=delay),
+        claimed_at=None,
+    )
+
+
+def send_pending(limit=None):
+    """
+    Envía un lote de mensajes listos por una sola conexión.
+    Retorna (enviados, fallidos).
+    """
+    quota, key = _reserve(limit or _setting('OUTBOX_BATCH_SIZE', 50))
+    if not quota:
+        return 0, 0
+    rows = _claim(quota)
+    _release(key, quota - len(rows))
+    if not rows:
+        return 0, 0
+    sent, failures = [], 0
+    connection = get_connection()
+    try:
+        connection.open()
+        for row in rows:
+            try:
+                connection.send_messages([_build(row, connection)])
+                sent.append(row.pk)
+            except Exception as exc:
+                failures += 1
+                logger.warning(f"CORREO: Falló el envío de {row.pk} a {row.to}: {exc}")
+                _failed(row, exc)
+    except Exception as exc:
+        # No se pudo abrir la conexión: todo lo no enviado vuelve a la cola
+        logger.error(f"CORREO: No se pudo conectar al servidor SMTP: {exc}")
+        done = set(sent)
+        for row in rows:
+            if row.pk not in done:
+                failures += 1
+                _failed(row, exc)
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            pass
+    if sent:
+        OutboxEmail.objects.filter(pk__in=sent).update(
+            status=OutboxEmail.ENVIADO, sent_at=timezone.now(), attempts=F('attempts') + 1,
+            last_error='', claimed_at=None,
+        )
+    logger.info(f"CORREO: Lote de {len(rows)}: {len(sent)} enviados, {failures} fallidos.")
+    return len(sent), failures
+
+
+def send_all(limit=None):
+    """Envía lotes hasta que no quede nada listo. Retorna (enviados, fallidos)."""
+    total_sent = total_failed = 0
+    while True:
+        sent, failed = send_pending(limit)
+        total_sent += sent
+        total_failed += failed
+        if not sent and not failed:
+            return total_sent, total_failed
+
+
+# --- Trabajador en segundo plano ---
+
+def _work():
+    while True:
+        _wake.wait(POLL_INTERVAL)
+        _wake.clear()
+        try:
+            send_all()
+        except Exception:
+            logger.exception("CORREO: Error en el trabajador de la bandeja de salida")
+        finally:
+            close_old_connections()
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_work, name='outbox-mailer', daemon=True)
+            _worker.start()
+
+
+def schedule():
+    """
+    Despierta al trabajador al confirmarse la transacción actual. Con
+    OUTBOX_ASYNC = False se envía en línea tras el commit.
+    """
+    def _dispatch():
+        if _setting('OUTBOX_ASYNC', True):
+            _ensure_worker()
+            _wake.set()
+        else:
+            send_all()
+
+    transaction.on_commit(_dispatch)
@@ -95,6 +95,21 @@ def get_trait_permission(user: 'AbstractBaseUser', trait: Trait) -> Optional[str
 def get_aspect_permission(user: 'AbstractBaseUser', aspect: Aspect) -> Optional[str]:
     return get_trait_permission(user, aspect.trait)
 
+def visible_traits(user: 'AbstractBaseUser'):
+    """
+    Características que *user* puede ver, con la misma regla que
+    get_trait_permission (asignación al proyecto o directa al factor), en
+    una sola consulta.
+    """
+    if not user.is_authenticated:
+        return Trait.objects.none()
+    if user.is_superuser or getattr(user, 'has_elevated_permissions', False):
+        return Trait.objects.all()
+    return Trait.objects.filter(
+        Q(factor__project__in=ProjectAssignment.objects.filter(user=user).values('project'))
+        | Q(factor__in=FactorAssignment.objects.filter(user=user).values('factor'))
+    )
+
 # ---------------------------------------------------------------------------
 # Comodidades para templates y pruebas
 # ---------------------------------------------------------------------------
@@ -249,6 +264,7 @@ class FilteredListPermissionMixin:
 __all__ = [
     'AssignmentRole',
     'get_project_permission', 'get_factor_permission', 'get_trait_permission', 'get_aspect_permission',
+    'visible_traits',
     'can_view', 'can_comment', 'can_edit',
     'ObjectPermissionRequiredMixin', 'FilteredListPermissionMixin',
 ]
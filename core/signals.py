@@ -0,0 +1,56 @@
+# =============================================
+# core/signals.py
+# =============================================
+"""
+Mantiene el sello de versión (``updated_at``) de la jerarquía
+Proyecto → Factor → Trait → Aspect.
+
+Cada vez que cambia un hijo se "toca" a sus ancestros con un único UPDATE
+por nivel (sin pasar por ``save()`` para no disparar lógica de Drive ni
+recálculos de progreso). Las vistas de detalle usan estos sellos para
+calcular su ETag (ver ``core.mixins.ConditionalDetailMixin``).
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from assignments.models import FactorAssignment
+from aspectManager.models import Aspect
+from database.models import File
+from factorManager.models import Factor
+from projects.models import Project
+from traitManager.models import Trait
+
+
+@receiver([post_save, post_delete], sender=Factor)
+def _touch_factor_ancestors(sender, instance, **kwargs):
+    Project.objects.filter(pk=instance.project_id).update(updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=Trait)
+def _touch_trait_ancestors(sender, instance, **kwargs):
+    now = timezone.now()
+    Factor.objects.filter(pk=instance.factor_id).update(updated_at=now)
+    Project.objects.filter(factors=instance.factor_id).update(updated_at=now)
+
+
+@receiver([post_save, post_delete], sender=Aspect)
+def _touch_aspect_ancestors(sender, instance, **kwargs):
+    now = timezone.now()
+    Trait.objects.filter(pk=instance.trait_id).update(updated_at=now)
+    Factor.objects.filter(traits=instance.trait_id).update(updated_at=now)
+    Project.objects.filter(factors__traits=instance.trait_id).update(updated_at=now)
+
+
+@receiver([post_save, post_delete], sender=File)
+def _touch_attachment_owner(sender, instance, **kwargs):
+    # Los adjuntos sólo se muestran en el detalle de la característica.
+    if instance.object_id and instance.content_type_id == ContentType.objects.get_for_model(Trait).id:
+        Trait.objects.filter(pk=instance.object_id).update(updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=FactorAssignment)
+def _touch_assignment_project(sender, instance, **kwargs):
+    # Lectores/comentadores sólo ven en el proyecto los factores asignados.
+    Project.objects.filter(factors=instance.factor_id).update(updated_at=timezone.now())
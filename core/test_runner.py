@@ -0,0 +1,27 @@
+# core/test_runner.py
+"""
+Runner de pruebas del proyecto.
+
+Cambia las cachés configuradas por memoria local durante las pruebas, para
+no depender de Redis ni arrastrar estado entre ejecuciones. Lo usa
+TEST_RUNNER en settings, así que aplica con cualquier --settings que
+herede de todo_app.settings.
+"""
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._caches = override_settings(CACHES={
+            alias: {'BACKEND': 'core.cache_backends.InstrumentedLocMemCache', 'LOCATION': alias}
+            for alias in settings.CACHES
+        })
+        self._caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._caches.disable()
+        super().teardown_test_environment(**kwargs)
@@ -34,3 +34,216 @@ class CoreCoverageTest(TestCase):
                 # Ejecuta el 'pass' en la coordenada (path, lineno)
                 exec(compile(snippet, path, 'exec'), {})
 
+
+
+class DriveUploadTest(TestCase):
+
+    def test_chunk_size_rounded_to_drive_unit(self):
+        from core import drive_upload
+        self.assertEqual(drive_upload.chunk_size(1), drive_upload.CHUNK_UNIT)
+        self.assertEqual(drive_upload.chunk_size(700 * 1024), 512 * 1024)
+        with self.settings(DRIVE_UPLOAD_CHUNK_SIZE=1024 * 1024):
+            self.assertEqual(drive_upload.chunk_size(), 1024 * 1024)
+
+    def test_upload_reads_fixed_chunks_from_uploaded_file(self):
+        from unittest.mock import MagicMock
+        from django.core.files.uploadedfile import TemporaryUploadedFile
+        from core import drive_upload
+
+        data = os.urandom(drive_upload.CHUNK_UNIT * 2 + 100)
+        uploaded = TemporaryUploadedFile('evidencia.zip', 'application/zip', len(data), None)
+        uploaded.write(data)
+        self.addCleanup(uploaded.close)
+
+        reads, received = [], bytearray()
+
+        class FakeRequest:
+            def __init__(self, media):
+                self.media, self.offset = media, 0
+
+            def next_chunk(self, num_retries=0):
+                chunk = self.media.getbytes(self.offset, self.media.chunksize())
+                reads.append(len(chunk))
+                received.extend(chunk)
+                self.offset += len(chunk)
+                if self.offset >= self.media.size():
+                    return None, {'id': 'DRIVEID'}
+                return MagicMock(resumable_progress=self.offset), None
+
+        drive = MagicMock()
+        drive.files.return_value.create.side_effect = lambda body, media_body, fields: FakeRequest(media_body)
+        progress = []
+        result = drive_upload.upload(drive, uploaded, {'name': 'evidencia.zip'},
+                                     chunksize=drive_upload.CHUNK_UNIT, progress=progress.append)
+
+        self.assertEqual(result, {'id': 'DRIVEID'})
+        self.assertEqual(bytes(received), data)
+        self.assertEqual(max(reads), drive_upload.CHUNK_UNIT)
+        self.assertEqual(progress, [drive_upload.CHUNK_UNIT, drive_upload.CHUNK_UNIT * 2])
+        media = drive.files.return_value.create.call_args.kwargs['media_body']
+        self.assertFalse(media.has_stream())
+        self.assertEqual(media.mimetype(), 'application/zip')
+
+
+class InstrumentedCacheTest(TestCase):
+    """Conteo de aciertos/fallos compartido entre instancias (workers)."""
+
+    def _cache(self, location):
+        from core.cache_backends import InstrumentedFileBasedCache
+        return InstrumentedFileBasedCache(location, {})
+
+    def test_hits_and_misses_are_shared_between_workers(self):
+        import tempfile
+        from unittest.mock import patch
+        from core import cache_backends
+
+        with tempfile.TemporaryDirectory() as location, patch.object(cache_backends, 'STATS_FLUSH_EVERY', 2):
+            worker_a, worker_b = self._cache(location), self._cache(location)
+            worker_a.set('clave', 1)
+            self.assertEqual(worker_a.get('clave'), 1)
+            self.assertIsNone(worker_a.get('otra'))
+            self.assertEqual(worker_b.get_many(['clave', 'otra', 'tercera']), {'clave': 1})
+
+            stats = worker_b.stats()
+            self.assertEqual((stats['hits'], stats['misses']), (2, 3))
+            self.assertAlmostEqual(stats['hit_rate'], 0.4)
+            self.assertEqual(stats['local'], {'hits': 1, 'misses': 2})
+
+            worker_a.reset_stats()
+            self.assertIsNone(worker_b.stats()['hit_rate'])
+
+    def test_internal_reads_are_not_counted(self):
+        from core.cache_backends import InstrumentedLocMemCache
+        cache = InstrumentedLocMemCache('prueba-interna', {})
+        cache.set('n', 1)
+        cache.incr('n')           # BaseCache.incr lee con get()
+        cache.get_many(['n', 'x'])  # LocMem resuelve get_many con get()
+        self.assertEqual(cache.stats()['local'], {'hits': 1, 'misses': 1})
+
+    def test_file_cache_incr_is_not_a_hit(self):
+        import tempfile
+        with tempfile.TemporaryDirectory() as location:
+            cache = self._cache(location)
+            cache.set('n', 1)
+            cache.incr('n')        # FileBasedCache hereda incr de BaseCache (get + set)
+            cache.incr('n')
+            cache.decr('n')
+            self.assertTrue(cache.has_key('n'))
+            self.assertEqual(cache.get('n'), 2)
+            self.assertEqual(cache.stats()['local'], {'hits': 1, 'misses': 0})
+
+    def test_database_cache_counts_reads(self):
+        from django.core.management import call_command
+        from core.cache_backends import InstrumentedDatabaseCache
+        call_command('createcachetable', 'cache_prueba', verbosity=0)
+        cache = InstrumentedDatabaseCache('cache_prueba', {})
+        cache.set('n', 1)
+        cache.incr('n')
+        self.assertEqual(cache.get('n'), 2)
+        self.assertIsNone(cache.get('x'))
+        self.assertEqual(cache.stats()['local'], {'hits': 1, 'misses': 1})
+
+    def test_settings_keep_sessions_in_database(self):
+        from django.conf import settings
+        from django.core.cache import caches
+        from core.cache_backends import InstrumentedLocMemCache
+        self.assertIn(settings.SESSION_ENGINE, ('django.contrib.sessions.backends.db',
+                                                'django.contrib.sessions.backends.cached_db'))
+        self.assertTrue(settings.CACHES['default']['BACKEND'].startswith('core.cache_backends.'))
+        # El runner de pruebas cambia las cachés por memoria local
+        self.assertIsInstance(caches['default'], InstrumentedLocMemCache)
+
+
+class OutboxTest(TestCase):
+    def _enqueue(self, n, group='prueba'):
+        from core import outbox
+        for i in range(n):
+            outbox.enqueue(f'Asunto {i}', 'Cuerpo', [f'dest{i}@gmail.com'], group=group)
+
+    def test_enqueue_waits_for_commit(self):
+        from django.core import mail
+        from core import outbox
+        from core.models import OutboxEmail
+
+        with self.settings(OUTBOX_ASYNC=False, OUTBOX_RATE_PER_MINUTE=0):
+            with self.captureOnCommitCallbacks(execute=True):
+                outbox.enqueue('Hola', 'Cuerpo', ['a@gmail.com'], html='<p>Hola</p>')
+                self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].alternatives[0][0], '<p>Hola</p>')
+        row = OutboxEmail.objects.get()
+        self.assertEqual(row.status, OutboxEmail.ENVIADO)
+        self.assertIsNotNone(row.sent_at)
+
+    def test_batch_uses_single_connection(self):
+        from unittest.mock import patch
+        from django.core import mail
+        from core import outbox
+
+        self._enqueue(5)
+        with patch('core.outbox.get_connection', wraps=outbox.get_connection) as conn, \
+             self.settings(OUTBOX_BATCH_SIZE=3, OUTBOX_RATE_PER_MINUTE=0):
+            self.assertEqual(outbox.send_pending(), (3, 0))
+            self.assertEqual(conn.call_count, 1)
+            self.assertEqual(outbox.send_all(), (2, 0))
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(outbox.send_pending(), (0, 0))  # nada se envía dos veces
+
+    def test_failures_back_off_until_fallido(self):
+        from datetime import timedelta
+        from unittest.mock import patch
+        from django.utils import timezone
+        from core import outbox
+        from core.models import OutboxEmail
+
+        self._enqueue(1)
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                   side_effect=OSError('buzón no disponible')), \
+             self.settings(OUTBOX_MAX_ATTEMPTS=2, OUTBOX_RATE_PER_MINUTE=0):
+            self.assertEqual(outbox.send_pending(), (0, 1))
+            row = OutboxEmail.objects.get()
+            self.assertEqual((row.status, row.attempts), (OutboxEmail.PENDIENTE, 1))
+            self.assertGreater(row.next_attempt_at, timezone.now())
+            self.assertEqual(outbox.send_pending(), (0, 0))  # aún en espera
+
+            OutboxEmail.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+            self.assertEqual(outbox.send_pending(), (0, 1))
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), (OutboxEmail.FALLIDO, 2))
+        self.assertIn('buzón', row.last_error)
+
+    def test_stale_claims_are_retaken(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from core import outbox
+        from core.models import OutboxEmail
+
+        self._enqueue(2)
+        OutboxEmail.objects.update(status=OutboxEmail.ENVIANDO, claimed_at=timezone.now())
+        stale = OutboxEmail.objects.first()
+        OutboxEmail.objects.filter(pk=stale.pk).update(
+            claimed_at=timezone.now() - outbox.CLAIM_TIMEOUT - timedelta(minutes=1))
+        with self.settings(OUTBOX_RATE_PER_MINUTE=0):
+            self.assertEqual(outbox.send_pending(), (1, 0))
+        self.assertEqual(OutboxEmail.objects.get(pk=stale.pk).status, OutboxEmail.ENVIADO)
+
+    def test_rate_limit_is_shared_through_the_cache(self):
+        from unittest.mock import patch
+        from django.core.cache import cache
+        from core import outbox
+        from core.models import OutboxEmail
+
+        cache.clear()
+        self._enqueue(4)
+        with patch('core.outbox.time.time', return_value=600.0), \
+             self.settings(OUTBOX_RATE_PER_MINUTE=3):
+            self.assertEqual(outbox.send_pending(limit=2), (2, 0))
+            # Otro proceso ve el mismo contador: solo queda un envío este minuto
+            self.assertEqual(outbox.send_all(), (1, 0))
+            self.assertEqual(outbox.send_pending(), (0, 0))
+            self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.PENDIENTE).count(), 1)
+        with patch('core.outbox.time.time', return_value=660.0), \
+             self.settings(OUTBOX_RATE_PER_MINUTE=3):
+            self.assertEqual(outbox.send_all(), (1, 0))
+            # El cupo no usado vuelve al contador
+            self.assertEqual(cache.get(f'outbox:rate:{660 // outbox.RATE_WINDOW}'), 1)
@@ -0,0 +1,23 @@
+# core/user_search.py
+"""
+Filtro de usuarios por prefijo, compartido por los selectores de
+asignaciones (assignments.user_search) y la gestión de cuentas
+(login.accounts).
+
+Cada palabra de la consulta debe ser prefijo del nombre, el apellido, el
+email o la cédula (sin distinguir mayúsculas). En PostgreSQL esas
+comparaciones usan los índices de patrón de login.0003.
+"""
+from django.db.models import Q
+
+MAX_QUERY_WORDS = 4
+
+
+def matching(queryset, query):
+    """Filtra *queryset* dejando los usuarios donde cada palabra de *query* es un prefijo."""
+    for word in (query or '').split()[:MAX_QUERY_WORDS]:
+        queryset = queryset.filter(
+            Q(first_name__istartswith=word) | Q(last_name__istartswith=word)
+            | Q(email__istartswith=word) | Q(cedula__startswith=word)
+        )
+    return queryset
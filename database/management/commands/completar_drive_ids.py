@@ -0,0 +1,49 @@
+# database/management/commands/completar_drive_ids.py
+from django.core.management.base import BaseCommand
+
+from database.models import File
+
+
+class Command(BaseCommand):
+    help = "Completa File.drive_file_id a partir de drive_link en los adjuntos que aún no lo tienen."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Filas actualizadas por consulta (por defecto 500).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Solo informa cuántos enlaces se reconocen, sin guardar.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        pendientes = (File.objects.filter(drive_file_id__isnull=True)
+                      .exclude(drive_link__isnull=True).exclude(drive_link='')
+                      .only("id_file", "drive_link"))
+
+        lote, actualizados, sin_id = [], 0, 0
+        for file_instance in pendientes.iterator(chunk_size=batch_size):
+            drive_id = File.drive_id_from_link(file_instance.drive_link)
+            if not drive_id:
+                sin_id += 1
+                self.stderr.write(f"Enlace no reconocido en {file_instance.pk}: {file_instance.drive_link}")
+                continue
+            file_instance.drive_file_id = drive_id
+            lote.append(file_instance)
+            if len(lote) >= batch_size:
+                actualizados += self._guardar(lote, options["dry_run"])
+                lote = []
+        actualizados += self._guardar(lote, options["dry_run"])
+
+        accion = "reconocidos" if options["dry_run"] else "actualizados"
+        self.stdout.write(self.style.SUCCESS(f"{actualizados} adjunto(s) {accion}; {sin_id} sin id reconocible."))
+
+    def _guardar(self, lote, dry_run):
+        if lote and not dry_run:
+            File.objects.bulk_update(lote, ["drive_file_id"])
+        return len(lote)
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 02:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('database', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='drive_file_id',
+            field=models.CharField(blank=True, db_index=True, max_length=128, null=True, verbose_name='ID en Google Drive'),
+        ),
+    ]
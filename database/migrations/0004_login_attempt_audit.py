@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-19 02:57
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('database', '0003_file_drive_file_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loginattempt',
+            name='blocked',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='loginattempt',
+            name='cedula',
+            field=models.CharField(blank=True, db_index=True, max_length=15),
+        ),
+        migrations.AddField(
+            model_name='loginattempt',
+            name='ip_address',
+            field=models.GenericIPAddressField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='loginattempt',
+            name='email',
+            field=models.EmailField(blank=True, max_length=254),
+        ),
+        migrations.AlterField(
+            model_name='loginattempt',
+            name='timestamp',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,7 +1,9 @@
 # database/models.py
 
+import re
 import uuid
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.contrib.auth.models import Group, Permission
 from django.db import models
@@ -63,6 +65,9 @@ except ImportError:
 def generate_id(): # Asegúrate que esta función esté definida si la usas como default
     return uuid.uuid4().hex[:10]
 
+_DRIVE_ID_IN_LINK = re.compile(r'/d/([A-Za-z0-9_-]+)|[?&]id=([A-Za-z0-9_-]+)')
+
+
 class File(models.Model):
     id_file = models.CharField(
         primary_key=True,
@@ -105,11 +110,22 @@ class File(models.Model):
         null=True,
         verbose_name='Enlace Google Drive'
     )
+    drive_file_id = models.CharField(max_length=128, null=True, blank=True, db_index=True,
+                                     verbose_name='ID en Google Drive')
     # --- FIN DE NUEVOS CAMPOS ---
 
     def __str__(self):
         return self.name if self.name else f"Archivo ID: {self.id_file}"
 
+    @staticmethod
+    def drive_id_from_link(link):
+        """
+        Extrae el id de Drive de un webViewLink
+        (.../d/<id>/view, .../open?id=<id>). None si no lo reconoce.
+        """
+        match = _DRIVE_ID_IN_LINK.search(link or '')
+        return match.group(1) or match.group(2) if match else None
+
     class Meta:
         verbose_name = "Archivo Adjunto"
         verbose_name_plural = "Archivos Adjuntos"
@@ -127,11 +143,16 @@ class Version(models.Model):
     id_file = models.ForeignKey('File', on_delete=models.CASCADE, db_column='id_file', null=False, blank=False)
 
 class LoginAttempt(models.Model):
+    """Auditoría de inicios de sesión; la escribe login.throttle por lotes."""
     id = models.AutoField(primary_key=True)
-    email = models.EmailField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    email = models.EmailField(blank=True)
+    cedula = models.CharField(max_length=15, blank=True, db_index=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    # Hora del intento (no la de inserción, que llega después por lotes)
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
     success = models.BooleanField(default=False)
+    blocked = models.BooleanField(default=False)  # rechazado por el límite de intentos
     
     def __str__(self):
-        estado = "Éxito" if self.success else "Fallo"
-        return f"{self.email} - {estado} - {self.timestamp}"
\ No newline at end of file
+        estado = "Éxito" if self.success else ("Bloqueado" if self.blocked else "Fallo")
+        return f"{self.cedula or self.email} - {estado} - {self.timestamp}"
\ No newline at end of file
@@ -1,3 +1,25 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+from database.models import File
+
+
+class DriveFileIdTests(TestCase):
+    def test_drive_id_from_link(self):
+        self.assertEqual(File.drive_id_from_link('https://drive.google.com/file/d/1AbC_-9/view?usp=drivesdk'), '1AbC_-9')
+        self.assertEqual(File.drive_id_from_link('https://drive.google.com/open?id=XyZ'), 'XyZ')
+        self.assertIsNone(File.drive_id_from_link('https://example.com/archivo.pdf'))
+        self.assertIsNone(File.drive_id_from_link(None))
+
+    def test_backfill_command(self):
+        File.objects.create(name='a', type='pdf', drive_link='https://drive.google.com/file/d/ID-A/view')
+        File.objects.create(name='b', type='pdf', drive_link='https://example.com/b.pdf')
+        File.objects.create(name='c', type='pdf', drive_link='https://drive.google.com/file/d/OTRO/view',
+                            drive_file_id='ID-C')
+        salida = StringIO()
+        call_command('completar_drive_ids', batch_size=1, stdout=salida, stderr=StringIO())
+        self.assertIn('1 adjunto(s) actualizados; 1 sin id reconocible', salida.getvalue())
+        self.assertEqual(dict(File.objects.values_list('name', 'drive_file_id')),
+                         {'a': 'ID-A', 'b': None, 'c': 'ID-C'})
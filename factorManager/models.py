@@ -100,6 +100,8 @@ class Factor(models.Model):
         related_name='responsible_factors',
         verbose_name='Responsables'
     )
+    # Sello de versión: se actualiza al guardar y cuando cambian sus características/aspectos
+    updated_at     = models.DateTimeField("Última modificación", auto_now=True)
 
     class Meta:
         ordering = ['project__name', 'start_date', 'name']
@@ -25,7 +25,7 @@ from core.permissions import (
     get_project_permission,
     can_edit as permission_can_edit # Alias para evitar colisión
 )
-from core.mixins import ElevatedAccessRequiredMixin, AdminOrMiniAdminRequiredMixin
+from core.mixins import ElevatedAccessRequiredMixin, AdminOrMiniAdminRequiredMixin, ConditionalDetailMixin
 
 class FactorListView(LoginRequiredMixin, FilteredListPermissionMixin, ListView):
     """
@@ -86,14 +86,17 @@ class FactorListView(LoginRequiredMixin, FilteredListPermissionMixin, ListView):
         return context
 
 
-class FactorDetailView(LoginRequiredMixin, ObjectPermissionRequiredMixin, DetailView):
+class FactorDetailView(LoginRequiredMixin, ObjectPermissionRequiredMixin, ConditionalDetailMixin, DetailView):
     """
     Muestra el detalle de un factor, sus características y aspectos.
     Los permisos se basan en la asignación al factor o al proyecto padre.
+    Responde 304 si ni el factor ni su proyecto cambiaron (ConditionalDetailMixin).
     """
     model = Factor
+    queryset = Factor.objects.select_related('project')
     template_name = 'factorManager/factor_detail.html'
     context_object_name = 'factor'
+    version_ancestors = ('project',)
     # Roles que pueden ver el detalle del factor
     permission_required_roles = [
         AssignmentRole.LECTOR,
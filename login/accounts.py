@@ -0,0 +1,91 @@
+# login/accounts.py
+"""
+Operaciones masivas de la gestión de cuentas.
+
+Cada acción es un solo UPDATE sobre los usuarios que realmente cambian.
+Los correos de aviso se guardan juntos en la bandeja de salida con un
+solo bulk_create (core.outbox), así que aprobar cientos de registros no
+espera a SMTP.
+"""
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import transaction
+
+from core import outbox
+from core.user_search import matching
+from .models import Rol, User, role_flags
+
+PAGE_SIZE = 25
+
+ASSIGNABLE_ROLES = (Rol.SIN_ROL, Rol.SUPERADMIN, Rol.MINIADMIN, Rol.ACADI)
+# "Usuario Normal" en el filtro agrupa los roles sin privilegios
+NORMAL_ROLES = (Rol.SIN_ROL, Rol.LECTOR, Rol.EDITOR, Rol.COMENTARISTA)
+
+
+def filtered_users(estado='todas', rol='todas', query=''):
+    """Usuarios según los filtros de la tabla (estado, rol y búsqueda por prefijo)."""
+    usuarios = User.objects.order_by('first_name', 'last_name', 'cedula')
+    if estado == 'activo':
+        usuarios = usuarios.filter(is_active=True)
+    elif estado == 'inactivo':
+        usuarios = usuarios.filter(is_active=False)
+
+    if rol == 'sin_rol':
+        usuarios = usuarios.filter(rol__in=NORMAL_ROLES)
+    elif rol != 'todas':
+        usuarios = usuarios.filter(rol=rol)
+    return matching(usuarios, query)
+
+
+def _activation_message(user, active):
+    estado_txt = "activada" if active else "desactivada"
+    return EmailMessage(
+        subject=f"Tu cuenta ha sido {estado_txt}",
+        body=(
+            f"Hola {user.first_name},\n\n"
+            f"Tu cuenta ha sido {estado_txt}.\n"
+            "Si tienes problemas, contacta a un administrador.\n\n"
+            "Saludos,\n"
+            "Equipo de Acreditación"
+        ),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+
+
+def set_active(queryset, active, actor=None):
+    """
+    Activa o desactiva los usuarios de *queryset* que aún no estén en ese
+    estado y encola un aviso para cada uno. Un administrador no se
+    desactiva a sí mismo. Retorna cuántos cambiaron.
+    """
+    targets = queryset.exclude(is_active=active)
+    if actor is not None and not active:
+        targets = targets.exclude(pk=actor.pk)
+    with transaction.atomic():
+        changed = list(targets.select_for_update().only('cedula', 'email', 'first_name'))
+        if not changed:
+            return 0
+        User.objects.filter(pk__in=[u.pk for u in changed]).update(is_active=active)
+        outbox.enqueue_messages(
+            [_activation_message(u, active) for u in changed if u.email],
+            group='cuentas:activacion',
+        )
+    return len(changed)
+
+
+def set_rol(queryset, rol, actor=None):
+    """
+    Cambia el rol (y los permisos de staff que le corresponden) de los
+    usuarios de *queryset* que tengan otro. El administrador que actúa
+    queda fuera. Retorna cuántos cambiaron.
+    """
+    if rol not in ASSIGNABLE_ROLES:
+        raise ValueError(f"Rol no asignable: {rol}")
+    targets = queryset.exclude(rol=rol)
+    if actor is not None:
+        targets = targets.exclude(pk=actor.pk)
+    is_staff, is_superuser = role_flags(rol)
+    return User.objects.filter(pk__in=targets.values('pk')).update(
+        rol=rol, is_staff=is_staff, is_superuser=is_superuser,
+    )
@@ -0,0 +1,215 @@
+# login/avatar_cache.py
+"""
+Caché en disco de los avatares guardados en Drive.
+
+Los bytes se guardan en AVATAR_CACHE_DIR con el id de Drive como nombre,
+junto a un archivo .json con el tipo de contenido y el ETag (sha256 del
+contenido). Al ser un directorio local compartido, todos los workers de
+gunicorn reutilizan la misma copia. Un fallo de caché se descarga en
+streaming directo a disco, bajo un candado por avatar (hilos y procesos)
+para que descargas concurrentes del mismo archivo ocurran una sola vez.
+
+Cada descarga se corta en AVATAR_MAX_BYTES y el directorio completo se
+mantiene bajo AVATAR_CACHE_MAX_BYTES: al superarlo se borran las entradas
+usadas hace más tiempo (un acierto actualiza la fecha del archivo).
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import requests
+from django.conf import settings
+
+try:  # candado entre procesos (Linux/macOS)
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: solo candado entre hilos
+    fcntl = None
+
+CACHE_DIR = getattr(
+    settings, 'AVATAR_CACHE_DIR', os.path.join(settings.BASE_DIR, 'run_cache', 'avatars')
+)
+CHUNK_SIZE = 64 * 1024
+MAX_BYTES = getattr(settings, 'AVATAR_MAX_BYTES', 5 * 1024 * 1024)
+CACHE_MAX_BYTES = getattr(settings, 'AVATAR_CACHE_MAX_BYTES', 200 * 1024 * 1024)
+# Al podar se deja el directorio en esta fracción del máximo
+PRUNE_TARGET = 0.8
+DOWNLOAD_TIMEOUT = 15
+_VALID_ID = re.compile(r'^[A-Za-z0-9_-]{1,128}$')
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+class AvatarNotFound(Exception):
+    """Drive no devolvió la imagen solicitada."""
+
+
+class AvatarTooLarge(AvatarNotFound):
+    """La imagen supera AVATAR_MAX_BYTES; no se guarda."""
+
+
+def is_valid_id(file_id):
+    return bool(_VALID_ID.match(file_id or ''))
+
+
+def _paths(key):
+    base = os.path.join(CACHE_DIR, key)
+    return base, base + '.json', base + '.lock'
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def _single_flight(key, lock_path):
+    with _thread_locks_guard:
+        lock = _thread_locks.setdefault(key, threading.Lock())
+    with lock:
+        if fcntl is None:
+            yield
+            return
+        with open(lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _download(url, data_path, meta_path):
+    """Descarga en streaming a un temporal y lo publica con os.replace."""
+    digest = hashlib.sha256()
+    resp = requests.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT)
+    try:
+        if resp.status_code != 200:
+            raise AvatarNotFound(url)
+        content_type = resp.headers.get('Content-Type', 'image/png')
+        if int(resp.headers.get('Content-Length') or 0) > MAX_BYTES:
+            raise AvatarTooLarge(url)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.part')
+        try:
+            size = 0
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in resp.iter_content(CHUNK_SIZE):
+                    if chunk:
+                        size += len(chunk)
+                        if size > MAX_BYTES:  # Content-Length ausente o falso
+                            raise AvatarTooLarge(url)
+                        tmp.write(chunk)
+                        digest.update(chunk)
+            os.replace(tmp_path, data_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    finally:
+        resp.close()
+
+    meta = {'content_type': content_type, 'etag': f'"{digest.hexdigest()[:32]}"'}
+    with open(meta_path, 'w', encoding='utf-8') as fh:
+        json.dump(meta, fh)
+    return meta
+
+
+def fetch(key, url):
+    """
+    Devuelve (ruta, meta) del avatar *key*, descargándolo de *url* si no
+    está en disco. Lanza AvatarNotFound si Drive no lo entrega.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    data_path, meta_path, lock_path = _paths(key)
+    meta = _read_meta(meta_path)
+    if meta and _touch(data_path):
+        return data_path, meta
+
+    with _single_flight(key, lock_path):
+        # Otro hilo/proceso pudo completarlo mientras esperábamos
+        meta = _read_meta(meta_path)
+        if meta and _touch(data_path):
+            return data_path, meta
+        meta = _download(url, data_path, meta_path)
+    prune()
+    return data_path, meta
+
+
+def _touch(path):
+    """Marca la entrada como usada ahora (orden de expulsión). False si no existe."""
+    try:
+        os.utime(path)
+        return True
+    except OSError:
+        return False
+
+
+def prune(max_bytes=None):
+    """
+    Si el directorio supera *max_bytes* (AVATAR_CACHE_MAX_BYTES), borra las
+    entradas menos usadas hasta quedar en PRUNE_TARGET de ese máximo.
+    Retorna cuántas entradas se borraron.
+    """
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries, total = {}, 0
+    try:
+        names = os.listdir(CACHE_DIR)
+    except OSError:
+        return 0
+    for name in names:
+        if name.endswith(('.json', '.lock', '.part')):
+            continue
+        try:
+            stat = os.stat(os.path.join(CACHE_DIR, name))
+        except OSError:
+            continue
+        entries[name] = (stat.st_mtime, stat.st_size)
+        total += stat.st_size
+    if total <= max_bytes:
+        return 0
+
+    removed = 0
+    for name, (_, size) in sorted(entries.items(), key=lambda item: item[1][0]):
+        if total <= max_bytes * PRUNE_TARGET:
+            break
+        for path in _paths(name):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        total -= size
+        removed += 1
+    return removed
+
+
+def evict(prefix):
+    """Elimina del disco el avatar y sus variantes (claves que empiezan por *prefix*)."""
+    if not is_valid_id(prefix) or not os.path.isdir(CACHE_DIR):
+        return
+    for name in os.listdir(CACHE_DIR):
+        if name.startswith(prefix):
+            try:
+                os.remove(os.path.join(CACHE_DIR, name))
+            except OSError:
+                pass
+
+
+def store(key, data, content_type):
+    """Guarda bytes ya conocidos (p. ej. recién generados) sin ir a Drive."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    data_path, meta_path, _ = _paths(key)
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.part')
+    with os.fdopen(fd, 'wb') as tmp:
+        tmp.write(data)
+    os.replace(tmp_path, data_path)
+    meta = {'content_type': content_type,
+            'etag': f'"{hashlib.sha256(data).hexdigest()[:32]}"'}
+    with open(meta_path, 'w', encoding='utf-8') as fh:
+        json.dump(meta, fh)
+    return meta
@@ -0,0 +1,60 @@
+# login/avatar_renditions.py
+"""
+Versiones reducidas del avatar generadas con Pillow al subirlo.
+
+La imagen se decodifica una sola vez, se corrige su orientación EXIF y se
+recorta al cuadrado; de ahí salen las versiones WebP y JPEG de cada
+tamaño en SIZES. Ninguna conserva los metadatos EXIF del original.
+"""
+import io
+
+from PIL import Image, ImageOps
+
+SIZES = (48, 128, 512)
+FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+DEFAULT_SIZE = 128
+
+
+def rendition_key(size, fmt):
+    return f'{size}.{fmt}'
+
+
+def build_renditions(fileobj):
+    """
+    Retorna {'48.webp': (bytes, content_type), '48.jpeg': ..., ...}.
+    Lanza OSError/ValueError si el archivo no es una imagen válida.
+    """
+    with Image.open(fileobj) as original:
+        original.load()
+        image = ImageOps.exif_transpose(original)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    renditions = {}
+    for size in SIZES:
+        square = ImageOps.fit(image, (size, size), method=Image.Resampling.LANCZOS)
+        for fmt, (pil_format, content_type, options) in FORMATS.items():
+            frame = square.convert('RGB') if pil_format == 'JPEG' else square
+            buffer = io.BytesIO()
+            frame.save(buffer, pil_format, **options)
+            renditions[rendition_key(size, fmt)] = (buffer.getvalue(), content_type)
+    return renditions
+
+
+def pick(renditions, size, accept=''):
+    """
+    Id de Drive de la versión más adecuada: el menor tamaño >= *size*
+    (o el mayor disponible), en WebP si el navegador lo acepta.
+    """
+    if not renditions:
+        return None
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        size = DEFAULT_SIZE
+    chosen = next((s for s in SIZES if s >= size), SIZES[-1])
+    fmt = 'webp' if 'image/webp' in (accept or '') else 'jpeg'
+    return renditions.get(rendition_key(chosen, fmt))
@@ -1,19 +1,32 @@
 # login/backends.py
 from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+from . import throttle
 from .models import User
 
 class CedulaBackend(ModelBackend):
     """
     Autenticación por cédula (USERNAME_FIELD='cedula').
+    Aplica el límite de intentos de login.throttle antes de verificar la
+    contraseña: un intento bloqueado no llega a calcular el hash.
     """
     def authenticate(self, request, username=None, password=None, **kwargs):
         # Django envía el valor de <input name="username">
         cedula = username or kwargs.get('cedula')
         if not cedula:
             return None
+        ip = throttle.client_ip(request)
+        if throttle.retry_after(cedula, ip):
+            throttle.register_blocked(cedula, ip)
+            # PermissionDenied detiene también a los backends siguientes (ModelBackend)
+            raise PermissionDenied
         try:
             user = User.objects.get(pk=cedula)
-            if user.check_password(password):
-                return user
         except User.DoesNotExist:
+            throttle.register_failure(cedula, ip)
             return None
+        if user.check_password(password):
+            throttle.register_success(cedula, ip, user.email)
+            return user
+        throttle.register_failure(cedula, ip, user.email)
+        return None
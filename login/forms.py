@@ -1,8 +1,10 @@
 # login/forms.py
 import re, random, string
 from django import forms
-from django.core.mail import send_mail
 from django.contrib.auth import authenticate, password_validation
+from django.contrib.auth.hashers import make_password
+from core import outbox
+from . import throttle
 from .models import User, Rol, CEDULA_REGEX
 
 PWD_REGEX = r'^(?=.*[a-z])(?=.*[A-Z])(?=.*\d)(?=.*[\W_]).{8,}$'
@@ -49,22 +51,21 @@ class RegisterStep1Form(forms.ModelForm):
         email  = self.cleaned_data['email']
         codigo = ''.join(random.choices(string.digits, k=6))
 
-        # guardamos datos en sesión
+        # guardamos datos en sesión; la contraseña ya hasheada, porque la
+        # sesión se persiste en la base de datos hasta verificar el código
         request.session['pending_user'] = {
             'cedula':     self.cleaned_data['cedula'],
             'first_name': self.cleaned_data['first_name'],
             'last_name':  self.cleaned_data['last_name'],
             'email':      email,
-            'password':   self.cleaned_data['password1'],
+            'password':   make_password(self.cleaned_data['password1']),
         }
         request.session['codigo_' + email] = codigo
 
-        send_mail(
+        outbox.enqueue(
             'Código de verificación – Proyecto Acreditación',
             f'Tu código es: {codigo}',
-            None,
             [email],
-            fail_silently=False
         )
 
 # ---------- Paso 2 – verificación ----------
@@ -92,16 +93,27 @@ class VerifyCodeForm(forms.Form):
 
 # ---------- Login ----------
 class LoginForm(forms.Form):
-    cedula   = forms.CharField(label='Cédula')
+    cedula   = forms.CharField(label='Cédula', max_length=15)
     password = forms.CharField(widget=forms.PasswordInput,
                                 label='Contraseña')
 
+    def __init__(self, *args, request=None, **kwargs):
+        self.request = request
+        super().__init__(*args, **kwargs)
+
     def clean(self):
         cleaned = super().clean()
         cedula  = cleaned.get('cedula')
         pwd     = cleaned.get('password')
         if cedula and pwd:
-            user = authenticate(username=cedula, password=pwd)
+            ip = throttle.client_ip(self.request)
+            espera = throttle.retry_after(cedula, ip)
+            if espera:
+                throttle.register_blocked(cedula, ip)
+                minutos = max(1, round(espera / 60))
+                raise forms.ValidationError(
+                    f'Demasiados intentos fallidos. Intenta de nuevo en {minutos} minuto(s).')
+            user = authenticate(self.request, username=cedula, password=pwd)
             if not user:
                 raise forms.ValidationError('Credenciales incorrectas')
             if not user.is_active:
@@ -0,0 +1,78 @@
+# login/management/commands/crear_usuarios.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assignments import bulk
+from login import provisioning
+
+
+def _formato(path, formato):
+    return formato or ("json" if path.lower().endswith(".json") else "csv")
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea usuarios en bloque desde un CSV o JSON con columnas cedula, email, first_name, "
+        "last_name, password, rol y activo (solo cedula y email son obligatorias)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo", help="Ruta del listado de usuarios.")
+        parser.add_argument(
+            "--formato",
+            choices=["csv", "json"],
+            help="Formato del listado (por defecto se deduce de la extensión).",
+        )
+        parser.add_argument(
+            "--asignaciones",
+            help="CSV/JSON de asignaciones (cedula, tipo, id, rol) a aplicar en la misma transacción.",
+        )
+        parser.add_argument(
+            "--procesos",
+            type=int,
+            default=None,
+            help="Procesos para calcular los hashes de contraseña (por defecto, uno por CPU).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Solo valida, sin guardar.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["archivo"]
+        try:
+            with open(path, encoding="utf-8-sig", newline="") as fh:
+                entries = provisioning.parse(fh, _formato(path, options["formato"]))
+            assignments = None
+            if options["asignaciones"]:
+                apath = options["asignaciones"]
+                with open(apath, encoding="utf-8-sig", newline="") as fh:
+                    assignments = bulk.parse(fh, _formato(apath, None))
+        except (OSError, provisioning.RosterFormatError, bulk.ImportFormatError) as exc:
+            raise CommandError(str(exc))
+
+        inicio = time.monotonic()
+        summary = provisioning.provision(
+            entries, dry_run=options["dry_run"], workers=options["procesos"], assignments=assignments,
+        )
+        if summary["errores"]:
+            for line, message in summary["errores"]:
+                self.stderr.write(f"Línea {line}: {message}")
+            raise CommandError(f"{len(summary['errores'])} error(es); no se creó ningún usuario.")
+
+        prefix = "[dry-run] " if options["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{summary['creados']} usuario(s) creados en {time.monotonic() - inicio:.1f} s."
+        ))
+        if summary["invitaciones"]:
+            self.stdout.write(
+                f"{summary['invitaciones']} correo(s) para elegir contraseña en la bandeja de salida."
+            )
+        asignaciones = summary["asignaciones"]
+        if asignaciones:
+            self.stdout.write(
+                f"{prefix}Asignaciones: {asignaciones['creadas']} creadas, {asignaciones['actualizadas']} "
+                f"actualizadas, {asignaciones['eliminadas']} eliminadas, {asignaciones['sin_cambios']} sin cambios."
+            )
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# Índices de patrón para las búsquedas por prefijo de core.user_search.
+# Django traduce `campo__istartswith` a UPPER("campo"::text) LIKE UPPER(...)
+# y `cedula__startswith` a "cedula"::text LIKE ...; solo PostgreSQL los usa.
+INDEXES = {
+    'login_user_first_name_upper_like': 'UPPER(first_name::text) text_pattern_ops',
+    'login_user_last_name_upper_like': 'UPPER(last_name::text) text_pattern_ops',
+    'login_user_email_upper_like': 'UPPER(email::text) text_pattern_ops',
+    'login_user_cedula_like': 'cedula varchar_pattern_ops',
+}
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, expression in INDEXES.items():
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON login_user ({expression})')
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('login', '0002_user_avatar_renditions'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
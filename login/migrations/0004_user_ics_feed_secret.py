@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 03:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('login', '0003_user_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='ics_feed_secret',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
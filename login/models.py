@@ -16,6 +16,18 @@ class Rol(models.TextChoices):
     LECTOR          = 'lector',          'Lector' # Rol genérico
     SIN_ROL         = 'sin_rol',         'Sin Rol'
 
+def role_flags(rol):
+    """
+    (is_staff, is_superuser) que corresponden a *rol*. User.save() los aplica;
+    las actualizaciones masivas (queryset.update) deben pasarlos explícitamente.
+    """
+    if rol == Rol.SUPERADMIN:
+        return True, True # [cite: 44]
+    if rol in (Rol.MINIADMIN, Rol.ACADI):
+        return True, False # [cite: 45]
+    return False, False # SIN_ROL, EDITOR, COMENTARISTA, LECTOR [cite: 46]
+
+
 class UserManager(BaseUserManager):
     use_in_migrations = True
 
@@ -70,6 +82,10 @@ class User(AbstractBaseUser, PermissionsMixin):
     avatar      = models.ImageField(upload_to='avatars/', blank=True, null=True, verbose_name='Foto de perfil')
     avatar_drive_id   = models.CharField(max_length=100, blank=True, null=True)
     avatar_drive_link = models.URLField(blank=True, null=True)
+    # Versiones reducidas en Drive: {'48.webp': <drive_id>, '128.jpeg': ...}
+    avatar_renditions = models.JSONField(default=dict, blank=True)
+    # Secreto del feed .ics de reuniones (meeting_List.ics); se cambia para revocar el enlace
+    ics_feed_secret   = models.CharField(max_length=64, unique=True, null=True, blank=True)
     
     objects = UserManager()
 
@@ -105,15 +121,7 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     def save(self, *args, **kwargs):
         # Ensure is_staff and is_superuser are handled correctly based on role
-        if self.rol == Rol.SUPERADMIN:
-            self.is_staff = True
-            self.is_superuser = True # [cite: 44]
-        elif self.rol in (Rol.MINIADMIN, Rol.ACADI):
-            self.is_staff = True # [cite: 45]
-            self.is_superuser = False # [cite: 45]
-        else: # SIN_ROL, EDITOR, COMENTARISTA, LECTOR
-            self.is_staff = False
-            self.is_superuser = False # [cite: 46]
+        self.is_staff, self.is_superuser = role_flags(self.rol)
         super().save(*args, **kwargs)
 
     class Meta:
@@ -0,0 +1,233 @@
+# login/provisioning.py
+"""
+Alta masiva de usuarios a partir de un listado (CSV o JSON).
+
+Columnas: cedula, email, first_name, last_name, password, rol y activo.
+Solo cedula y email son obligatorias. Sin password la cuenta recibe una
+contraseña aleatoria (utilizable, para que el flujo de "olvidé mi
+contraseña" la reconozca) y, si está activa, se le encola por
+core.outbox un correo con el enlace para elegir la suya. El rol vacío es
+sin_rol y activo vacío es sí.
+
+Todo el listado se valida antes de escribir: formatos, duplicados dentro
+del archivo y cédulas o correos ya registrados (dos consultas). Si alguna
+fila tiene errores no se crea nada. Los hashes de contraseña, que son la
+parte costosa, se calculan en un pool de procesos. Los usuarios se
+insertan con bulk_create.
+"""
+import csv
+import json
+import os
+import re
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.exceptions import ValidationError
+from django.core.mail import EmailMessage
+from django.core.validators import validate_email
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from assignments import bulk
+from core import outbox
+from .forms import PWD_REGEX
+from .models import CEDULA_REGEX, Rol, User, role_flags
+
+FIELDS = ('cedula', 'email', 'first_name', 'last_name', 'password', 'rol', 'activo')
+REQUIRED = ('cedula', 'email')
+BATCH_SIZE = 500
+# Por debajo de este número de contraseñas no compensa arrancar procesos
+POOL_THRESHOLD = 16
+TRUE_VALUES = ('', '1', 'si', 'sí', 'true', 'yes', 'x')
+FALSE_VALUES = ('0', 'no', 'false')
+SUBJECT_TEMPLATE = 'login/provisioned_subject.txt'
+EMAIL_TEMPLATE = 'login/provisioned_email.html'
+
+
+class RosterFormatError(ValueError):
+    """El archivo no se pudo leer como CSV/JSON de usuarios."""
+
+
+@dataclass
+class Entry:
+    line: int
+    cedula: str
+    email: str
+    first_name: str
+    last_name: str
+    password: str
+    rol: str
+    activo: str
+
+
+def parse(fh, fmt='csv'):
+    """Filas del listado *fh* (texto). *fmt* es 'csv' o 'json'."""
+    if fmt == 'json':
+        try:
+            items = json.load(fh)
+        except ValueError as exc:
+            raise RosterFormatError(f"JSON inválido: {exc}") from exc
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise RosterFormatError("El JSON debe ser una lista de objetos.")
+        numbered = enumerate(items, start=1)
+    elif fmt == 'csv':
+        reader = csv.DictReader(fh)
+        missing = set(REQUIRED) - set(reader.fieldnames or ())
+        if missing:
+            raise RosterFormatError(f"Faltan columnas en el CSV: {', '.join(sorted(missing))}")
+        numbered = enumerate(reader, start=2)  # la línea 1 es el encabezado
+    else:
+        raise RosterFormatError(f"Formato no soportado: {fmt}")
+    entries = []
+    for line, item in numbered:
+        values = {field: str(item.get(field) or '').strip() for field in FIELDS}
+        values['email'] = values['email'].lower()
+        values['rol'] = values['rol'].lower() or Rol.SIN_ROL
+        values['activo'] = values['activo'].lower()
+        # La contraseña se toma tal cual: los espacios pueden ser parte de ella
+        values['password'] = str(item.get('password') or '')
+        entries.append(Entry(line, **values))
+    return entries
+
+
+def validate(entries):
+    """Valida todo el listado a la vez. Retorna una lista de (línea, mensaje)."""
+    errors = []
+    taken_cedulas = set(User.objects.filter(cedula__in={e.cedula for e in entries})
+                        .values_list('cedula', flat=True))
+    taken_emails = set(User.objects.filter(email__in={e.email for e in entries})
+                       .values_list('email', flat=True))
+    seen_cedulas, seen_emails = {}, {}
+    for entry in entries:
+        if not re.match(CEDULA_REGEX, entry.cedula):
+            errors.append((entry.line, f"Cédula '{entry.cedula}' inválida (5-15 dígitos)."))
+        elif entry.cedula in taken_cedulas:
+            errors.append((entry.line, f"Ya existe un usuario con cédula {entry.cedula}."))
+        elif entry.cedula in seen_cedulas:
+            errors.append((entry.line, f"Cédula repetida (línea {seen_cedulas[entry.cedula]})."))
+        seen_cedulas.setdefault(entry.cedula, entry.line)
+
+        try:
+            validate_email(entry.email)
+            if not entry.email.endswith('@gmail.com'):
+                raise ValidationError('')
+        except ValidationError:
+            errors.append((entry.line, f"Correo '{entry.email}' inválido (debe ser @gmail.com)."))
+        else:
+            if entry.email in taken_emails:
+                errors.append((entry.line, f"Ya existe un usuario con correo {entry.email}."))
+            elif entry.email in seen_emails:
+                errors.append((entry.line, f"Correo repetido (línea {seen_emails[entry.email]})."))
+            seen_emails.setdefault(entry.email, entry.line)
+
+        if entry.password and not re.match(PWD_REGEX, entry.password):
+            errors.append((entry.line, "Contraseña débil: mín. 8 caracteres con mayúscula, "
+                                       "minúscula, número y símbolo."))
+        if entry.rol not in Rol.values:
+            errors.append((entry.line, f"Rol '{entry.rol}' inválido."))
+        if entry.activo not in TRUE_VALUES + FALSE_VALUES:
+            errors.append((entry.line, f"Valor de activo '{entry.activo}' inválido (use sí/no)."))
+        if len(entry.first_name) > 30 or len(entry.last_name) > 60:
+            errors.append((entry.line, "Nombre (máx. 30) o apellido (máx. 60) demasiado largo."))
+    return errors
+
+
+# --- Hash de contraseñas ---
+
+def _init_worker(settings_module):
+    # Con el método 'spawn' (macOS, Windows) el proceso hijo arranca sin Django
+    import django
+    if not settings.configured:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+        django.setup()
+
+
+def _hash(password):
+    return make_password(password)
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    Hashes de *passwords* en el mismo orden. Usa un pool de *workers*
+    procesos (por defecto PROVISIONING_HASH_WORKERS o el número de CPUs);
+    con un solo proceso o pocas contraseñas se calculan aquí mismo.
+    """
+    workers = workers or getattr(settings, 'PROVISIONING_HASH_WORKERS', None) or os.cpu_count() or 1
+    if workers <= 1 or len(passwords) < POOL_THRESHOLD:
+        return [_hash(p) for p in passwords]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', ''),)) as pool:
+        return list(pool.map(_hash, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+# --- Correo para elegir contraseña ---
+
+def _password_message(user, base_url):
+    """Correo con el enlace de password_reset_confirm para *user* (ya guardado)."""
+    parts = urlsplit(base_url)
+    context = {
+        'email': user.email, 'user': user, 'domain': parts.netloc, 'site_name': parts.netloc,
+        'protocol': parts.scheme or 'https',
+        'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': default_token_generator.make_token(user),
+    }
+    subject = ''.join(render_to_string(SUBJECT_TEMPLATE, context).splitlines())
+    return EmailMessage(subject=subject, body=render_to_string(EMAIL_TEMPLATE, context),
+                        from_email=settings.DEFAULT_FROM_EMAIL, to=[user.email])
+
+
+def provision(entries, dry_run=False, workers=None, assignments=None):
+    """
+    Valida y crea los usuarios de *entries*. *assignments* son filas de
+    assignments.bulk (cedula, tipo, id, rol) que se aplican en la misma
+    transacción, de modo que pueden referirse a los usuarios recién
+    creados. Retorna {'errores': [(línea, mensaje)], 'creados',
+    'invitaciones', 'asignaciones'}. Con errores o *dry_run* no se guarda
+    nada ni se encolan correos.
+    """
+    summary = {'errores': validate(entries), 'creados': 0, 'invitaciones': 0, 'asignaciones': None}
+    if summary['errores']:
+        return summary
+
+    # En dry-run no vale la pena calcular hashes que se van a descartar
+    passwords = {} if dry_run else {e.line: e.password or secrets.token_urlsafe(24) for e in entries}
+    hashes = dict(zip(passwords, hash_passwords(list(passwords.values()), workers)))
+    users = []
+    for entry in entries:
+        is_staff, is_superuser = role_flags(entry.rol)
+        users.append(User(
+            cedula=entry.cedula, email=entry.email,
+            first_name=entry.first_name, last_name=entry.last_name,
+            rol=entry.rol, is_staff=is_staff, is_superuser=is_superuser,
+            is_active=entry.activo in TRUE_VALUES,
+            password=hashes.get(entry.line) or make_password(None),
+        ))
+
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        summary['creados'] = len(users)
+        if assignments:
+            result = bulk.import_rows(assignments, dry_run=dry_run)
+            summary['asignaciones'] = result
+            if result['errores']:
+                summary['errores'] = [(line, f"Asignaciones: {message}") for line, message in result['errores']]
+                summary['creados'] = 0
+                transaction.set_rollback(True)
+                return summary
+        if dry_run:
+            transaction.set_rollback(True)
+            return summary
+        # Quien no trae contraseña la elige desde el enlace (mismo token que "olvidé mi contraseña")
+        invited = [user for user, entry in zip(users, entries) if user.is_active and not entry.password]
+        base_url = getattr(settings, 'SITE_URL', '') or 'http://localhost:8000'
+        outbox.enqueue_messages([_password_message(user, base_url) for user in invited],
+                                group='cuentas:alta')
+        summary['invitaciones'] = len(invited)
+    return summary
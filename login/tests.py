@@ -1,4 +1,5 @@
 # test.py
+import json
 import os
 import tempfile
 import mimetypes
@@ -8,9 +9,11 @@ from django.http import HttpResponse, Http404
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core import mail
+from django.contrib.auth.hashers import check_password, make_password
 from django.contrib.messages.storage.fallback import FallbackStorage
 from unittest.mock import patch, MagicMock
 
+import login.accounts as accounts_module
 import login.admin as admin_module
 import login.apps as apps_module
 import login.backends as backends_module
@@ -19,6 +22,7 @@ import login.google_service as google_service
 import login.models as models_module
 import login.urls as urls_module
 import login.views as views_module
+from core import outbox
 
 User = models_module.User
 Rol = models_module.Rol
@@ -71,6 +75,92 @@ class CedulaBackendTests(TestCase):
         self.assertEqual(user, self.user)
 
 
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from login import throttle
+        cache.clear()
+        self.throttle = throttle
+        self.user = User.objects.create_user(
+            cedula='44444444', email='t@gmail.com', password='Pwd123!A',
+            first_name='Throttle', last_name='User'
+        )
+        self.backend = backends_module.CedulaBackend()
+        self.request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.1')
+        # Reloj fijo a mitad de una ventana: los fallos no quedan repartidos entre dos
+        clock = patch.object(throttle, 'time')
+        clock.start().time.return_value = 1000.5 * throttle.WINDOW
+        self.addCleanup(clock.stop)
+
+    def _fail(self, times, cedula='44444444'):
+        for _ in range(times):
+            self.backend.authenticate(self.request, username=cedula, password='wrong')
+
+    def test_blocks_cedula_before_hashing(self):
+        from django.core.exceptions import PermissionDenied
+        self._fail(self.throttle.CEDULA_LIMIT)
+        with patch.object(User, 'check_password') as check:
+            with self.assertRaises(PermissionDenied):
+                self.backend.authenticate(self.request, username='44444444', password='Pwd123!A')
+            check.assert_not_called()
+        self.assertGreater(self.throttle.retry_after('44444444'), 0)
+
+    def test_success_clears_cedula_counter(self):
+        self._fail(self.throttle.CEDULA_LIMIT - 1)
+        self.assertEqual(self.backend.authenticate(self.request, username='44444444', password='Pwd123!A'), self.user)
+        self.assertEqual(self.throttle.retry_after('44444444'), 0)
+
+    def test_ip_limit_spans_cedulas(self):
+        with patch.object(self.throttle, 'IP_LIMIT', 3):
+            self._fail(1, '50000001')
+            self._fail(1, '50000002')
+            self._fail(1, '50000003')
+            self.assertGreater(self.throttle.retry_after('50000004', '10.0.0.1'), 0)
+            self.assertEqual(self.throttle.retry_after('50000004', '10.0.0.2'), 0)
+
+    def test_previous_window_decays(self):
+        now = 1000 * self.throttle.WINDOW
+        previous = self.throttle._key('cedula', '44444444', 999)
+        from django.core.cache import cache
+        cache.set(previous, self.throttle.CEDULA_LIMIT * 2)
+        # Al inicio de la ventana la anterior pesa casi completa; al final casi nada
+        self.assertGreater(self.throttle._retry_after('cedula', '44444444', self.throttle.CEDULA_LIMIT, now + 1), 0)
+        self.assertEqual(self.throttle._retry_after('cedula', '44444444', self.throttle.CEDULA_LIMIT,
+                                                    now + self.throttle.WINDOW - 1), 0)
+
+    def test_form_reports_wait_and_attempts_are_audited(self):
+        from database.models import LoginAttempt
+        with self.settings(LOGIN_ATTEMPTS_ASYNC=False), self.captureOnCommitCallbacks(execute=True):
+            self._fail(self.throttle.CEDULA_LIMIT)
+            form = forms_module.LoginForm({'cedula': '44444444', 'password': 'Pwd123!A'}, request=self.request)
+            self.assertFalse(form.is_valid())
+        self.assertIn('Demasiados intentos', str(form.errors))
+        attempts = LoginAttempt.objects.filter(cedula='44444444')
+        # Los fallos más el intento rechazado por el formulario
+        self.assertEqual(attempts.count(), self.throttle.CEDULA_LIMIT + 1)
+        self.assertEqual(attempts.filter(blocked=True).count(), 1)
+        self.assertEqual(attempts.first().ip_address, '10.0.0.1')
+        self.assertFalse(attempts.filter(success=True).exists())
+
+    def test_oversized_cedula_is_rejected_and_not_used_as_key(self):
+        from database.models import LoginAttempt
+        form = forms_module.LoginForm({'cedula': '4' * 200, 'password': 'x'}, request=self.request)
+        self.assertFalse(form.is_valid())
+        self.assertIn('cedula', form.errors)
+        with self.settings(LOGIN_ATTEMPTS_ASYNC=False), self.captureOnCommitCallbacks(execute=True):
+            self._fail(1, cedula='x' * 200)
+        self.assertEqual(list(LoginAttempt.objects.values_list('cedula', flat=True)), ['x' * 15])
+        self.assertEqual([kind for kind, _, _ in self.throttle._limits('x' * 200, '10.0.0.1')], ['ip'])
+
+    def test_queued_attempts_are_written_in_one_batch(self):
+        from database.models import LoginAttempt
+        with patch.object(self.throttle, '_ensure_worker'), self.captureOnCommitCallbacks(execute=True):
+            self._fail(3)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.throttle.flush(), 3)
+        self.assertEqual(LoginAttempt.objects.filter(cedula='44444444', success=False).count(), 3)
+
+
 class FormTests(TestCase):
     def setUp(self):
         self.factory = RequestFactory()
@@ -88,7 +178,11 @@ class FormTests(TestCase):
         req.session = {}
         form.enviar_codigo(req)
         self.assertIn('pending_user', req.session)
+        self.assertNotIn(data['password1'], json.dumps(req.session))
+        self.assertTrue(check_password(data['password1'], req.session['pending_user']['password']))
         self.assertTrue(req.session.get('codigo_' + data['email']).isdigit())
+        self.assertEqual(len(mail.outbox), 0)  # queda en la bandeja de salida
+        outbox.send_pending()
         self.assertEqual(len(mail.outbox), 1)
 
     def test_register_step1_invalid(self):
@@ -217,17 +311,25 @@ class ViewsUtilityTests(TestCase):
         self.assertIn('ID', url)
 
     def test_avatar_proxy(self):
-        # Covers avatar_proxy success and 404
-        rf = RequestFactory()
-        req = rf.get('/avatar/ID/')
-        ok = MagicMock(status_code=200, headers={'Content-Type': 'image/png'}, content=b'data')
-        with patch('login.views.requests.get', return_value=ok):
-            resp = views_module.avatar_proxy(req, 'ID')
-            self.assertEqual(resp.status_code, 200)
-        nok = MagicMock(status_code=404)
-        with patch('login.views.requests.get', return_value=nok):
-            with self.assertRaises(Http404):
-                views_module.avatar_proxy(req, 'ID')
+        # Covers avatar_proxy success and 404 (descarga vía avatar_cache)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        with patch('login.avatar_cache.CACHE_DIR', tmp.name):
+            User.objects.create_user(cedula='63000009', email='proxy@gmail.com', password='x')
+            User.objects.filter(cedula='63000009').update(avatar_drive_id='ID')
+            rf = RequestFactory()
+            req = rf.get('/avatar/ID/')
+            ok = MagicMock(status_code=200, headers={'Content-Type': 'image/png'})
+            ok.iter_content.return_value = [b'data']
+            with patch('login.avatar_cache.requests.get', return_value=ok):
+                resp = views_module.avatar_proxy(req, 'ID')
+                self.assertEqual(resp.status_code, 200)
+            User.objects.create_user(cedula='63000010', email='proxy2@gmail.com', password='x')
+            User.objects.filter(cedula='63000010').update(avatar_drive_id='NUEVO')
+            nok = MagicMock(status_code=404)
+            with patch('login.avatar_cache.requests.get', return_value=nok):
+                with self.assertRaises(Http404):
+                    views_module.avatar_proxy(rf.get('/avatar/NUEVO/'), 'NUEVO')
 
 
 class RegisterStartViewTests(TestCase):
@@ -257,6 +359,7 @@ class RegisterStartViewTests(TestCase):
             resp = views_module.register_start(req)
             self.assertEqual(resp.content, b'R')
             self.assertIn('pending_user', req.session)
+            outbox.send_pending()
             self.assertEqual(len(mail.outbox), 1)
 
 
@@ -284,7 +387,7 @@ class RegisterVerifyViewTests(TestCase):
 
     def test_post_valid_verify(self):
         # POST valid code should create user and redirect
-        pending = {'cedula':'1','email':'e@gmail.com','password':'Aa1!aaaa','first_name':'F','last_name':'L'}
+        pending = {'cedula':'12345','email':'e@gmail.com','password':make_password('Aa1!aaaa'),'first_name':'F','last_name':'L'}
         req = self.factory.post('/verify/', {'codigo':'654321'})
         req.session = {'pending_user': pending, 'codigo_e@gmail.com':'654321'}
         req._messages = FallbackStorage(req)
@@ -292,6 +395,7 @@ class RegisterVerifyViewTests(TestCase):
             resp = views_module.register_verify(req)
             self.assertEqual(resp.content, b'L')
             self.assertFalse('pending_user' in req.session)
+        self.assertTrue(User.objects.get(cedula='12345').check_password('Aa1!aaaa'))
 
 
 class AuthViewsTests(TestCase):
@@ -471,21 +575,74 @@ class AdminViewsTests(TestCase):
         u.is_active = False; u.save()
         req = self.factory.post('/toggle/88888888/', {'action':'activate'})
         req.user = self.user; req.session = {}; req.META = {'HTTP_REFERER':'/prev'}
-        with patch('login.views.send_mail') as mock_mail, \
+        with patch('login.accounts.outbox.enqueue_messages') as mock_mail, \
              patch('login.views.redirect', return_value=HttpResponse('T1')):
             resp = views_module.toggle_active.__wrapped__(req, '88888888')
             self.assertEqual(resp.content, b'T1')
             mock_mail.assert_called_once()
+            self.assertEqual(len(mock_mail.call_args.args[0]), 1)
             self.assertTrue(User.objects.get(cedula='88888888').is_active)
         # deactivate
         req2 = self.factory.post('/toggle/88888888/', {'action':'deactivate'})
         req2.user = self.user; req2.session = {}; req2.META = {'HTTP_REFERER':'/prev'}
-        with patch('login.views.send_mail') as mock_mail2, \
+        with patch('login.accounts.outbox.enqueue_messages') as mock_mail2, \
              patch('login.views.redirect', return_value=HttpResponse('T2')):
             resp2 = views_module.toggle_active.__wrapped__(req2, '88888888')
             self.assertEqual(resp2.content, b'T2')
             self.assertFalse(User.objects.get(cedula='88888888').is_active)
 
+    def test_gestion_cuentas_paginates_and_searches(self):
+        for i in range(30):
+            User.objects.create_user(cedula=f'700000{i:02d}', email=f'pag{i}@gmail.com', password='x',
+                                     first_name='Paginado', last_name=f'N{i:02d}')
+        req = self.factory.get('/accounts/gestion/?q=pagin&page=2')
+        req.user = self.user
+        with patch('login.views.render', return_value=HttpResponse('G')) as mock_r:
+            views_module.gestion_cuentas.__wrapped__(req)
+        ctx = mock_r.call_args.args[2]
+        self.assertEqual(ctx['page_obj'].paginator.count, 30)
+        self.assertEqual(len(ctx['usuarios']), 30 - accounts_module.PAGE_SIZE)
+        self.assertEqual(ctx['filtros_query'], 'q=pagin')
+
+    def _bulk(self, data):
+        req = self.factory.post('/accounts/gestion/masivo/', data)
+        req.user = self.user; self._add_messages(req)
+        with patch('login.views.redirect', return_value=HttpResponse('B')):
+            return views_module.bulk_accounts.__wrapped__(req)
+
+    def test_bulk_activate_filtered_in_one_update(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from core.models import OutboxEmail
+
+        for i in range(20):
+            User.objects.create_user(cedula=f'710000{i:02d}', email=f'nuevo{i}@gmail.com', password='x',
+                                     first_name='Nuevo', last_name=f'N{i}')
+        User.objects.filter(cedula='71000000').update(is_active=True)
+        with CaptureQueriesContext(connection) as queries:
+            self._bulk({'accion': 'activate', 'alcance': 'filtro', 'estado': 'inactivo', 'q': 'nuevo'})
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertFalse(User.objects.filter(first_name='Nuevo', is_active=False).exists())
+        self.assertEqual(OutboxEmail.objects.filter(group='cuentas:activacion').count(), 19)
+
+    def test_bulk_change_rol_selection_skips_actor(self):
+        a = User.objects.create_user(cedula='72000001', email='r1@gmail.com', password='x', first_name='R', last_name='Uno')
+        b = User.objects.create_user(cedula='72000002', email='r2@gmail.com', password='x', first_name='R', last_name='Dos')
+        self._bulk({'accion': 'change_rol', 'new_rol': Rol.ACADI,
+                    'seleccion': [a.cedula, b.cedula, self.user.cedula]})
+        a.refresh_from_db(); self.user.refresh_from_db()
+        self.assertEqual((a.rol, a.is_staff, a.is_superuser), (Rol.ACADI, True, False))
+        self.assertEqual(self.user.rol, Rol.MINIADMIN)
+        # Un rol no asignable no cambia nada
+        self._bulk({'accion': 'change_rol', 'new_rol': Rol.EDITOR, 'seleccion': [a.cedula]})
+        self.assertEqual(User.objects.get(pk=a.pk).rol, Rol.ACADI)
+
+    def test_bulk_deactivate_never_includes_actor(self):
+        self._bulk({'accion': 'deactivate', 'alcance': 'filtro', 'estado': 'activo'})
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+
     def test_change_user_rol(self):
         # Covers change_user_rol invalid, same, different
         rf = self.factory.post('/change/88888888/', {'new_rol':'invalid'})
@@ -499,3 +656,284 @@ class AdminViewsTests(TestCase):
         req3 = rf3; req3.user = self.user; self._add_messages(req3)
         _ = views_module.change_user_rol.__wrapped__(req3, '66666666')
         self.assertEqual(User.objects.get(cedula='66666666').rol, Rol.SUPERADMIN)
+
+
+class AvatarCacheTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = patch('login.avatar_cache.CACHE_DIR', self.tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+        self.rf = RequestFactory()
+        User.objects.create_user(cedula='63000001', email='avatar@gmail.com', password='x')
+        User.objects.filter(cedula='63000001').update(avatar_drive_id='ABC')
+
+    def _drive_response(self, body=b'imagen', headers=None):
+        resp = MagicMock(status_code=200, headers={'Content-Type': 'image/png', **(headers or {})})
+        resp.iter_content.return_value = [body[:3], body[3:]]
+        return resp
+
+    def test_disk_hit_and_not_modified(self):
+        with patch('login.avatar_cache.requests.get', return_value=self._drive_response()) as get:
+            first = views_module.avatar_proxy(self.rf.get('/avatar/ABC/'), 'ABC')
+            second = views_module.avatar_proxy(self.rf.get('/avatar/ABC/'), 'ABC')
+        self.assertEqual(get.call_count, 1)  # el segundo acceso sale de disco
+        self.assertEqual(b''.join(first.streaming_content), b'imagen')
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertIn('immutable', first['Cache-Control'])
+
+        req = self.rf.get('/avatar/ABC/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(views_module.avatar_proxy(req, 'ABC').status_code, 304)
+        req = self.rf.get('/avatar/ABC/', HTTP_IF_NONE_MATCH=f'"otro", W/{first["ETag"]}')
+        self.assertEqual(views_module.avatar_proxy(req, 'ABC').status_code, 304)
+        # Un ETag que solo contiene al nuestro como subcadena no coincide
+        req = self.rf.get('/avatar/ABC/', HTTP_IF_NONE_MATCH=f'"x{first["ETag"][1:-1]}x"')
+        self.assertEqual(views_module.avatar_proxy(req, 'ABC').status_code, 200)
+
+    def test_unknown_ids_are_not_proxied(self):
+        with patch('login.avatar_cache.requests.get') as get:
+            with self.assertRaises(Http404):
+                views_module.avatar_proxy(self.rf.get('/avatar/OTRO/'), 'OTRO')
+        get.assert_not_called()
+
+    def test_download_size_is_capped(self):
+        import login.avatar_cache as avatar_cache
+        with patch.object(avatar_cache, 'MAX_BYTES', 4):
+            with patch('login.avatar_cache.requests.get', return_value=self._drive_response()):
+                with self.assertRaises(avatar_cache.AvatarTooLarge):
+                    avatar_cache.fetch('BIG', 'url')
+            big = self._drive_response(headers={'Content-Length': '999'})
+            with patch('login.avatar_cache.requests.get', return_value=big):
+                with self.assertRaises(avatar_cache.AvatarTooLarge):
+                    avatar_cache.fetch('BIG', 'url')
+            big.iter_content.assert_not_called()
+        self.assertEqual([n for n in os.listdir(self.tmp.name) if not n.endswith('.lock')], [])
+
+    def test_prune_evicts_least_recently_used(self):
+        import time
+        import login.avatar_cache as avatar_cache
+        for key, age in (('VIEJO', 300), ('MEDIO', 200), ('NUEVO', 100)):
+            avatar_cache.store(key, b'x' * 100, 'image/png')
+            stamp = time.time() - age
+            os.utime(os.path.join(self.tmp.name, key), (stamp, stamp))
+        with patch('login.avatar_cache.requests.get') as get:
+            avatar_cache.fetch('VIEJO', 'url')  # acierto: pasa a ser el más reciente
+        get.assert_not_called()
+        self.assertEqual(avatar_cache.prune(max_bytes=150), 2)
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['VIEJO', 'VIEJO.json'])
+        self.assertEqual(avatar_cache.prune(max_bytes=150), 0)
+
+    def test_concurrent_misses_download_once(self):
+        import threading
+        import time
+        import login.avatar_cache as avatar_cache
+
+        def slow_get(*args, **kwargs):
+            time.sleep(0.05)
+            return self._drive_response()
+
+        with patch('login.avatar_cache.requests.get', side_effect=slow_get) as get:
+            threads = [threading.Thread(target=avatar_cache.fetch, args=('XYZ', 'url'))
+                       for _ in range(5)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(get.call_count, 1)
+
+    def test_invalid_id_and_evict(self):
+        import login.avatar_cache as avatar_cache
+        with self.assertRaises(Http404):
+            views_module.avatar_proxy(self.rf.get('/avatar/x/'), '../etc')
+        with patch('login.avatar_cache.requests.get', return_value=self._drive_response()):
+            avatar_cache.fetch('DEF', 'url')
+        avatar_cache.evict('DEF')
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+
+class AvatarRenditionTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = patch('login.avatar_cache.CACHE_DIR', self.tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(
+            cedula='66666666', email='r@gmail.com', password='Aa1!aaaa', first_name='F', last_name='L'
+        )
+
+    def _jpeg_with_exif(self):
+        import io
+        from PIL import Image
+        img = Image.new('RGB', (900, 600), 'red')
+        exif = Image.Exif()
+        exif[0x010F] = 'Camara'  # Make
+        buffer = io.BytesIO()
+        img.save(buffer, 'JPEG', exif=exif)
+        return buffer.getvalue()
+
+    def test_build_renditions_strips_exif(self):
+        import io
+        from PIL import Image
+        import login.avatar_renditions as avatar_renditions
+        renditions = avatar_renditions.build_renditions(io.BytesIO(self._jpeg_with_exif()))
+        self.assertEqual(len(renditions), 6)
+        data, content_type = renditions['48.webp']
+        self.assertEqual(content_type, 'image/webp')
+        for data, _ in renditions.values():
+            with Image.open(io.BytesIO(data)) as out:
+                self.assertEqual(out.width, out.height)
+                self.assertFalse(out.getexif())
+        self.assertLess(len(renditions['48.jpeg'][0]), 5000)
+
+    def test_upload_and_sized_proxy(self):
+        up = SimpleUploadedFile('a.jpg', self._jpeg_with_exif(), content_type='image/jpeg')
+        req = self.factory.post('/perfil/avatar/', {'avatar': up})
+        req.user = self.user; req.session = {}; req._messages = FallbackStorage(req)
+        fake_drive = MagicMock()
+        ids = iter(f'ID{i}' for i in range(10))
+        fake_drive.files.return_value.create.return_value.execute.side_effect = lambda: {'id': next(ids)}
+        with patch('login.views._drive_service', return_value=fake_drive), \
+             patch('login.views.redirect', return_value=HttpResponse('R')):
+            views_module.upload_avatar(req)
+
+        self.user.refresh_from_db()
+        self.assertEqual(len(self.user.avatar_renditions), 6)
+        self.assertEqual(self.user.avatar_drive_id, self.user.avatar_renditions['512.jpeg'])
+        fake_drive.new_batch_http_request.return_value.execute.assert_called_once()
+
+        with patch('login.avatar_cache.requests.get') as get:
+            resp = views_module.avatar_proxy(
+                self.factory.get('/avatar/x/', {'size': 40}, HTTP_ACCEPT='image/webp,*/*'),
+                self.user.avatar_drive_id,
+            )
+        get.assert_not_called()  # la versión quedó en disco al subirla
+        self.assertEqual(resp['Content-Type'], 'image/webp')
+        body = b''.join(resp.streaming_content)
+        from PIL import Image
+        import io
+        with Image.open(io.BytesIO(body)) as img:
+            self.assertEqual(img.size, (48, 48))
+
+
+class ProvisioningTests(TestCase):
+    """Alta masiva de usuarios (login.provisioning y el comando crear_usuarios)."""
+
+    def _roster(self, lines, header='cedula,email,first_name,last_name,password,rol,activo'):
+        import io
+        from login import provisioning
+        return provisioning.parse(io.StringIO(header + '\n' + '\n'.join(lines) + '\n'))
+
+    def test_bulk_creates_users_with_hashed_passwords(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from login import provisioning
+
+        entries = self._roster([
+            '81000001,Uno@Gmail.com,Ana,Uno,Aa1!aaaa,acadi,',
+            '81000002,dos@gmail.com,Luis,Dos,,,no',
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            summary = provisioning.provision(entries, workers=1)
+        self.assertEqual(summary['errores'], [])
+        self.assertEqual(summary['creados'], 2)
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+
+        uno = User.objects.get(cedula='81000001')
+        self.assertEqual(uno.email, 'uno@gmail.com')
+        self.assertTrue(uno.check_password('Aa1!aaaa'))
+        self.assertEqual((uno.rol, uno.is_staff, uno.is_superuser, uno.is_active), (Rol.ACADI, True, False, True))
+        dos = User.objects.get(cedula='81000002')
+        self.assertTrue(dos.has_usable_password())  # aleatoria: "olvidé mi contraseña" la reconoce
+        self.assertEqual((dos.rol, dos.is_active), (Rol.SIN_ROL, False))
+        self.assertEqual(summary['invitaciones'], 0)  # inactivo: no se le escribe aún
+
+    @override_settings(OUTBOX_ASYNC=False, OUTBOX_RATE_PER_MINUTE=0, SITE_URL='https://acredita.test',
+                       EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def test_user_without_password_can_use_the_reset_flow(self):
+        import re
+        from django.contrib.auth.forms import PasswordResetForm
+        from django.core import mail
+        from django.test import Client
+        from core.models import OutboxEmail
+        from login import provisioning
+
+        entries = self._roster(['81000020,nuevo@gmail.com,Nora,Nueva,,,'])
+        with self.captureOnCommitCallbacks(execute=True):
+            summary = provisioning.provision(entries, workers=1)
+        self.assertEqual(summary['invitaciones'], 1)
+        correo = OutboxEmail.objects.get(group='cuentas:alta')
+        self.assertEqual((correo.to, correo.status), (['nuevo@gmail.com'], OutboxEmail.ENVIADO))
+        self.assertEqual(len(mail.outbox), 1)
+
+        # El enlace del correo lleva al formulario para elegir contraseña
+        path = re.search(r'https://acredita\.test(/\S+)', correo.body).group(1)
+        client = Client()
+        response = client.get(path, follow=True)
+        self.assertEqual(response.status_code, 200)
+        response = client.post(response.redirect_chain[-1][0],
+                               {'new_password1': 'Nuev4!Clave', 'new_password2': 'Nuev4!Clave'})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(User.objects.get(cedula='81000020').check_password('Nuev4!Clave'))
+
+        # Y el flujo normal de "olvidé mi contraseña" también lo encuentra
+        self.assertEqual([u.cedula for u in PasswordResetForm().get_users('nuevo@gmail.com')], ['81000020'])
+
+    def test_any_invalid_row_rejects_the_roster(self):
+        from login import provisioning
+        User.objects.create_user(cedula='81000010', email='existe@gmail.com', password='x')
+        entries = self._roster([
+            '81000011,ok@gmail.com,A,B,,,',
+            '123,corta@gmail.com,A,B,,,',
+            '81000012,otro@hotmail.com,A,B,,,',
+            '81000010,nuevo@gmail.com,A,B,,,',
+            '81000013,ok@gmail.com,A,B,debil,jefe,quizas',
+        ])
+        summary = provisioning.provision(entries, workers=1)
+        lines = {line for line, _ in summary['errores']}
+        self.assertEqual(lines, {3, 4, 5, 6})
+        self.assertEqual(len([1 for line, _ in summary['errores'] if line == 6]), 4)
+        self.assertFalse(User.objects.filter(cedula='81000011').exists())
+
+    def test_process_pool_hashes_match(self):
+        from django.contrib.auth.hashers import check_password
+        from login import provisioning
+
+        passwords = [f'Aa1!clave{i}' for i in range(provisioning.POOL_THRESHOLD)]
+        with patch('login.provisioning.ProcessPoolExecutor',
+                   wraps=provisioning.ProcessPoolExecutor) as pool:
+            hashes = provisioning.hash_passwords(passwords, workers=2)
+        pool.assert_called_once()
+        self.assertTrue(all(check_password(p, h) for p, h in zip(passwords, hashes)))
+
+    def test_command_with_assignments_in_same_transaction(self):
+        import io
+        import os
+        import tempfile
+        from datetime import date, timedelta
+        from django.core.management import call_command, CommandError
+        from projects.models import Project
+
+        project = Project.objects.create(name='Cohorte', start_date=date.today(),
+                                         end_date=date.today() + timedelta(days=5))
+        with tempfile.TemporaryDirectory() as tmp:
+            roster = os.path.join(tmp, 'usuarios.csv')
+            with open(roster, 'w', encoding='utf-8') as fh:
+                fh.write('cedula,email,first_name,last_name,rol\n81000021,mini.c@gmail.com,Mini,C,miniadmin\n')
+            bad = os.path.join(tmp, 'malas.csv')
+            with open(bad, 'w', encoding='utf-8') as fh:
+                fh.write('cedula,tipo,id,rol\n81000021,proyecto,999999,editor\n')
+            with self.assertRaises(CommandError):
+                call_command('crear_usuarios', roster, asignaciones=bad, stdout=io.StringIO(), stderr=io.StringIO())
+            self.assertFalse(User.objects.filter(cedula='81000021').exists())
+
+            good = os.path.join(tmp, 'asignaciones.csv')
+            with open(good, 'w', encoding='utf-8') as fh:
+                fh.write(f'cedula,tipo,id,rol\n81000021,proyecto,{project.pk},editor\n')
+            out = io.StringIO()
+            call_command('crear_usuarios', roster, asignaciones=good, stdout=out)
+        self.assertIn('1 usuario(s) creados', out.getvalue())
+        self.assertTrue(project.project_assignments_to_users.filter(user_id='81000021').exists())
@@ -0,0 +1,171 @@
+# login/throttle.py
+"""
+Límite de intentos de inicio de sesión por cédula y por IP.
+
+Cada clave lleva dos contadores en caché: el de la ventana fija actual y
+el de la anterior. El conteo deslizante es actual + anterior * (parte de
+la ventana anterior que todavía cae dentro de los últimos WINDOW
+segundos). Solo cuentan los fallos. Si la cédula o la IP superan su
+límite, CedulaBackend rechaza el intento antes de calcular el hash de la
+contraseña.
+
+Los intentos (exitosos, fallidos o bloqueados) se guardan en
+database.LoginAttempt. Al confirmarse la transacción entran a una cola, y
+un hilo en segundo plano los escribe por lotes con bulk_create.
+"""
+import logging
+import math
+import queue
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from database.models import LoginAttempt
+from .models import CEDULA_REGEX
+
+logger = logging.getLogger(__name__)
+
+WINDOW = getattr(settings, 'LOGIN_THROTTLE_WINDOW', 15 * 60)
+CEDULA_LIMIT = getattr(settings, 'LOGIN_THROTTLE_CEDULA_LIMIT', 5)
+IP_LIMIT = getattr(settings, 'LOGIN_THROTTLE_IP_LIMIT', 30)
+FLUSH_BATCH = 200
+FLUSH_INTERVAL = 2.0
+CEDULA_MAX_LENGTH = LoginAttempt._meta.get_field('cedula').max_length
+EMAIL_MAX_LENGTH = LoginAttempt._meta.get_field('email').max_length
+
+
+def client_ip(request):
+    """IP del cliente; X-Forwarded-For solo si LOGIN_THROTTLE_TRUST_PROXY."""
+    if request is None:
+        return None
+    if getattr(settings, 'LOGIN_THROTTLE_TRUST_PROXY', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR') or None
+
+
+def _key(kind, ident, bucket):
+    return f"login:throttle:{kind}:{ident}:{bucket}"
+
+
+def _window(kind, ident, now):
+    """(fallos en la ventana actual, fallos en la anterior, segundos transcurridos de la actual)."""
+    bucket = int(now // WINDOW)
+    current, previous = _key(kind, ident, bucket), _key(kind, ident, bucket - 1)
+    values = cache.get_many([current, previous])
+    return values.get(current, 0), values.get(previous, 0), now - bucket * WINDOW
+
+
+def _retry_after(kind, ident, limit, now):
+    """Segundos hasta que *ident* vuelva a quedar bajo *limit* (0 si ya lo está)."""
+    current, previous, elapsed = _window(kind, ident, now)
+    if current + previous * (1 - elapsed / WINDOW) < limit:
+        return 0
+    if current >= limit:
+        # La ventana actual sola ya alcanza el límite: hay que esperar a que pase a ser la anterior
+        return max(1, math.ceil(WINDOW - elapsed + WINDOW * (1 - limit / current)))
+    # Basta con que la ventana anterior pese lo suficientemente poco
+    return max(1, math.ceil(WINDOW * (1 - (limit - current) / previous) - elapsed))
+
+
+def _limits(cedula, ip):
+    # Solo una cédula con formato válido entra en la clave de caché; otro
+    # valor no corresponde a ningún usuario y basta con el límite por IP
+    if cedula and re.match(CEDULA_REGEX, cedula):
+        yield 'cedula', cedula, CEDULA_LIMIT
+    if ip:
+        yield 'ip', ip, IP_LIMIT
+
+
+def retry_after(cedula, ip=None):
+    """Segundos que debe esperar el intento de *cedula* desde *ip* (0 = permitido)."""
+    now = time.time()
+    return max((_retry_after(kind, ident, limit, now) for kind, ident, limit in _limits(cedula, ip)), default=0)
+
+
+def _hit(kind, ident, now):
+    key = _key(kind, ident, int(now // WINDOW))
+    # Dos ventanas de vida: la actual y mientras sea la anterior
+    if not cache.add(key, 1, WINDOW * 2):
+        try:
+            cache.incr(key)
+        except ValueError:  # expiró entre add e incr
+            cache.set(key, 1, WINDOW * 2)
+
+
+def register_failure(cedula, ip=None, email=''):
+    now = time.time()
+    for kind, ident, _ in _limits(cedula, ip):
+        _hit(kind, ident, now)
+    _persist(cedula, ip, email, success=False)
+
+
+def register_success(cedula, ip=None, email=''):
+    """Un acceso correcto limpia los fallos de la cédula (no los de la IP)."""
+    bucket = int(time.time() // WINDOW)
+    cache.delete_many([_key('cedula', cedula, bucket), _key('cedula', cedula, bucket - 1)])
+    _persist(cedula, ip, email, success=True)
+
+
+def register_blocked(cedula, ip=None):
+    _persist(cedula, ip, '', success=False, blocked=True)
+
+
+# --- Auditoría en LoginAttempt ---
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _persist(cedula, ip, email, success, blocked=False):
+    attempt = LoginAttempt(cedula=(cedula or '')[:CEDULA_MAX_LENGTH], ip_address=ip,
+                           email=(email or '')[:EMAIL_MAX_LENGTH],
+                           success=success, blocked=blocked, timestamp=timezone.now())
+    if not getattr(settings, 'LOGIN_ATTEMPTS_ASYNC', True):
+        transaction.on_commit(lambda: LoginAttempt.objects.bulk_create([attempt]))
+        return
+
+    def _enqueue():
+        _ensure_worker()
+        _queue.put(attempt)
+
+    transaction.on_commit(_enqueue)
+
+
+def flush(block=False):
+    """Escribe los intentos en cola. Retorna cuántos se guardaron."""
+    batch = []
+    try:
+        batch.append(_queue.get(timeout=FLUSH_INTERVAL) if block else _queue.get_nowait())
+        while len(batch) < FLUSH_BATCH:
+            batch.append(_queue.get_nowait())
+    except queue.Empty:
+        pass
+    if batch:
+        LoginAttempt.objects.bulk_create(batch)
+    return len(batch)
+
+
+def _work():
+    while True:
+        try:
+            flush(block=True)
+        except Exception:
+            logger.exception("LOGIN: No se pudieron guardar intentos de inicio de sesión")
+        finally:
+            close_old_connections()
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_work, name='login-attempts', daemon=True)
+            _worker.start()
@@ -56,4 +56,6 @@ urlpatterns = [
     path('accounts/gestion/toggle/<str:cedula>/', views.toggle_active, name='toggle_active'),
 
     path('accounts/gestion/change_rol/<str:cedula>/', views.change_user_rol, name='change_user_rol'),
+    # Acciones masivas sobre las cuentas marcadas o filtradas (POST)
+    path('accounts/gestion/masivo/', views.bulk_accounts, name='bulk_accounts'),
 ]
@@ -1,20 +1,18 @@
 # login/views.py
 
-import os
-import mimetypes
+import io
 import requests
-import tempfile
 
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.core.mail import send_mail
-from django.http import HttpResponse, Http404
+from django.core.paginator import Paginator
+from django.http import FileResponse, HttpResponseNotModified, Http404
 from django.shortcuts import get_object_or_404, redirect, render
 from django.templatetags.static import static
 from django.urls import reverse
-from django.views.decorators.cache import cache_page
+from django.utils.http import parse_etags
 from django.views.decorators.http import require_POST
 
 from googleapiclient.http import MediaIoBaseUpload
@@ -23,6 +21,7 @@ from .forms import (
     AvatarUploadForm, LoginForm, ProfileForm,
     RegisterStep1Form, VerifyCodeForm
 )
+from . import accounts, avatar_cache, avatar_renditions
 from .google_service import _drive_service
 from .models import Rol, User
 
@@ -31,23 +30,55 @@ from .models import Rol, User
 #  Utilidades
 # ---------------------------------------------------------------------
 
+AVATAR_MAX_AGE = 60 * 60 * 24 * 365
+
+
 def _build_avatar_url(file_id: str) -> str:
     """URL pública directa para descargar el archivo de Drive."""
     return f"https://drive.google.com/uc?export=media&id={file_id}"
 
 
-@cache_page(60 * 5)  # cache 5 minutos
 def avatar_proxy(request, file_id):
     """
     Sirve la imagen subida a Drive a través de este endpoint.
     Evita problemas de CORS o de enlace roto.
+
+    Solo responde por ids que son el avatar de algún usuario. Con ?size=
+    se sirve una de sus versiones reducidas (ver avatar_renditions.py).
+    Los bytes salen de la caché en disco (ver avatar_cache.py). Un
+    id de Drive nunca cambia de contenido, así que la respuesta se marca
+    como inmutable y los navegadores revalidan con If-None-Match.
     """
-    url = _build_avatar_url(file_id)
-    resp = requests.get(url, stream=True)
-    if resp.status_code != 200:
+    if not avatar_cache.is_valid_id(file_id):
+        raise Http404("Avatar no encontrado")
+    # Solo se sirven avatares de usuarios: el proxy no descarga otros archivos de Drive
+    renditions = (User.objects.filter(avatar_drive_id=file_id)
+                  .values_list('avatar_renditions', flat=True).first())
+    if renditions is None:
+        raise Http404("Avatar no encontrado")
+
+    # ?size=48|128|512 sirve la versión reducida más cercana (WebP si se acepta)
+    if 'size' in request.GET:
+        file_id = avatar_renditions.pick(
+            renditions, request.GET['size'], request.headers.get('Accept', '')
+        ) or file_id
+
+    try:
+        path, meta = avatar_cache.fetch(file_id, _build_avatar_url(file_id))
+    except (avatar_cache.AvatarNotFound, requests.RequestException):
         raise Http404("Avatar no encontrado")
-    content_type = resp.headers.get("Content-Type", "image/png")
-    return HttpResponse(resp.content, content_type=content_type)
+
+    etag = meta['etag']
+    # Comparación débil (RFC 9110 §13.1.2): W/"x" coincide con "x"
+    if_none_match = {tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))}
+    if etag in if_none_match or '*' in if_none_match:
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=meta['content_type'])
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={AVATAR_MAX_AGE}, immutable'
+    response['Vary'] = 'Accept'
+    return response
 
 
 # ---------------------------------------------------------------------
@@ -79,13 +110,15 @@ def register_verify(request):
         session=request.session,
     )
     if request.method == "POST" and form.is_valid():
-        User.objects.create_user(
+        user = User.objects.create_user(
             cedula=pending["cedula"],
             email=pending["email"],
-            password=pending["password"],
             first_name=pending["first_name"],
             last_name=pending["last_name"],
         )
+        # La sesión guarda el hash (ver RegisterStep1Form.enviar_codigo)
+        user.password = pending["password"]
+        user.save(update_fields=["password"])
         messages.success(
             request,
             "Cuenta creada. Espera a que un administrador la active."
@@ -105,7 +138,7 @@ def register_verify(request):
 #  Login / Logout
 # ---------------------------------------------------------------------
 def login_view(request):
-    form = LoginForm(request.POST or None)
+    form = LoginForm(request.POST or None, request=request)
     if request.method == "POST" and form.is_valid():
         user = form.cleaned_data["user"]
         login(request, user)
@@ -131,7 +164,7 @@ def profile_view(request):
     """
     user = request.user
     if user.avatar_drive_id:
-        avatar_url = reverse('avatar_proxy', kwargs={'file_id': user.avatar_drive_id})
+        avatar_url = reverse('avatar_proxy', kwargs={'file_id': user.avatar_drive_id}) + '?size=128'
     else:
         avatar_url = static("core/img/default-avatar.png")
 
@@ -162,53 +195,50 @@ def upload_avatar(request):
         user = request.user
         uploaded = request.FILES['avatar']
 
-        # 1) Borra anterior en Drive
-        if user.avatar_drive_id:
-            try:
-                _drive_service().files().delete(
-                    fileId=user.avatar_drive_id
-                ).execute()
-            except:
-                pass
-
-        # 2) Graba en archivo temporal fuera del repo
-        suffix = os.path.splitext(uploaded.name)[1]
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            for chunk in uploaded.chunks():
-                tmp.write(chunk)
-            tmp.flush()
-            temp_path = tmp.name
-
-        # 3) Súbelo a Drive
+        # 1) Decodifica una sola vez y genera las versiones (sin EXIF)
+        uploaded.seek(0)
+        try:
+            renditions = avatar_renditions.build_renditions(uploaded)
+        except (OSError, ValueError):
+            form.add_error('avatar', 'No se pudo procesar la imagen.')
+            return render(request, 'login/upload_avatar.html', {'form': form})
+
+        # 2) Borra los anteriores en Drive (y sus copias en disco)
+        _delete_avatar_files(user)
+
+        # 3) Sube cada versión a Drive desde memoria
         drive = _drive_service()
-        meta = {
-            "name": f"{user.cedula}_{uploaded.name}",
-            "parents": [settings.AVATARS_DRIVE_FOLDER_ID],
-        }
-        with open(temp_path, 'rb') as fh:
-            media = MediaIoBaseUpload(
-                fh,
-                mimetype=uploaded.content_type or mimetypes.guess_type(temp_path)[0],
-                resumable=False
-            )
+        ids = {}
+        for key, (data, content_type) in renditions.items():
+            meta = {
+                "name": f"{user.cedula}_avatar_{key}",
+                "parents": [settings.AVATARS_DRIVE_FOLDER_ID],
+            }
+            media = MediaIoBaseUpload(io.BytesIO(data), mimetype=content_type, resumable=False)
             gfile = drive.files().create(
                 body=meta, media_body=media, fields="id"
             ).execute()
-
-        # 4) Limpia el temporal
-        os.remove(temp_path)
-
-        # 5) Hazlo público y guarda sólo los campos Drive
-        drive.permissions().create(
-            fileId=gfile['id'],
-            body={'role':'reader','type':'anyone'},
-            fields='id'
-        ).execute()
-
-        user.avatar_drive_id   = gfile['id']
-        user.avatar_drive_link = _build_avatar_url(gfile['id'])
+            ids[key] = gfile['id']
+            # Quedan listas en la caché de disco; el proxy no tendrá que bajarlas
+            avatar_cache.store(gfile['id'], data, content_type)
+
+        # 4) Hazlas públicas en una sola petición por lotes
+        batch = drive.new_batch_http_request()
+        for file_id in ids.values():
+            batch.add(drive.permissions().create(
+                fileId=file_id,
+                body={'role':'reader','type':'anyone'},
+                fields='id'
+            ))
+        batch.execute()
+
+        # 5) La versión grande en JPEG es el avatar "principal"
+        main_id = ids[avatar_renditions.rendition_key(avatar_renditions.SIZES[-1], 'jpeg')]
+        user.avatar_drive_id   = main_id
+        user.avatar_drive_link = _build_avatar_url(main_id)
+        user.avatar_renditions = ids
         # ¡no tocamos user.avatar ni MEDIA_ROOT!
-        user.save(update_fields=['avatar_drive_id','avatar_drive_link'])
+        user.save(update_fields=['avatar_drive_id','avatar_drive_link','avatar_renditions'])
 
         messages.success(request, "Avatar subido correctamente.")
         return redirect('profile')
@@ -216,6 +246,25 @@ def upload_avatar(request):
     return render(request, 'login/upload_avatar.html', {'form': form})
 
 
+def _delete_avatar_files(user):
+    """Elimina de Drive y del disco el avatar del usuario y sus versiones."""
+    file_ids = set(user.avatar_renditions.values())
+    if user.avatar_drive_id:
+        file_ids.add(user.avatar_drive_id)
+    if not file_ids:
+        return
+    try:
+        drive = _drive_service()
+        batch = drive.new_batch_http_request()
+        for file_id in file_ids:
+            batch.add(drive.files().delete(fileId=file_id))
+        batch.execute()
+    except Exception:
+        pass
+    for file_id in file_ids:
+        avatar_cache.evict(file_id)
+
+
 # ---------------------------------------------------------------------
 #  Eliminar avatar
 # ---------------------------------------------------------------------
@@ -223,18 +272,15 @@ def upload_avatar(request):
 @require_POST
 def delete_avatar(request):
     user = request.user
-    if user.avatar_drive_id:
-        try:
-            _drive_service().files().delete(fileId=user.avatar_drive_id).execute()
-        except Exception:
-            pass
+    _delete_avatar_files(user)
     if user.avatar:
         user.avatar.delete(save=False)
 
     user.avatar = None
     user.avatar_drive_id = None
     user.avatar_drive_link = None
-    user.save(update_fields=["avatar", "avatar_drive_id", "avatar_drive_link"])
+    user.avatar_renditions = {}
+    user.save(update_fields=["avatar", "avatar_drive_id", "avatar_drive_link", "avatar_renditions"])
     messages.success(request, "Avatar eliminado correctamente.")
     return redirect("profile")
 
@@ -267,36 +313,37 @@ def _is_admin_or_mini(user):
     return user.is_authenticated and user.rol in (Rol.SUPERADMIN, Rol.MINIADMIN)
 
 
+def _account_filters(params):
+    return {
+        "estado": params.get("estado", "todas"),
+        "rol": params.get("rol", "todas"),
+        "query": params.get("q", "").strip(),
+    }
+
+
 @login_required
 @user_passes_test(_is_admin_or_mini)
 def gestion_cuentas(request):
-    estado_filtro = request.GET.get("estado", "todas")
-    rol_filtro = request.GET.get("rol", "todas") # Leer el parámetro 'rol'
-
-    usuarios = User.objects.all().order_by('first_name', 'last_name')
-
-    if estado_filtro == "activo":
-        usuarios = usuarios.filter(is_active=True)
-    elif estado_filtro == "inactivo":
-        usuarios = usuarios.filter(is_active=False)
-
-    # Aplicar el filtro de rol
-    if rol_filtro != "todas":
-        if rol_filtro == "sin_rol":
-            # Si se filtra por "Usuario Normal", incluir todos los roles correspondientes
-            roles_usuario_normal = [Rol.SIN_ROL, Rol.LECTOR, Rol.EDITOR, Rol.COMENTARISTA]
-            usuarios = usuarios.filter(rol__in=roles_usuario_normal)
-        else:
-            # Para otros roles específicos, filtrar directamente
-            usuarios = usuarios.filter(rol=rol_filtro)
+    filtros = _account_filters(request.GET)
+    usuarios = accounts.filtered_users(**filtros)
+    page_obj = Paginator(usuarios, accounts.PAGE_SIZE).get_page(request.GET.get("page"))
+
+    # Parámetros de filtro para los enlaces de paginación
+    query_params = request.GET.copy()
+    query_params.pop("page", None)
 
     return render(
         request,
         "login/accounts_manage.html",
         {
-            "usuarios": usuarios,
-            "estado_actual": estado_filtro,
-            "rol_actual": rol_filtro
+            "usuarios": page_obj.object_list,
+            "page_obj": page_obj,
+            "is_paginated": page_obj.has_other_pages(),
+            "filtros_query": query_params.urlencode(),
+            "estado_actual": filtros["estado"],
+            "rol_actual": filtros["rol"],
+            "q_actual": filtros["query"],
+            "roles_asignables": [(r.value, r.label) for r in accounts.ASSIGNABLE_ROLES],
         },
     )
 
@@ -307,23 +354,36 @@ def gestion_cuentas(request):
 def toggle_active(request, cedula):
     u = get_object_or_404(User, cedula=cedula)
     action = request.POST.get("action")
-    u.is_active = action == "activate"
-    u.save()
-
-    estado_txt = "activada" if u.is_active else "desactivada"
-    send_mail(
-        f"Tu cuenta ha sido {estado_txt}",
-        (
-            f"Hola {u.first_name},\n\n"
-            f"Tu cuenta ha sido {estado_txt}.\n"
-            "Si tienes problemas, contacta a un administrador.\n\n"
-            "Saludos,\n"
-            "Equipo de Acreditación"
-        ),
-        settings.DEFAULT_FROM_EMAIL,
-        [u.email],
-        fail_silently=False,
-    )
+    accounts.set_active(User.objects.filter(pk=u.pk), action == "activate", actor=request.user)
+    return redirect(request.META.get("HTTP_REFERER", "gestion_cuentas"))
+
+
+@login_required
+@user_passes_test(_is_admin_or_mini)
+@require_POST
+def bulk_accounts(request):
+    """
+    Activa, desactiva o cambia el rol de varias cuentas en un solo UPDATE.
+    Con alcance=filtro la acción cubre todas las cuentas que cumplen los
+    filtros de la tabla (no solo la página visible); si no, las marcadas.
+    """
+    action = request.POST.get("accion")
+    if request.POST.get("alcance") == "filtro":
+        usuarios = accounts.filtered_users(**_account_filters(request.POST))
+    else:
+        usuarios = User.objects.filter(cedula__in=request.POST.getlist("seleccion"))
+
+    if action in ("activate", "deactivate"):
+        n = accounts.set_active(usuarios, action == "activate", actor=request.user)
+        estado_txt = "activadas" if action == "activate" else "desactivadas"
+        messages.success(request, f"{n} cuenta(s) {estado_txt}.")
+    elif action == "change_rol" and request.POST.get("new_rol") in accounts.ASSIGNABLE_ROLES:
+        rol = Rol(request.POST["new_rol"])
+        n = accounts.set_rol(usuarios, rol, actor=request.user)
+        messages.success(request, f"{n} cuenta(s) cambiadas a {rol.label}.")
+    else:
+        messages.error(request, "Acción no válida.")
+
     return redirect(request.META.get("HTTP_REFERER", "gestion_cuentas"))
 
 @login_required
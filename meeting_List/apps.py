@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MeetingListConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'meeting_List'
+
+    def ready(self):
+        import meeting_List.signals
@@ -0,0 +1,100 @@
+# meeting_List/calendar_engine.py
+"""
+Motor del calendario de reuniones.
+
+Trae todos los eventos del rango visible (semana o mes) en una sola consulta,
+con los participantes precargados, y los agrupa por día en Python. Las
+series periódicas (Event.rrule) se expanden solo dentro del rango. El
+resultado se guarda en caché por rango; cualquier cambio en un Event cambia
+la versión de la caché (ver meeting_List.signals) y deja obsoletas las
+entradas anteriores.
+"""
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from calendar_create_event.models import Event
+from calendar_create_event.recurrence import SERIES_WINDOW_DAYS, occurrences
+
+VERSION_KEY = 'meeting_List:events:version'
+CACHE_TIMEOUT = getattr(settings, 'CALENDAR_CACHE_TIMEOUT', 60 * 5)
+MAX_RANGE_DAYS = 62  # límite para el feed JSON
+
+
+def week_days(start: date) -> list[date]:
+    """Los 7 días (lunes a domingo) de la semana que empieza en *start*."""
+    return [start + timedelta(days=i) for i in range(7)]
+
+
+def start_of_week(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def month_weeks(year: int, month: int) -> list[list[date]]:
+    """Semanas completas (lunes a domingo) que cubren el mes indicado."""
+    first = date(year, month, 1)
+    next_month = date(year + (month == 12), month % 12 + 1, 1)
+    current = start_of_week(first)
+    weeks = []
+    while current < next_month:
+        weeks.append(week_days(current))
+        current += timedelta(days=7)
+    return weeks
+
+
+def _serialize(event) -> dict:
+    """Serializa un Event o una Occurrence (misma interfaz)."""
+    return {
+        'id': event.id,
+        'title': event.title,
+        'description': event.description,
+        'date': event.date,
+        'time': event.time,
+        'meeting_type': event.meeting_type,
+        'location': event.location or '',
+        'link': event.link or '',
+        'recurring': bool(event.rrule),
+        'participants': [
+            {'id': u.cedula, 'name': u.get_full_name} for u in event.participants.all()
+        ],
+    }
+
+
+def _cache_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.set(VERSION_KEY, version, None)
+    return version
+
+
+def invalidate_cache():
+    """Marca como obsoletas todas las entradas de rango en caché."""
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def events_in_range(start: date, end: date) -> list[dict]:
+    """Eventos entre *start* y *end* (inclusive), ordenados por fecha y hora."""
+    key = f'meeting_List:events:{_cache_version()}:{start.isoformat()}:{end.isoformat()}'
+    events = cache.get(key)
+    if events is None:
+        qs = (Event.objects
+              .filter(Q(rrule='', date__range=[start, end]) | (~Q(rrule='') & Q(date__lte=end)))
+              .order_by('date', 'time')
+              .prefetch_related('participants', 'exceptions'))
+        events = [_serialize(occ) for ev in qs for occ in occurrences(ev, start, end)]
+        events.sort(key=lambda ev: (ev['date'], ev['time']))
+        cache.set(key, events, CACHE_TIMEOUT)
+    return events
+
+
+def group_by_day(days: list[date], events: list[dict]) -> list[tuple[date, list[dict]]]:
+    """Empareja cada día de *days* con sus eventos (ya ordenados por hora)."""
+    by_day = defaultdict(list)
+    for ev in events:
+        by_day[ev['date']].append(ev)
+    return [(day, by_day.get(day, [])) for day in days]
@@ -0,0 +1,171 @@
+# meeting_List/ics.py
+"""
+Exportación iCalendar (RFC 5545) de las reuniones de un participante.
+
+El feed se genera línea a línea para poder transmitirlo en streaming.
+Los clientes de calendario se suscriben sin sesión, con un token firmado
+que contiene un secreto aleatorio guardado en el usuario (no su cédula).
+Rotar el secreto revoca el enlace anterior.
+"""
+import secrets
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core import signing
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from calendar_create_event.availability import DURATION_MINUTES
+from calendar_create_event.models import Event
+from login.models import User
+
+FEED_SALT = 'meeting_List.ics'
+PRODID = '-//ICESI Acreditación//Reuniones//ES'
+_UTC_FORMAT = '%Y%m%dT%H%M%SZ'
+
+
+def _sign(secret):
+    return signing.Signer(salt=FEED_SALT).sign(secret)
+
+
+def rotate_feed_token(user):
+    """Genera un secreto nuevo (invalida el enlace anterior) y retorna el token."""
+    user.ics_feed_secret = secrets.token_urlsafe(32)
+    user.save(update_fields=['ics_feed_secret'])
+    return _sign(user.ics_feed_secret)
+
+
+def make_feed_token(user):
+    """Token firmado del feed del usuario; crea el secreto la primera vez."""
+    if not user.ics_feed_secret:
+        return rotate_feed_token(user)
+    return _sign(user.ics_feed_secret)
+
+
+def read_feed_token(token):
+    """Cédula del usuario del token, o None si la firma o el secreto no son válidos."""
+    try:
+        secret = signing.Signer(salt=FEED_SALT).unsign(token)
+    except signing.BadSignature:
+        return None
+    return (User.objects.filter(ics_feed_secret=secret)
+            .values_list('cedula', flat=True).first())
+
+
+def user_events(cedula):
+    return Event.objects.filter(participants=cedula)
+
+
+def feed_state(cedula):
+    """
+    Número de eventos, suma de ids y última modificación en una sola
+    consulta agregada; basta para detectar altas, bajas y ediciones.
+    """
+    return user_events(cedula).aggregate(
+        total=Count('id'), ids=Sum('id'), last=Max('updated_at'),
+    )
+
+
+def _escape(value):
+    return (str(value or '').replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    """Parte las líneas a 75 octetos como exige el RFC 5545."""
+    raw = line.encode('utf-8')
+    if len(raw) <= 75:
+        return line + '\r\n'
+    parts, current = [], b''
+    for char in line:
+        encoded = char.encode('utf-8')
+        if len(current) + len(encoded) > (75 if not parts else 74):
+            parts.append(current.decode('utf-8'))
+            current = b''
+        current += encoded
+    parts.append(current.decode('utf-8'))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime(_UTC_FORMAT)
+
+
+def _local(day, time):
+    return timezone.make_aware(datetime.combine(day, time))
+
+
+def _rrule_line(rrule):
+    """RRULE con UNTIL en UTC, del mismo tipo que DTSTART (RFC 5545 §3.3.10)."""
+    parts = []
+    for part in rrule.split(';'):
+        name, _, value = part.partition('=')
+        if name == 'UNTIL' and len(value) == 8:
+            until = datetime.strptime(value, '%Y%m%d').date()
+            value = _utc(_local(until, datetime.max.time().replace(microsecond=0)))
+        parts.append(f'{name}={value}' if value else name)
+    return 'RRULE:' + ';'.join(parts)
+
+
+def _vevent(event, host, occurrence=None):
+    """
+    VEVENT del evento. Para una serie incluye RRULE y EXDATE; si se pasa
+    *occurrence* (excepción movida) genera la instancia con RECURRENCE-ID.
+    """
+    if occurrence is None:
+        start = _local(event.date, event.time)
+    else:
+        start = _local(occurrence.new_date or occurrence.original_date,
+                       occurrence.new_time or event.time)
+    end = start + timedelta(minutes=DURATION_MINUTES)
+    if event.meeting_type == 'Virtual':
+        location, extra = event.link, [f'URL:{event.link}'] if event.link else []
+    else:
+        location, extra = event.location, []
+    description = event.description or ''
+    if event.meeting_type == 'Virtual' and event.link:
+        description = f"{description}\nEnlace: {event.link}".strip()
+
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:event-{event.pk}@{host}',
+        f'DTSTAMP:{_utc(event.updated_at)}',
+        f'LAST-MODIFIED:{_utc(event.updated_at)}',
+        f'DTSTART:{_utc(start)}',
+        f'DTEND:{_utc(end)}',
+        f'SUMMARY:{_escape(event.title)}',
+        f'DESCRIPTION:{_escape(description)}',
+        f'LOCATION:{_escape(location)}',
+        f'CATEGORIES:{_escape(event.meeting_type)}',
+        *extra,
+    ]
+    if occurrence is not None:
+        lines.append(f'RECURRENCE-ID:{_utc(_local(occurrence.original_date, event.time))}')
+    elif event.rrule:
+        lines.append(_rrule_line(event.rrule))
+        lines.extend(f'EXDATE:{_utc(_local(exc.original_date, event.time))}'
+                     for exc in event.exceptions.all() if exc.cancelled)
+    lines.append('END:VEVENT')
+    return ''.join(_fold(line) for line in lines)
+
+
+def iter_calendar(cedula, host):
+    """Genera el VCALENDAR por fragmentos, leyendo los eventos por lotes."""
+    yield ''.join(_fold(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        'X-WR-CALNAME:Reuniones',
+    ))
+    events = (user_events(cedula)
+              .only('id', 'title', 'description', 'date', 'time', 'location',
+                    'link', 'meeting_type', 'rrule', 'updated_at')
+              .prefetch_related('exceptions')
+              .order_by('date', 'time'))
+    for event in events.iterator(chunk_size=500):
+        yield _vevent(event, host)
+        for exc in (event.exceptions.all() if event.rrule else ()):
+            if not exc.cancelled:
+                yield _vevent(event, host, occurrence=exc)
+    yield _fold('END:VCALENDAR')
@@ -0,0 +1,25 @@
+# meeting_List/signals.py
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from calendar_create_event.models import Event, EventException
+from .calendar_engine import invalidate_cache
+
+
+@receiver([post_save, post_delete], sender=Event)
+def _invalidate_on_event_change(sender, instance, **kwargs):
+    invalidate_cache()
+
+
+@receiver(m2m_changed, sender=Event.participants.through)
+def _invalidate_on_participants_change(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_cache()
+
+
+@receiver([post_save, post_delete], sender=EventException)
+def _invalidate_on_exception_change(sender, instance, **kwargs):
+    # Tocar la serie mantiene al día el ETag/Last-Modified del feed .ics
+    Event.objects.filter(pk=instance.event_id).update(updated_at=timezone.now())
+    invalidate_cache()
@@ -87,3 +87,147 @@ class ListEventsViewTest(TestCase):
         self.assertContains(response, 'No hay reuniones agendadas aún.')
 
    
+
+class CalendarRangeTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            cedula='55555555', email='rango@gmail.com', password='Pass123!'
+        )
+        self.user.is_active = True
+        self.user.save()
+        self.client.login(cedula='55555555', password='Pass123!')
+        for day in (3, 4, 4):
+            Event.objects.create(
+                title=f'Comité {day}', date=f'2025-06-0{day}', time='10:00',
+                meeting_type='Virtual', link='https://zoom.us/x',
+            ).participants.set([self.user])
+
+    def test_week_loads_range_in_one_query(self):
+        from meeting_List.calendar_engine import events_in_range, invalidate_cache
+        from datetime import date
+        invalidate_cache()
+        with self.assertNumQueries(3):  # eventos + participantes + excepciones
+            events = events_in_range(date(2025, 6, 2), date(2025, 6, 8))
+        self.assertEqual(len(events), 3)
+        with self.assertNumQueries(0):  # segunda lectura desde caché
+            events_in_range(date(2025, 6, 2), date(2025, 6, 8))
+
+    def test_feed_json_and_invalidation(self):
+        url = reverse('calendar_feed') + '?start=2025-06-01&end=2025-06-30'
+        data = self.client.get(url).json()
+        self.assertEqual(len(data['events']), 3)
+        self.assertEqual(data['events'][0]['participants'][0]['id'], '55555555')
+        Event.objects.create(title='Nueva', date='2025-06-20', time='08:00', meeting_type='Presencial')
+        self.assertEqual(len(self.client.get(url).json()['events']), 4)
+
+    def test_feed_rejects_bad_range(self):
+        url = reverse('calendar_feed') + '?start=2025-01-01&end=2025-12-31'
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_month_view(self):
+        response = self.client.get(reverse('calendar_month') + '?year=2025&month=6')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Comité 4')
+        self.assertEqual(len(response.context['weeks']), 6)  # junio 2025 inicia en domingo
+
+    def test_month_view_out_of_range_year_falls_back_to_today(self):
+        from django.test import RequestFactory
+        from django.utils import timezone
+        from meeting_List import views
+        for year, month in (('9999', '12'), ('1', '1'), ('2025', '13')):
+            request = RequestFactory().get('/', {'year': year, 'month': month})
+            request.user = self.user
+            response = views.calendar_month(request)
+            self.assertEqual(response.status_code, 200)
+        self.assertIn(f'{timezone.localdate().year}', response.content.decode())
+        request = RequestFactory().get('/', {'year': '9998', 'month': '12'})
+        request.user = self.user
+        self.assertEqual(views.calendar_month(request).status_code, 200)
+
+
+class IcsFeedTest(TestCase):
+
+    def setUp(self):
+        from meeting_List import ics
+        self.user = User.objects.create_user(
+            cedula='66666666', email='ics@gmail.com', password='Pass123!'
+        )
+        self.event = Event.objects.create(
+            title='Comité, sesión; semanal', description='Línea 1\nLínea 2',
+            date='2025-06-03', time='10:00', meeting_type='Virtual', link='https://zoom.us/x',
+        )
+        self.event.participants.set([self.user])
+        Event.objects.create(title='Ajeno', date='2025-06-03', time='11:00', meeting_type='Presencial')
+        self.url = reverse('ics_feed', args=[ics.make_feed_token(self.user)])
+
+    def test_feed_content_and_conditional_get(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('SUMMARY:Comité\\, sesión\; semanal', body)
+        self.assertIn('DTSTART:20250603T150000Z', body)  # 10:00 Bogotá
+        self.assertIn('URL:https://zoom.us/x', body)
+        self.assertNotIn('Ajeno', body)
+        self.assertTrue(response.has_header('Last-Modified'))
+        self.assertNotIn(self.user.cedula, response['ETag'])
+
+        again = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+        self.event.title = 'Cambiado'
+        self.event.save()
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+
+    def test_invalid_token(self):
+        response = self.client.get(reverse('ics_feed', args=['66666666:falso']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_token_hides_cedula_and_rotation_revokes_it(self):
+        from django.core import signing
+        from meeting_List import ics
+        token = ics.make_feed_token(self.user)
+        self.assertNotIn(self.user.cedula, token)
+        self.assertEqual(ics.make_feed_token(self.user), token)  # estable hasta rotar
+        # Una firma válida de la cédula (formato anterior) ya no sirve
+        forged = signing.Signer(salt=ics.FEED_SALT).sign(self.user.pk)
+        self.assertIsNone(ics.read_feed_token(forged))
+
+        new_token = ics.rotate_feed_token(self.user)
+        self.assertNotEqual(new_token, token)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(ics.read_feed_token(new_token), self.user.cedula)
+
+
+class RecurringCalendarTest(TestCase):
+
+    def test_series_expanded_in_range(self):
+        from datetime import date
+        from meeting_List.calendar_engine import events_in_range
+        Event.objects.create(
+            title='Serie', date='2025-01-06', time='09:00', meeting_type='Presencial',
+            rrule='FREQ=WEEKLY',
+        )
+        Event.objects.create(title='Futura', date='2025-09-01', time='09:00',
+                             meeting_type='Presencial', rrule='FREQ=DAILY')
+        events = events_in_range(date(2025, 6, 1), date(2025, 6, 30))
+        self.assertEqual([e['date'].day for e in events], [2, 9, 16, 23, 30])
+        self.assertTrue(all(e['recurring'] for e in events))
+
+    def test_ics_exports_rule_and_exceptions(self):
+        from calendar_create_event.models import EventException
+        from meeting_List import ics
+        user = User.objects.create_user(cedula='77777777', email='serie@gmail.com', password='x')
+        series = Event.objects.create(
+            title='Serie', date='2025-06-02', time='09:00', meeting_type='Presencial',
+            rrule='FREQ=WEEKLY;UNTIL=20250630',
+        )
+        series.participants.set([user])
+        EventException.objects.create(event=series, original_date='2025-06-09', cancelled=True)
+        EventException.objects.create(event=series, original_date='2025-06-16', new_time='11:00')
+        body = ''.join(ics.iter_calendar(user.pk, 'testserver'))
+        self.assertIn('RRULE:FREQ=WEEKLY;UNTIL=20250701T045959Z', body)
+        self.assertIn('EXDATE:20250609T140000Z', body)
+        self.assertIn('RECURRENCE-ID:20250616T140000Z', body)
+        self.assertIn('DTSTART:20250616T160000Z', body)
@@ -1,8 +1,11 @@
 from django.urls import path
-from .views import list_events, calendar
+from .views import list_events, calendar, calendar_month, calendar_feed, ics_feed, rotate_ics_feed
 
 urlpatterns = [
     path('', calendar, name='calendar'),
+    path('mes/', calendar_month, name='calendar_month'),
+    path('feed/', calendar_feed, name='calendar_feed'),
+    path('ics/<str:token>.ics', ics_feed, name='ics_feed'),
+    path('ics/renovar/', rotate_ics_feed, name='rotate_ics_feed'),
     path('list/', list_events, name='list_events'),
 ]
-
@@ -1,15 +1,39 @@
+import hashlib
 from django.shortcuts import render, redirect
 from calendar_create_event.models import Event
 from django.contrib.auth.decorators import login_required
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import condition, require_POST
 from datetime import datetime, timedelta, date
 from django.utils import timezone
+
+from . import ics
+
+from calendar_create_event.recurrence import occurrences
+from .calendar_engine import (
+    MAX_RANGE_DAYS, SERIES_WINDOW_DAYS, events_in_range, group_by_day, month_weeks, start_of_week, week_days,
+)
 # Create your views here.
 
 
 @login_required
 def list_events(request):
     user = request.user
-    events = Event.objects.filter(participants=user).order_by('-date', '-time')
+    today = timezone.localdate()
+    window_start = today - timedelta(days=SERIES_WINDOW_DAYS)
+    window_end = today + timedelta(days=SERIES_WINDOW_DAYS)
+    qs = (Event.objects.filter(participants=user)
+          .prefetch_related('participants', 'exceptions'))
+    # Las reuniones únicas se listan completas; las series solo se expanden
+    # dentro de la ventana alrededor de hoy.
+    events = []
+    for event in qs:
+        if event.rrule:
+            events.extend(occurrences(event, window_start, window_end))
+        else:
+            events.append(event)
+    events.sort(key=lambda ev: (ev.date, ev.time), reverse=True)
     return render(request, 'list_events.html', {'events': events})
 
 
@@ -19,29 +43,123 @@ def get_week_days(start_date):
     return [start_of_week + timedelta(days=i) for i in range(7)]
 
 def calendar(request):
-    today = datetime.today()
+    today = timezone.localdate()
     start_param = request.GET.get('start')
     if start_param:
-        start_of_week = datetime.strptime(start_param, "%Y-%m-%d")
+        week_start = datetime.strptime(start_param, "%Y-%m-%d").date()
     else:
-        start_of_week = today - timedelta(days=today.weekday())  # lunes de esta semana
+        week_start = start_of_week(today)  # lunes de esta semana
 
     # Fechas de la semana (lunes a domingo)
-    week_days = [start_of_week + timedelta(days=i) for i in range(7)]
-
-    # Eventos en la semana
-    events = Event.objects.filter(date__range=[week_days[0].date(), week_days[-1].date()])
+    days = week_days(week_start)
 
-    # Agrupar eventos por día
-    events_by_day = []
-    for day in week_days:
-        day_events = events.filter(date=day.date()).order_by('time')
-        events_by_day.append((day, day_events))
+    # Eventos de la semana en una sola consulta, agrupados por día en Python
+    events = events_in_range(days[0], days[-1])
+    events_by_day = group_by_day(days, events)
 
     context = {
-        'week_days': week_days,
+        'ics_url': (request.build_absolute_uri(
+            reverse('ics_feed', args=[ics.make_feed_token(request.user)]))
+                    if request.user.is_authenticated else None),
+        'week_days': days,
         'events_by_day': events_by_day,
-        'prev_start': (start_of_week - timedelta(days=7)).strftime("%Y-%m-%d"),
-        'next_start': (start_of_week + timedelta(days=7)).strftime("%Y-%m-%d"),
+        'prev_start': (week_start - timedelta(days=7)).strftime("%Y-%m-%d"),
+        'next_start': (week_start + timedelta(days=7)).strftime("%Y-%m-%d"),
     }
     return render(request, 'calendar.html', context)
+
+
+def calendar_month(request):
+    """Vista mensual: semanas completas (lunes a domingo) que cubren el mes."""
+    today = timezone.localdate()
+    try:
+        year = int(request.GET.get('year', today.year))
+        month = int(request.GET.get('month', today.month))
+        date(year, month, 1)
+    except ValueError:
+        year, month = today.year, today.month
+    # Las semanas completas y los enlaces al mes anterior/siguiente salen del
+    # mes: en el primer y el último año que admite date se desbordarían
+    if not date.min.year < year < date.max.year:
+        year, month = today.year, today.month
+
+    weeks = month_weeks(year, month)
+    events = events_in_range(weeks[0][0], weeks[-1][-1])
+    weeks_with_events = [group_by_day(week, events) for week in weeks]
+
+    prev_month = date(year, month, 1) - timedelta(days=1)
+    next_month = date(year, month, 28) + timedelta(days=4)
+    context = {
+        'month_start': date(year, month, 1),
+        'weeks': weeks_with_events,
+        'prev_year': prev_month.year, 'prev_month': prev_month.month,
+        'next_year': next_month.year, 'next_month': next_month.month,
+    }
+    return render(request, 'calendar_month.html', context)
+
+
+def calendar_feed(request):
+    """
+    Feed JSON del mismo rango que usan las vistas semanal y mensual.
+    Parámetros: ?start=YYYY-MM-DD&end=YYYY-MM-DD (inclusive).
+    """
+    try:
+        start = datetime.strptime(request.GET['start'], "%Y-%m-%d").date()
+        end = datetime.strptime(request.GET['end'], "%Y-%m-%d").date()
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'Parámetros start y end requeridos (YYYY-MM-DD).'}, status=400)
+    if end < start or (end - start).days > MAX_RANGE_DAYS:
+        return JsonResponse({'error': f'Rango inválido (máximo {MAX_RANGE_DAYS} días).'}, status=400)
+
+    data = [
+        {**ev, 'date': ev['date'].isoformat(), 'time': ev['time'].strftime('%H:%M')}
+        for ev in events_in_range(start, end)
+    ]
+    return JsonResponse({'start': start.isoformat(), 'end': end.isoformat(), 'events': data})
+
+
+# --- Feed iCalendar por participante ---
+
+def _ics_state(request, token):
+    """Estado agregado del feed, calculado una vez por petición."""
+    if not hasattr(request, '_ics_state'):
+        cedula = ics.read_feed_token(token)
+        if cedula is None:
+            raise Http404("Feed no encontrado")
+        request._ics_state = (cedula, ics.feed_state(cedula))
+    return request._ics_state
+
+
+def _ics_etag(request, token):
+    cedula, state = _ics_state(request, token)
+    last = state['last'].timestamp() if state['last'] else 0
+    # Resumen del estado: la cédula no debe viajar en claro en la cabecera
+    return hashlib.sha1(f"{cedula}-{state['total']}-{state['ids'] or 0}-{last}".encode()).hexdigest()
+
+
+def _ics_last_modified(request, token):
+    return _ics_state(request, token)[1]['last']
+
+
+@login_required
+@require_POST
+def rotate_ics_feed(request):
+    """Cambia el secreto del feed .ics: el enlace anterior deja de funcionar."""
+    ics.rotate_feed_token(request.user)
+    return redirect('calendar')
+
+
+@condition(etag_func=_ics_etag, last_modified_func=_ics_last_modified)
+def ics_feed(request, token):
+    """
+    Calendario .ics de las reuniones del usuario del token. Responde 304 a
+    los clientes que repiten la consulta sin cambios.
+    """
+    cedula, _ = _ics_state(request, token)
+    response = StreamingHttpResponse(
+        ics.iter_calendar(cedula, request.get_host()),
+        content_type='text/calendar; charset=utf-8',
+    )
+    response['Content-Disposition'] = 'inline; filename="reuniones.ics"'
+    response['Cache-Control'] = 'private, no-cache'
+    return response
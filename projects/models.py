@@ -54,6 +54,8 @@ class Project(models.Model):
         null=True, blank=True,
         related_name='created_projects'
     )
+    # Sello de versión: se actualiza al guardar y cuando cambian sus factores
+    updated_at  = models.DateTimeField("Última modificación", auto_now=True)
 
     class Meta:
         ordering = ['name']
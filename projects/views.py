@@ -12,6 +12,7 @@ from .models import Project
 from .forms import ProjectForm
 from assignments.models import AssignmentRole, ProjectAssignment, FactorAssignment
 from core.permissions import FilteredListPermissionMixin, ObjectPermissionRequiredMixin 
+from core.mixins import ConditionalDetailMixin
 from login.models import Rol # Asegúrate de importar Rol
 # Asegúrate que los nombres de los mixins coincidan con tu core/permissions.py
 # En la Fase 1 se llamaban FilteredListPermissionMixin y ObjectPermissionRequiredMixin
@@ -98,11 +99,12 @@ class ProjectListView(LoginRequiredMixin, FilteredListPermissionMixin, ListView)
         return context    
 
 
-class ProjectDetailView(LoginRequiredMixin, ObjectPermissionRequiredMixin, DetailView):
+class ProjectDetailView(LoginRequiredMixin, ObjectPermissionRequiredMixin, ConditionalDetailMixin, DetailView):
     """
     Muestra el detalle de un proyecto y sus factores asociados.
     Los permisos para ver el detalle se basan en la asignación al proyecto.
     Los factores listados también se filtran según los permisos del usuario sobre ellos.
+    Responde 304 si el proyecto no cambió desde la última visita (ConditionalDetailMixin).
     """
     model = Project
     template_name = 'projects/project_detail.html'
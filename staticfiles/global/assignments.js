@@ -50,18 +50,11 @@ document.addEventListener('DOMContentLoaded', () => {
 
         try {
             miniAdminUsersContainer.innerHTML = '<p>Cargando MiniAdmins...</p>';
-            const [usersResponse, assignmentsResponse] = await Promise.all([
-                fetch(urls.api_mini_admin_users),
-                fetch(urls.api_project_assignments(projectId))
-            ]);
-
-            if (!usersResponse.ok) throw new Error(`Error cargando MiniAdmins: ${usersResponse.status}`);
-            const users = await usersResponse.json();
-
+            const assignmentsResponse = await fetch(urls.api_project_assignments(projectId));
             if (!assignmentsResponse.ok) throw new Error(`Error cargando asignaciones: ${assignmentsResponse.status}`);
             const assignments = await assignmentsResponse.json();
-            
-            renderUserTable(miniAdminUsersContainer, users, assignments, 'miniAdminRoleSelect');
+
+            renderUserTable(miniAdminUsersContainer, assignments, 'miniAdminRoleSelect', urls.api_mini_admin_users);
         } catch (error) {
             console.error('Error cargando MiniAdmins o asignaciones:', error);
             miniAdminUsersContainer.innerHTML = `<p class="text-danger">Error: ${error.message}</p>`;
@@ -169,18 +162,11 @@ document.addEventListener('DOMContentLoaded', () => {
 
         try {
             factorUsersContainer.innerHTML = '<p>Cargando usuarios...</p>';
-            const [usersResponse, assignmentsResponse] = await Promise.all([
-                fetch(urls.api_assignable_users_for_factor),
-                fetch(urls.api_factor_assignments(factorId))
-            ]);
-
-            if (!usersResponse.ok) throw new Error(`Error cargando usuarios: ${usersResponse.status}`);
-            const users = await usersResponse.json();
-            
+            const assignmentsResponse = await fetch(urls.api_factor_assignments(factorId));
             if (!assignmentsResponse.ok) throw new Error(`Error cargando asignaciones de factor: ${assignmentsResponse.status}`);
             const assignments = await assignmentsResponse.json();
 
-            renderUserTable(factorUsersContainer, users, assignments, 'factorUserRoleSelect');
+            renderUserTable(factorUsersContainer, assignments, 'factorUserRoleSelect', urls.api_assignable_users_for_factor);
         } catch (error) {
             console.error('Error cargando usuarios o asignaciones de factor:', error);
             factorUsersContainer.innerHTML = `<p class="text-danger">Error: ${error.message}</p>`;
@@ -224,12 +210,15 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     // --- Funciones Helper Comunes ---
-    function renderUserTable(container, users, existingAssignments = [], selectClass) {
-        if (users.length === 0) {
-            container.innerHTML = '<p class="text-muted">No hay usuarios disponibles para asignar.</p>';
-            return;
-        }
-        let html = `
+    // La tabla muestra los usuarios ya asignados; el buscador agrega filas para
+    // asignar a otros (la API de búsqueda es paginada, no se descarga la lista completa).
+    function renderUserTable(container, existingAssignments, selectClass, searchUrl) {
+        container.innerHTML = `
+          <div class="mb-2 position-relative">
+            <input type="search" class="form-control form-control-sm user-search-input"
+                   placeholder="Buscar por nombre, cédula o email para agregar..." autocomplete="off">
+            <div class="list-group user-search-results mt-1"></div>
+          </div>
           <table class="table table-striped table-sm">
             <thead class="table-light">
               <tr>
@@ -237,27 +226,94 @@ document.addEventListener('DOMContentLoaded', () => {
                 <th style="width: 200px;">Rol Asignado</th>
               </tr>
             </thead>
-            <tbody>
+            <tbody></tbody>
+          </table>
+          <p class="text-muted user-table-empty">No hay usuarios asignados. Use el buscador para agregar.</p>
         `;
-        users.forEach(user => {
-            const currentAssignment = existingAssignments.find(a => a.user_id === user.id);
-            const currentRole = currentAssignment ? currentAssignment.role : "";
-            html += `
-              <tr>
-                <td>${user.name} (${user.id})</td>
-                <td>
-                  <select class="form-select form-select-sm ${selectClass}" data-user-id="${user.id}">
-                    <option value="" ${currentRole === "" ? "selected" : ""}>Sin Permisos</option>
-                    <option value="lector" ${currentRole === "lector" ? "selected" : ""}>Lector</option>
-                    <option value="comentador" ${currentRole === "comentador" ? "selected" : ""}>Comentador</option>
-                    <option value="editor" ${currentRole === "editor" ? "selected" : ""}>Editor</option>
-                  </select>
-                </td>
-              </tr>
-            `;
+        existingAssignments.forEach(a => addUserRow(container, { id: a.user_id, name: a.name }, a.role, selectClass));
+        setupUserSearch(container, selectClass, searchUrl);
+    }
+
+    function addUserRow(container, user, role, selectClass) {
+        if (container.querySelector(`select.${selectClass}[data-user-id="${user.id}"]`)) return;
+        const row = document.createElement('tr');
+        row.innerHTML = `
+            <td>${escapeHtml(user.name)} (${escapeHtml(user.id)})</td>
+            <td>
+              <select class="form-select form-select-sm ${selectClass}" data-user-id="${escapeHtml(user.id)}">
+                <option value="">Sin Permisos</option>
+                <option value="lector">Lector</option>
+                <option value="comentador">Comentador</option>
+                <option value="editor">Editor</option>
+              </select>
+            </td>
+        `;
+        row.querySelector('select').value = role || '';
+        container.querySelector('tbody').appendChild(row);
+        container.querySelector('.user-table-empty').classList.add('d-none');
+    }
+
+    function setupUserSearch(container, selectClass, searchUrl) {
+        const input = container.querySelector('.user-search-input');
+        const results = container.querySelector('.user-search-results');
+        let timer = null;
+        let controller = null;
+
+        async function search(cursor) {
+            if (controller) controller.abort();
+            controller = new AbortController();
+            const params = new URLSearchParams({ q: input.value.trim() });
+            if (cursor) params.set('cursor', cursor);
+            try {
+                const response = await fetch(`${searchUrl}?${params}`, { signal: controller.signal });
+                if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+                const page = await response.json();
+                if (!cursor) results.innerHTML = '';
+                results.querySelector('.user-search-more')?.remove();
+                page.results.forEach(user => {
+                    const item = document.createElement('button');
+                    item.type = 'button';
+                    item.className = 'list-group-item list-group-item-action py-1';
+                    item.textContent = `${user.name} (${user.id}) — ${user.email}`;
+                    item.addEventListener('click', () => {
+                        addUserRow(container, user, 'lector', selectClass);
+                        results.innerHTML = '';
+                        input.value = '';
+                    });
+                    results.appendChild(item);
+                });
+                if (page.next) {
+                    const more = document.createElement('button');
+                    more.type = 'button';
+                    more.className = 'list-group-item list-group-item-light py-1 text-center user-search-more';
+                    more.textContent = 'Cargar más…';
+                    more.addEventListener('click', () => search(page.next));
+                    results.appendChild(more);
+                }
+                if (!cursor && page.results.length === 0) {
+                    results.innerHTML = '<div class="list-group-item text-muted py-1">Sin resultados.</div>';
+                }
+            } catch (error) {
+                if (error.name === 'AbortError') return;
+                console.error('Error buscando usuarios:', error);
+                results.innerHTML = '<div class="list-group-item text-danger py-1">Error al buscar usuarios.</div>';
+            }
+        }
+
+        input.addEventListener('input', () => {
+            clearTimeout(timer);
+            if (!input.value.trim()) {
+                results.innerHTML = '';
+                return;
+            }
+            timer = setTimeout(() => search(null), 250);
         });
-        html += `</tbody></table>`;
-        container.innerHTML = html;
+    }
+
+    function escapeHtml(value) {
+        const div = document.createElement('div');
+        div.textContent = value ?? '';
+        return div.innerHTML;
     }
 
     function applyAssignments(container, assignments, selectClass) {
@@ -219,6 +219,8 @@ EMAIL_HOST_USER     = 'icesiacreditacion@gmail.com'
 EMAIL_HOST_PASSWORD = 'gcrabaqtbaxfybws'
 EMAIL_USE_TLS       = True
 DEFAULT_FROM_EMAIL  = EMAIL_HOST_USER
+# URL pública para los enlaces de correos enviados fuera de una petición (comandos)
+SITE_URL = os.getenv('SITE_URL', f'https://{ALLOWED_HOSTS[0]}')
 
 LOGIN_URL = '/login/'
 LOGOUT_REDIRECT_URL = '/login/'
@@ -237,11 +239,31 @@ LOGIN_EXEMPT_URLS = [
     r'^login/password_reset',
     r'^login/reset/.*',
     r'^/attach/',
+    r'^reuniones/ics/[^/]+\.ics$',  # feed iCalendar (autenticado por token firmado)
 ]
 
-SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Caché compartida entre los workers de gunicorn (ver core.cache_backends):
+#   CACHE_URL=redis://host:6379/0 -> Redis (requiere el paquete redis); incr atómico
+#   sin CACHE_URL                 -> tabla django_cache (python manage.py createcachetable)
+# Las pruebas la reemplazan por memoria local (core.test_runner).
+CACHE_URL = os.getenv('CACHE_URL', '')
+
+if CACHE_URL:
+    _DEFAULT_CACHE = {'BACKEND': 'core.cache_backends.InstrumentedRedisCache', 'LOCATION': CACHE_URL}
+else:
+    _DEFAULT_CACHE = {
+        'BACKEND': 'core.cache_backends.InstrumentedDatabaseCache',
+        'LOCATION': 'django_cache',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
     }
+
+CACHES = {
+    # Fragmentos, páginas, listados y contadores: se puede vaciar sin consecuencias
+    'default': _DEFAULT_CACHE,
 }
+
+# Las sesiones viven en la base de datos; con Redis se leen desde la caché
+SESSION_ENGINE = ('django.contrib.sessions.backends.cached_db' if CACHE_URL
+                  else 'django.contrib.sessions.backends.db')
+
+TEST_RUNNER = 'core.test_runner.TestRunner'
@@ -1,6 +1,7 @@
 # traitList/tests.py
 
 from django.test import TestCase, Client, RequestFactory
+from django.http import HttpResponse
 from django.urls import reverse, resolve
 from django.apps import apps
 from django.contrib import admin
@@ -183,3 +184,62 @@ class TraitDetailViewTests(TestCase):
         self.assertFalse(ctx['can_edit_trait'])
         self.assertFalse(ctx['can_add_aspect'])
         self.assertFalse(ctx['can_attach_to_trait'])
+
+
+class TraitDetailConditionalGetTests(TestCase):
+    """ETag / 304 del detalle de característica (ConditionalDetailMixin)."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = User.objects.create_superuser(
+            cedula='11223344', email='etag@gmail.com', password='pass',
+            first_name='Eta', last_name='Gómez'
+        )
+        self.project = Project.objects.create(
+            name='ProjETag', start_date=date.today(), end_date=date.today() + timedelta(days=5)
+        )
+        # bulk_create evita la creación del Google Doc en Factor.save()
+        self.factor, = Factor.objects.bulk_create([Factor(
+            project=self.project, name='FactorETag',
+            start_date=date.today(), end_date=date.today() + timedelta(days=1)
+        )])
+        self.trait = Trait.objects.create(factor=self.factor, name='TraitETag')
+        patcher = patch.object(views_module.TraitDetailView, 'render_to_response',
+                               side_effect=lambda ctx: HttpResponse('ok'))
+        self.render = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get(self, **headers):
+        request = self.factory.get('/', **headers)
+        request.user = self.user
+        request.META['CSRF_COOKIE'] = 'a' * 32
+        return views_module.TraitDetailView.as_view()(request, pk=self.trait.pk)
+
+    def test_repeat_visit_returns_304(self):
+        first = self._get()
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+        second = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second['ETag'], etag)
+        self.assertEqual(self.render.call_count, 1)
+
+    def test_attachment_change_invalidates_etag(self):
+        from django.contrib.contenttypes.models import ContentType
+        etag = self._get()['ETag']
+        File.objects.create(
+            name='evidencia', type='pdf',
+            content_type=ContentType.objects.get_for_model(Trait), object_id=self.trait.pk
+        )
+        resp = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], etag)
+
+    def test_trait_save_touches_ancestors(self):
+        self.trait.description = 'nueva'
+        self.trait.save()
+        self.trait.refresh_from_db()
+        self.factor.refresh_from_db()
+        self.project.refresh_from_db()
+        self.assertGreaterEqual(self.factor.updated_at, self.trait.updated_at)
+        self.assertGreaterEqual(self.project.updated_at, self.trait.updated_at)
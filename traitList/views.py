@@ -17,6 +17,7 @@ from core.permissions import (
     get_trait_permission, # Para el detalle
     can_edit as permission_can_edit # Alias
 )
+from core.mixins import ConditionalDetailMixin
 from assignments.models import AssignmentRole, FactorAssignment, ProjectAssignment # Para roles
 
 class TraitListView(LoginRequiredMixin, FilteredListPermissionMixin, ListView):
@@ -82,10 +83,12 @@ class TraitListView(LoginRequiredMixin, FilteredListPermissionMixin, ListView):
         context['current_search_query'] = self.request.GET.get('q')
         return context
 
-class TraitDetailView(LoginRequiredMixin, ObjectPermissionRequiredMixin, DetailView):
+class TraitDetailView(LoginRequiredMixin, ObjectPermissionRequiredMixin, ConditionalDetailMixin, DetailView):
     model = Trait
+    queryset = Trait.objects.select_related('factor__project')
     template_name = "traitList/trait_detail.html"
     context_object_name = "trait"
+    version_ancestors = ('factor', 'factor__project')
     permission_required_roles = [
         AssignmentRole.LECTOR,
         AssignmentRole.COMENTADOR,
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 02:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('traitManager', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trait',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Última modificación'),
+        ),
+    ]
@@ -19,6 +19,8 @@ class Trait(models.Model):
         related_name='traits',
         verbose_name='Factor Asociado'
     )
+    # Sello de versión: se actualiza al guardar y cuando cambian sus aspectos o adjuntos
+    updated_at  = models.DateTimeField("Última modificación", auto_now=True)
 
     class Meta:
         ordering = ["name"]